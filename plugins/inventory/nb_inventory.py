@@ -60,6 +60,22 @@ DOCUMENTATION = """
                   region, site, role, platform, and/or tenant. Please check official netbox docs for more info.
             default: false
             type: boolean
+        config_context_source:
+            description:
+                - Where the config context of the hosts is computed, when I(config_context) is enabled.
+                - C(netbox) requests the config context of every host from NetBox, which renders it for each host.
+                - C(local) requests the hosts without their config context, fetches all active config contexts once, and
+                  merges the config contexts assigned to each host in the same order as NetBox (by weight, then name),
+                  followed by its local context data.
+                - Config contexts are matched by region and site group (including their parents), site, location (including
+                  its parents), device type, role, platform, cluster type, cluster group, cluster, tenant group (including
+                  its parents), tenant and tag.
+                - Assignments NetBox supports but this plugin does not know of are ignored, and config context data synced
+                  from a data source is only used once synced in NetBox.
+            type: str
+            default: netbox
+            choices: ['netbox', 'local']
+            version_added: "3.23.0"
         flatten_config_context:
             description:
                 - If I(config_context) is enabled, by default it's added as a host var named config_context.
@@ -122,6 +138,7 @@ DOCUMENTATION = """
             description:
                 - If True, it adds the device or virtual machine prefixes to hostvars nested under "site".
                 - Must match selection for "site_data", as this changes the structure of "site" in hostvars
+                - Only the prefixes of the sites of the hosts are fetched.
             default: false
             type: boolean
             version_added: "3.5.0"
@@ -138,8 +155,15 @@ DOCUMENTATION = """
                 - If you are using the various query_filters options to reduce the number of devices, you may find querying NetBox faster with fetch_all set to False.  # noqa: E501
                 - For efficiency, when False, these requests will be batched, for example /api/dcim/interfaces?limit=0&device_id=1&device_id=2&device_id=3
                 - These GET request URIs can become quite large for a large number of devices. If you run into HTTP 414 errors, you can adjust the max_uri_length option to suit your web server.  # noqa: E501
+                - When set to C(auto), the first page of all objects is requested first for each of interfaces, services, virtual disks and IP addresses,
+                  and the rest of them are fetched when it takes fewer requests than the batched requests. The first page is not requested when
+                  the batched requests fit in a single request, or when the number of objects is known from the snapshot of I(changelog_refresh).
+                - Support for C(auto) was added in version 3.23.0.
+                - Since version 3.23.0, when not C(true), sites, regions, site groups, locations, tenants, racks, roles, platforms,
+                  device types, manufacturers and clusters are also only fetched if the hosts reference them, including the parents
+                  of regions, site groups and locations. Groups are then only created for these objects.
             default: true
-            type: boolean
+            type: raw
             version_added: "0.2.1"
         group_by:
             description:
@@ -180,6 +204,19 @@ DOCUMENTATION = """
                 - utc_offset
                 - facility
             default: []
+        hostvars:
+            description:
+                - Names of the host variables to set, before they are renamed by I(rename_variables), for example C(tags),
+                  C(sites) or C(primary_ip4). All host variables are set when not specified.
+                - I(ansible_host) is always set.
+                - Lookups of related objects, such as tenants, platforms or interfaces, are only fetched when used by these
+                  host variables or by I(group_by). An empty list only fetches the hosts from NetBox.
+                - As I(interfaces) also sets the C(dns_name) host variable, when I(interfaces) is enabled and C(dns_name)
+                  is listed but not C(interfaces), the IP addresses are fetched as if I(dns_name) was enabled, without
+                  the interfaces.
+            type: list
+            elements: str
+            version_added: "3.23.0"
         group_names_raw:
             description: Will not add the group_by choice name to the group names
             default: false
@@ -217,6 +254,200 @@ DOCUMENTATION = """
             type: int
             default: 4000
             version_added: "0.2.1"
+        page_fetch_workers:
+            description:
+                - Number of pages of a paginated NetBox response to fetch in parallel.
+                - NetBox caps C(limit=0) requests to its MAX_PAGE_SIZE setting, so large object lists are returned in several pages.
+                - When greater than 1, the total object count is read from the first page, and the remaining pages are
+                  requested concurrently using C(offset) and C(limit), instead of following the C(next) link page by page.
+            type: int
+            default: 1
+            version_added: "3.23.0"
+        chunk_fetch_workers:
+            description:
+                - When I(fetch_all) is False, number of chunked requests for interfaces, services, virtual disks and IP addresses
+                  to send to NetBox in parallel.
+                - Each chunk is a request for a batch of device or virtual machine ids, sized according to I(max_uri_length).
+            type: int
+            default: 1
+            version_added: "3.23.0"
+        field_projection:
+            description:
+                - Only request the fields the inventory uses from NetBox, to reduce the size of responses and the time
+                  NetBox spends serializing them.
+                - Lookups of platforms, tenants, regions, device roles, etc. only request their id, slug and parent, using the
+                  C(fields) query parameter on NetBox 4.0 and later, or C(brief) mode on older versions when it contains these fields.
+                - Devices and virtual machines only request the fields used for host vars and groups, depending on the
+                  enabled options, for example I(config_context). As I(compose), I(groups) and I(keyed_groups) can use
+                  any field, hosts are fetched with all fields when one of them is set.
+                - Sites are fetched with all fields when I(site_data) or I(prefixes) is set.
+                - Requires NetBox 4.0 or later for hosts, sites, regions, site groups, locations, racks and clusters.
+            type: boolean
+            default: false
+            version_added: "3.23.0"
+        fetch_engine:
+            description:
+                - Engine used to send requests to NetBox.
+                - C(threads) sends requests from the threads running each fetch step, and from the threads started for
+                  I(page_fetch_workers) and I(chunk_fetch_workers).
+                - C(asyncio) sends every request from a single asyncio event loop, over keep-alive connections.
+                  All pages and chunks of a lookup are requested at once, and at most I(max_concurrent_requests)
+                  requests are in flight at the same time. No thread is started per page or chunk.
+                - When C(asyncio) is used, I(http_transport) is ignored. Requests that need to go through a proxy configured
+                  in the environment are sent with Ansible's C(open_url).
+            default: threads
+            choices: ['threads', 'asyncio']
+            version_added: "3.23.0"
+        max_concurrent_requests:
+            description:
+                - Maximum number of requests in flight at the same time when I(fetch_engine=asyncio), or when
+                  I(adaptive_concurrency) is enabled.
+            type: int
+            default: 32
+            version_added: "3.23.0"
+        adaptive_concurrency:
+            description:
+                - Adapt the number of requests in flight at the same time to how NetBox copes with the load, from 1 up
+                  to I(max_concurrent_requests), with both fetch engines.
+                - The number of requests in flight is halved when a request is retried (see I(max_retries)), or when
+                  the latency of responses rises, and grows again by one request while responses are healthy.
+            type: boolean
+            default: false
+            version_added: "3.23.0"
+        max_retries:
+            description:
+                - Number of times a request is retried when NetBox, or the reverse proxy in front of it, answers with
+                  HTTP status 429, 502, 503 or 504, or when the connection to NetBox fails.
+                - Retries wait for the delay of the C(Retry-After) header of the response if any, or else for a
+                  random delay of up to I(retry_backoff) seconds, doubled after each retry.
+            type: int
+            default: 0
+            version_added: "3.23.0"
+        retry_backoff:
+            description:
+                - Maximum delay in seconds before the first retry of a request, see I(max_retries).
+            type: float
+            default: 1.0
+            version_added: "3.23.0"
+        shared_requests:
+            description:
+                - Share the responses of NetBox between the inventory sources using this plugin in the same process, for
+                  example several sources with different I(query_filters) loaded by the same C(ansible-playbook) run.
+                - A request sent by one source while the same request of another source is in flight waits for its response,
+                  and the responses received in the last I(shared_requests_ttl) seconds are re-used instead of being requested
+                  again. Typically the API status and schema, sites, regions, platforms, device types and manufacturers.
+                - Only requests for the same URL with the same credentials (I(token), I(headers), I(cert), I(key),
+                  I(ca_path) and I(validate_certs)) are shared.
+            type: boolean
+            default: false
+            version_added: "3.23.0"
+        shared_requests_ttl:
+            description:
+                - Number of seconds responses are shared for, when I(shared_requests) is enabled.
+                - Responses are released once they expire. At most 64 MB of responses are shared, the oldest responses
+                  are released first.
+            type: int
+            default: 60
+            version_added: "3.23.0"
+        fetch_workers:
+            description:
+                - Number of threads shared by the steps fetching data from NetBox (API docs, hosts and each lookup).
+                - Each step starts as soon as the steps it depends on have completed, for example lookups of sites or
+                  tenants do not wait for hosts to be fetched, and prefixes only wait for sites.
+            type: int
+            default: 8
+            version_added: "3.23.0"
+        fetch_stats:
+            description:
+                - Display statistics about fetching data from NetBox once the inventory is built.
+                - Wall time of each step fetching data (API docs, hosts and each lookup), and of building the inventory.
+                - Number of requests, bytes received, cache hits and misses, and latency percentiles of requests, for each
+                  NetBox endpoint. Bytes received are counted before decompression, see I(compression).
+                - Responses shared by another request, see I(shared_requests), and lists taken from a snapshot, see
+                  I(changelog_refresh) and I(snapshot_import), are counted apart from requests.
+            type: boolean
+            default: false
+            version_added: "3.23.0"
+        fetch_stats_file:
+            description:
+                - Path of a JSON file to write the statistics described in I(fetch_stats) to.
+                - Statistics are collected when this option is set, even if I(fetch_stats) is false.
+            type: path
+            version_added: "3.23.0"
+        changelog_refresh:
+            description:
+                - Keep a local snapshot of the objects fetched from NetBox, and on the following runs only fetch the objects
+                  changed since the previous run, according to the NetBox change log.
+                - Objects created, updated or deleted since the previous run are applied to the snapshot. Created and updated
+                  objects are fetched again by id, with the same query filters. Objects referencing a changed object, for
+                  example the devices of a renamed site, and objects related to a changed object, for example the device of an
+                  updated interface, are fetched again as well.
+                - Lists with fields computed by NetBox from other objects are fetched again in full when one of these objects
+                  changed. That is all hosts after a change to a config context, region, site group, location or tenant
+                  group, if I(config_context) is enabled and I(config_context_source) is C(netbox), and all sites after a
+                  change to a prefix, for their prefix count.
+                - The first run, and any run with an unusable snapshot, fetches everything.
+                - The token must be allowed to read the change log, otherwise everything is fetched on every run.
+                - Changes made without creating a change log record, for example by a script using C(QuerySet.update()),
+                  are not seen until the snapshot expires, see I(changelog_snapshot_max_age).
+            type: boolean
+            default: false
+            version_added: "3.23.0"
+        changelog_snapshot_path:
+            description:
+                - Path of the snapshot file used by I(changelog_refresh).
+                - The snapshot contains the data fetched from NetBox, and is only readable by its owner.
+                - Defaults to a file named after the I(api_endpoint) and token, in the parent directory of Ansible's local temporary directory.
+            type: path
+            version_added: "3.23.0"
+        changelog_snapshot_max_age:
+            description:
+                - Maximum age of the snapshot used by I(changelog_refresh), in seconds. Older snapshots are discarded and
+                  everything is fetched again.
+                - Must be lower than the C(CHANGELOG_RETENTION) setting of NetBox, as older change log records are deleted.
+            type: int
+            default: 86400
+            version_added: "3.23.0"
+        cache_codec:
+            description:
+                - Encoding of the values stored in the cache by this plugin, when I(cache) is enabled.
+                - C(none) stores the NetBox responses as they are.
+                - C(zlib) stores compact JSON compressed with zlib. Nested objects repeated in a response, for example the
+                  site or tenant of each device, are stored once.
+                - Values stored with another codec are still read from the cache.
+            type: str
+            default: none
+            choices: ['none', 'zlib']
+            version_added: "3.23.0"
+        snapshot_export:
+            description:
+                - Path of a file to write everything fetched from NetBox to, once fetched. That is the API version, the allowed
+                  query parameters, the hosts, the lookups, the interfaces, IP addresses, services and prefixes.
+                - The snapshot is compact JSON compressed with zlib, and is readable only by its owner.
+                - See I(snapshot_import) to build the inventory from this file.
+            type: path
+            version_added: "3.23.0"
+        snapshot_import:
+            description:
+                - Path of a file written by I(snapshot_export), to build the inventory from, without sending any request to NetBox.
+                - The inventory source must use the same I(api_endpoint), query filters and options fetching data as the source
+                  which exported the snapshot, for example I(interfaces), I(services) or I(fetch_all). Grouping and host vars
+                  options, such as I(group_by), I(compose) or I(keyed_groups), can differ.
+                - Mutually exclusive with I(snapshot_export).
+            type: path
+            version_added: "3.23.0"
+        cache_inventory_model:
+            description:
+                - When I(cache) is enabled, also cache the inventory built from the NetBox data, that is the hosts, groups and
+                  host vars, including the result of I(compose), I(groups) and I(keyed_groups).
+                - On a cache hit, the inventory is loaded from the cache without fetching or processing any NetBox data.
+                - The cached inventory is specific to the options of the inventory source, including the rendered query filters.
+                  Changing any option builds the inventory again.
+                - Until the cached inventory expires, see I(cache_timeout), changes in NetBox are not seen, even with
+                  I(changelog_refresh).
+            type: boolean
+            default: false
+            version_added: "3.23.0"
         virtual_chassis_name:
             description:
                 - When a device is part of a virtual chassis, use the virtual chassis name as the Ansible inventory hostname.
@@ -227,6 +458,8 @@ DOCUMENTATION = """
             description:
                 - Force IP Addresses to be fetched so that the dns_name for the primary_ip of each device or VM is set as a host_var.
                 - Setting interfaces will also fetch IP addresses and the dns_name host_var will be set.
+                - When I(hostvars) is set, IP addresses are only fetched for the dns_name host_var if C(dns_name) is listed
+                  in I(hostvars), see I(hostvars).
             type: boolean
             default: false
         ansible_host_dns_name:
@@ -269,6 +502,42 @@ DOCUMENTATION = """
             default: {}
             env:
                 - name: NETBOX_HEADERS
+        compression:
+            description:
+                - Request compressed responses from NetBox, with C(gzip) or C(deflate), and C(br) if the brotli or
+                  brotlicffi Python library is installed. Responses are decompressed as they are received.
+                - JSON responses usually compress well, which saves bandwidth on slow links to NetBox, for some CPU time
+                  on both ends.
+                - The number of bytes received, and their size once decompressed, are displayed in verbose mode.
+            type: boolean
+            default: false
+            version_added: "3.23.0"
+        http_transport:
+            description:
+                - Transport used to send requests to the NetBox API.
+                - C(urllib) opens a new connection for every request, using Ansible's C(open_url).
+                - C(pooled) keeps connections alive and re-uses them for subsequent requests,
+                  avoiding a new TCP connection and TLS handshake for every page and chunk fetched.
+                - The C(pooled) transport falls back to C(urllib) for requests that need to go through a proxy
+                  configured in the environment.
+            default: urllib
+            choices: ['urllib', 'pooled']
+            version_added: "3.23.0"
+        connection_pool_size:
+            description:
+                - Maximum number of idle connections kept open to NetBox when I(http_transport=pooled).
+                - Each connection is used by a single thread at a time. Additional connections are opened when
+                  more requests run concurrently, but only this many are kept for re-use.
+            type: int
+            default: 10
+            version_added: "3.23.0"
+        connection_keepalive:
+            description:
+                - Number of seconds an idle connection is kept open for re-use when I(http_transport=pooled).
+                - Set to 0 to close connections after every request.
+            type: int
+            default: 30
+            version_added: "3.23.0"
 """
 
 EXAMPLES = """
@@ -382,19 +651,29 @@ token:
   value: test123456
 """
 
+import asyncio
+import base64
+import io
+import hashlib
 import json
 import uuid
+import zlib
 import math
 import os
+import random
 import re
+import socket
+import time
 import datetime
-from copy import deepcopy
 from functools import partial
 from sys import version as python_version
-from threading import Thread
+from threading import Condition, Event, Lock, Thread, Timer, current_thread
 from typing import Iterable
 from itertools import chain
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, deque
+from email import parser as email_parser
+from email.utils import parsedate_to_datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from ipaddress import ip_interface
 
 
@@ -402,11 +681,14 @@ from ansible.constants import DEFAULT_LOCAL_TMP
 from ansible.plugins.inventory import BaseInventoryPlugin, Constructable, Cacheable
 from ansible.module_utils.ansible_release import __version__ as ansible_version
 from ansible.errors import AnsibleError
-from ansible.module_utils._text import to_text, to_native
-from ansible.module_utils.urls import open_url
+from ansible.module_utils._text import to_bytes, to_text, to_native
+from ansible.module_utils.urls import make_context, open_url
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.module_utils.six.moves import http_client
 from ansible.module_utils.six.moves.urllib import error as urllib_error
 from ansible.module_utils.six.moves.urllib.parse import urlencode
-from ansible.module_utils.six.moves.urllib.parse import urlparse
+from ansible.module_utils.six.moves.urllib.parse import parse_qsl, urljoin, urlparse
+from ansible.module_utils.six.moves.urllib.request import getproxies, proxy_bypass
 
 
 try:
@@ -423,12 +705,1362 @@ except ImportError as imp_exc:
 else:
     PYTZ_IMPORT_ERROR = None
 
+# Brotli compressed responses are only accepted if brotli or brotlicffi is installed
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+
+# Redirect status codes followed by the pooled transport, and how many redirects are followed in a row
+REDIRECT_STATUS_CODES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 10
+
+# Content encodings of the responses accepted when option compression is enabled
+ACCEPT_ENCODING = "gzip, deflate, br" if brotli is not None else "gzip, deflate"
+# Size of the blocks of compressed response bodies read and decompressed at once
+DECOMPRESS_BLOCK_SIZE = 64 * 1024
+
+# Maximum size in bytes of the response bodies shared between the inventory sources when option shared_requests is enabled
+SHARED_REQUESTS_MAX_SIZE = 64 * 1024 * 1024
+
+# Status codes of responses retried when option max_retries is set, sent by a busy NetBox or its reverse proxy
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+# Upper bound in seconds of the backoff between retries, and of the delay requested by Retry-After headers
+MAX_RETRY_DELAY = 300
+# The concurrency window shrinks when the recent latency of responses rises above this factor of the average latency
+LATENCY_RISE_FACTOR = 2
+
+
+class RequestController:
+    """Retries of failed requests to NetBox, and window of requests in flight at the same time.
+
+    Failed requests are retried after a jittered exponential backoff, or the delay of their Retry-After header.
+
+    When adaptive, the window is halved when a request is retried, or when the recent latency of responses rises
+    above LATENCY_RISE_FACTOR times their average latency, and grows by one request after each window of healthy
+    responses, up to max_window. Requests which were already in flight when the window was halved do not halve it
+    again. Without max_window, the number of requests in flight is not limited.
+    """
+
+    def __init__(
+        self,
+        max_window=None,
+        adaptive=False,
+        max_retries=0,
+        backoff=1.0,
+        min_window=1,
+        display=None,
+    ):
+        self.max_window = max_window
+        self.window = max_window
+        self.min_window = min_window
+        self.adaptive = adaptive and max_window is not None
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.display = display
+        self.in_flight = 0
+        self._lock = Lock()
+        self._condition = Condition(self._lock)
+        self._sent = 0
+        self._halved_at = 0
+        self._healthy = 0
+        self._recent_latency = None
+        self._average_latency = None
+        self._latencies = 0
+
+    def try_acquire(self):
+        # Reserve a place in the window for a request, and return its ticket, or 0 if the window is full
+        # Not blocking, used as predicate of threading and asyncio conditions
+        if self.window is not None and self.in_flight >= self.window:
+            return 0
+
+        self.in_flight += 1
+        self._sent += 1
+        return self._sent
+
+    def acquire(self):
+        # Wait for a place in the window, from a thread
+        with self._condition:
+            return self._condition.wait_for(self.try_acquire)
+
+    def release(self, ticket, latency=None, overloaded=False):
+        # Record the completion of the request of ticket, and wake up the requests waiting for a place in the window
+        with self._condition:
+            self.in_flight -= 1
+            self._adapt(ticket, latency, overloaded)
+            self._condition.notify_all()
+
+    def _adapt(self, ticket, latency, overloaded):
+        if latency is not None:
+            self._latencies += 1
+            if self._average_latency is None:
+                self._recent_latency = self._average_latency = latency
+            else:
+                self._recent_latency += 0.3 * (latency - self._recent_latency)
+                self._average_latency += 0.05 * (latency - self._average_latency)
+
+        if not self.adaptive or ticket <= self._halved_at:
+            return
+
+        if (
+            not overloaded
+            and self._latencies >= 10
+            and self._recent_latency > LATENCY_RISE_FACTOR * self._average_latency
+        ):
+            overloaded = True
+
+        if overloaded:
+            self.window = max(self.window // 2, self.min_window)
+            self._halved_at = self._sent
+            self._healthy = 0
+            # Judge the latency of the smaller window against itself
+            self._average_latency = self._recent_latency
+            return
+
+        self._healthy += 1
+        if self._healthy >= self.window and self.window < self.max_window:
+            self.window += 1
+            self._healthy = 0
+
+    def retry_delay(self, error, attempt):
+        # Seconds to wait before retrying a request failed with error for the attempt-th time, None if not retried
+        if attempt >= self.max_retries:
+            return None
+
+        if isinstance(error, urllib_error.HTTPError):
+            if error.code not in RETRY_STATUS_CODES:
+                return None
+
+            retry_after = self._retry_after(error.headers)
+            if retry_after is not None:
+                return min(retry_after, MAX_RETRY_DELAY)
+        elif not isinstance(
+            error, (urllib_error.URLError, http_client.HTTPException, OSError)
+        ):
+            return None
+
+        # Full jitter, so the requests failed at the same time are not retried at the same time
+        return random.uniform(0, min(self.backoff * 2**attempt, MAX_RETRY_DELAY))
+
+    @staticmethod
+    def _retry_after(headers):
+        # Delay in seconds of a Retry-After header, given in seconds or as an HTTP date
+        value = headers.get("Retry-After") if headers is not None else None
+        if not value:
+            return None
+
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return max((retry_at - now).total_seconds(), 0)
+
+    def log_retry(self, url, error, delay):
+        if self.display is not None:
+            self.display.v(
+                "Retrying %s in %.1f seconds: %s" % (url, delay, to_native(error))
+            )
+
+
+class ConnectionPool:
+    """Bounded pool of idle keep-alive connections, keyed by (scheme, host, port).
+
+    A connection is checked out by one thread for the duration of a request, and returned
+    afterwards so the next request - from any thread - can re-use it.
+    """
+
+    def __init__(self, maxsize, keepalive):
+        self.maxsize = maxsize
+        self.keepalive = keepalive
+        self._idle = defaultdict(deque)
+        self._idle_count = 0
+        self._lock = Lock()
+
+    def get(self, key):
+        # Most recently used connections first, they are the least likely to have been closed by the server
+        with self._lock:
+            idle = self._idle[key]
+            while idle:
+                connection, last_used = idle.pop()
+                self._idle_count -= 1
+                if time.monotonic() - last_used < self.keepalive:
+                    return connection
+                connection.close()
+        return None
+
+    def put(self, key, connection):
+        with self._lock:
+            if self.keepalive > 0 and self._idle_count < self.maxsize:
+                self._idle[key].append((connection, time.monotonic()))
+                self._idle_count += 1
+                return
+        connection.close()
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                for connection, _last_used in idle:
+                    connection.close()
+            self._idle.clear()
+            self._idle_count = 0
+
+
+class ContentDecoder:
+    """Incremental decompression of a response body, according to its Content-Encoding header.
+
+    wire_bytes is the size of the compressed body received so far.
+    """
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.wire_bytes = 0
+        self._deflate_raw = None
+        if encoding in ("gzip", "x-gzip"):
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            self._decompressor = zlib.decompressobj()
+            # Some servers send raw deflate data without the zlib header
+            self._deflate_raw = False
+        elif encoding == "br" and brotli is not None:
+            self._decompressor = brotli.Decompressor()
+        else:
+            raise http_client.HTTPException(
+                "Unsupported Content-Encoding %s" % encoding
+            )
+
+    @classmethod
+    def from_headers(cls, headers):
+        # Decoder of the response with headers, None if its body is not compressed
+        encoding = (headers.get("Content-Encoding") or "identity").strip().lower()
+        if encoding == "identity":
+            return None
+        return cls(encoding)
+
+    def decompress(self, data):
+        first_block = not self.wire_bytes
+        self.wire_bytes += len(data)
+
+        if self.encoding == "br":
+            decompress = getattr(self._decompressor, "decompress", None)
+            return (decompress or self._decompressor.process)(data)
+
+        try:
+            return self._decompressor.decompress(data)
+        except zlib.error:
+            if self._deflate_raw is not False or not first_block:
+                raise
+            self._deflate_raw = True
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._decompressor.decompress(data)
+
+    def flush(self):
+        if self.encoding == "br":
+            return b""
+        return self._decompressor.flush()
+
+    def read(self, fp):
+        # Decompressed body read from the file-like object fp, a block at a time
+        blocks = []
+        while True:
+            block = fp.read(DECOMPRESS_BLOCK_SIZE)
+            if not block:
+                break
+            blocks.append(self.decompress(block))
+        blocks.append(self.flush())
+        return b"".join(blocks)
+
+
+def decoded_response(body, wire_bytes=None, shared=False):
+    # File-like object of a decompressed body, with the size of the body received from NetBox
+    # shared is whether the body is the response to another request, see SharedRequests
+    response = io.BytesIO(body)
+    response.wire_bytes = len(body) if wire_bytes is None else wire_bytes
+    response.shared = shared
+    return response
+
+
+class HTTPTransport:
+    """Base class of the transports keeping connections to NetBox alive between requests.
+
+    Accepts the same arguments as open_url(), and behaves the same way:
+    - the same SSL context is built from validate_certs, client_cert, client_key and ca_path
+    - redirects are followed according to follow_redirects
+    - HTTP errors are raised as urllib HTTPError, connection errors as URLError
+    Compressed response bodies are decompressed, and the responses have the size of the body received as wire_bytes.
+    """
+
+    def __init__(self, pool_size, keepalive, **open_url_kwargs):
+        self.open_url_kwargs = open_url_kwargs
+        self.headers = open_url_kwargs["headers"]
+        self.timeout = open_url_kwargs["timeout"]
+        self.follow_redirects = open_url_kwargs["follow_redirects"]
+        self.pool = ConnectionPool(pool_size, keepalive)
+        self._ssl_context = None
+
+    @property
+    def ssl_context(self):
+        if self._ssl_context is None:
+            self._ssl_context = make_context(
+                cafile=self.open_url_kwargs["ca_path"] or None,
+                validate_certs=self.open_url_kwargs["validate_certs"],
+                client_cert=self.open_url_kwargs["client_cert"] or None,
+                client_key=self.open_url_kwargs["client_key"] or None,
+            )
+        return self._ssl_context
+
+    def close(self):
+        self.pool.close()
+
+    def _uses_proxy(self, parsed_url):
+        return parsed_url.scheme in getproxies() and not proxy_bypass(
+            parsed_url.hostname
+        )
+
+    def _redirect_url(self, url, status, reason, headers, body):
+        # Return the URL to follow if the response is a redirect, raise HTTPError if the response is an error
+        if status in REDIRECT_STATUS_CODES and headers.get("Location"):
+            if self.follow_redirects in ("no", "none", False):
+                raise urllib_error.HTTPError(
+                    url, status, reason, headers, io.BytesIO(body)
+                )
+            return urljoin(url, headers["Location"])
+
+        if status >= 400:
+            raise urllib_error.HTTPError(url, status, reason, headers, io.BytesIO(body))
+
+        return None
+
+    @staticmethod
+    def _connection_key(parsed_url):
+        return (parsed_url.scheme, parsed_url.hostname, parsed_url.port)
+
+    @staticmethod
+    def _request_path(parsed_url):
+        path = parsed_url.path or "/"
+        if parsed_url.query:
+            path += "?" + parsed_url.query
+        return path
+
+
+class PooledHTTPTransport(HTTPTransport):
+    """HTTP transport re-using connections from a pool shared by all threads."""
+
+    def open(self, url):
+        for _redirect in range(MAX_REDIRECTS + 1):
+            parsed_url = urlparse(url)
+
+            if self._uses_proxy(parsed_url):
+                # Proxies are only supported by open_url
+                return open_url(url, **self.open_url_kwargs)
+
+            status, reason, headers, body, wire_bytes = self._request(parsed_url)
+
+            redirect_url = self._redirect_url(url, status, reason, headers, body)
+            if redirect_url is None:
+                return decoded_response(body, wire_bytes)
+            url = redirect_url
+
+        raise urllib_error.HTTPError(
+            url, status, "Too many redirects", headers, io.BytesIO(body)
+        )
+
+    def _new_connection(self, parsed_url):
+        if parsed_url.scheme == "https":
+            return http_client.HTTPSConnection(
+                parsed_url.hostname,
+                parsed_url.port,
+                timeout=self.timeout,
+                context=self.ssl_context,
+            )
+        return http_client.HTTPConnection(
+            parsed_url.hostname, parsed_url.port, timeout=self.timeout
+        )
+
+    def _request(self, parsed_url):
+        key = self._connection_key(parsed_url)
+        path = self._request_path(parsed_url)
+
+        while True:
+            connection = self.pool.get(key)
+            reused = connection is not None
+            if not reused:
+                connection = self._new_connection(parsed_url)
+
+            try:
+                connection.request("GET", path, headers=self.headers)
+                response = connection.getresponse()
+                decoder = ContentDecoder.from_headers(response.msg)
+                if decoder is None:
+                    body = response.read()
+                    wire_bytes = len(body)
+                else:
+                    body = decoder.read(response)
+                    wire_bytes = decoder.wire_bytes
+            except (http_client.HTTPException, OSError, zlib.error) as e:
+                connection.close()
+                if reused:
+                    # The server closed an idle connection, retry on a new one
+                    continue
+                raise urllib_error.URLError(e)
+
+            if response.will_close:
+                connection.close()
+            else:
+                self.pool.put(key, connection)
+
+            return response.status, response.reason, response.msg, body, wire_bytes
+
+
+class AsyncConnection:
+    """Keep-alive connection of the asyncio transport, wrapping its stream reader and writer.
+
+    Like the sockets of open_url, the timeout applies to each operation on the connection, not to whole requests.
+    """
+
+    def __init__(self, reader, writer, timeout):
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+
+    @classmethod
+    async def open(cls, timeout, *args, **kwargs):
+        reader, writer = await with_timeout(
+            asyncio.open_connection(*args, **kwargs), timeout
+        )
+        return cls(reader, writer, timeout)
+
+    async def write(self, data):
+        self.writer.write(data)
+        await with_timeout(self.writer.drain(), self.timeout)
+
+    async def readline(self):
+        return await with_timeout(self.reader.readline(), self.timeout)
+
+    async def readexactly(self, size):
+        # Unlike StreamReader.readexactly(), the timeout applies to each part of the data received
+        parts = []
+        remaining = size
+        while remaining:
+            part = await self.read(remaining)
+            if not part:
+                raise asyncio.IncompleteReadError(b"".join(parts), size)
+            parts.append(part)
+            remaining -= len(part)
+        return b"".join(parts)
+
+    async def read(self, size):
+        return await with_timeout(self.reader.read(size), self.timeout)
+
+    def close(self):
+        self.writer.close()
+
+
+async def with_timeout(awaitable, timeout):
+    # Raise socket.timeout, as the sockets of open_url do, if awaitable doesn't complete within timeout seconds.
+    # Unlike asyncio.wait_for() before Python 3.12, never ignores the cancellation of the caller.
+    task = asyncio.ensure_future(awaitable)
+    try:
+        done, _pending = await asyncio.wait([task], timeout=timeout)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    if not done:
+        task.cancel()
+        raise socket.timeout("timed out")
+    return task.result()
+
+
+class AsyncHTTPTransport(HTTPTransport):
+    """HTTP transport sending every request from a single asyncio event loop.
+
+    The event loop runs in its own thread. Requests can be sent from any thread, either one at a time with open(),
+    or as a batch with open_many(), and at most max_concurrent_requests requests are in flight at the same time.
+    """
+
+    def __init__(
+        self,
+        max_concurrent_requests,
+        pool_size,
+        keepalive,
+        controller=None,
+        **open_url_kwargs,
+    ):
+        super(AsyncHTTPTransport, self).__init__(
+            pool_size, keepalive, **open_url_kwargs
+        )
+        self.loop = asyncio.new_event_loop()
+        self.max_concurrent_requests = max(max_concurrent_requests, 1)
+        self.in_flight = None
+        # RequestController retrying requests and limiting the requests in flight, instead of max_concurrent_requests
+        self.controller = controller
+        self._window_changed = None
+        self._thread = Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def open(self, url):
+        response = self.open_many([url])[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def open_many(self, urls):
+        # Returns a response, or the exception raised while requesting it, for each URL in the order of urls
+        return asyncio.run_coroutine_threadsafe(
+            self._open_many(urls), self.loop
+        ).result()
+
+    def close(self):
+        # Connections are closed on the event loop thread, before stopping it
+        self.loop.call_soon_threadsafe(super(AsyncHTTPTransport, self).close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    async def _open_many(self, urls):
+        # The semaphore and condition have to be created on the event loop they are used from
+        if self.in_flight is None:
+            self.in_flight = asyncio.Semaphore(self.max_concurrent_requests)
+            self._window_changed = asyncio.Condition()
+
+        return await asyncio.gather(
+            *(self._open(url) for url in urls), return_exceptions=True
+        )
+
+    async def _open(self, url):
+        if self.controller is not None:
+            return await self._open_controlled(url)
+
+        async with self.in_flight:
+            started = time.monotonic()
+            response = await self._open_following_redirects(url)
+            # Latency of the request, excluding the time spent waiting for max_concurrent_requests
+            response.elapsed = time.monotonic() - started
+            return response
+
+    async def _open_controlled(self, url):
+        # Wait for a place in the window of the controller, and retry the request as long as the controller allows
+        attempt = 0
+        while True:
+            async with self._window_changed:
+                ticket = await self._window_changed.wait_for(
+                    self.controller.try_acquire
+                )
+
+            started = time.monotonic()
+            try:
+                response = await self._open_following_redirects(url)
+            except Exception as e:
+                delay = self.controller.retry_delay(e, attempt)
+                await self._release(ticket, overloaded=delay is not None)
+                if delay is None:
+                    raise
+                self.controller.log_retry(url, e, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            response.elapsed = time.monotonic() - started
+            await self._release(ticket, latency=response.elapsed)
+            return response
+
+    async def _release(self, ticket, latency=None, overloaded=False):
+        self.controller.release(ticket, latency, overloaded)
+        async with self._window_changed:
+            self._window_changed.notify_all()
+
+    async def _open_following_redirects(self, url):
+        for _redirect in range(MAX_REDIRECTS + 1):
+            parsed_url = urlparse(url)
+
+            if self._uses_proxy(parsed_url):
+                # Proxies are only supported by open_url
+                return await self.loop.run_in_executor(
+                    None, partial(open_url, url, **self.open_url_kwargs)
+                )
+
+            status, reason, headers, body, wire_bytes = await self._request(parsed_url)
+
+            redirect_url = self._redirect_url(url, status, reason, headers, body)
+            if redirect_url is None:
+                return decoded_response(body, wire_bytes)
+            url = redirect_url
+
+        raise urllib_error.HTTPError(
+            url, status, "Too many redirects", headers, io.BytesIO(body)
+        )
+
+    async def _new_connection(self, parsed_url):
+        if parsed_url.scheme == "https":
+            return await AsyncConnection.open(
+                self.timeout,
+                parsed_url.hostname,
+                parsed_url.port or 443,
+                ssl=self.ssl_context,
+                server_hostname=parsed_url.hostname,
+            )
+        return await AsyncConnection.open(
+            self.timeout, parsed_url.hostname, parsed_url.port or 80
+        )
+
+    async def _request(self, parsed_url):
+        key = self._connection_key(parsed_url)
+
+        host = parsed_url.hostname
+        if parsed_url.port:
+            host += ":%s" % parsed_url.port
+        request_headers = dict(self.headers)
+        request_headers.setdefault("Host", host)
+        request = "GET %s HTTP/1.1\r\n" % self._request_path(parsed_url)
+        request += "".join(
+            "%s: %s\r\n" % (name, value) for name, value in request_headers.items()
+        )
+        request += "\r\n"
+
+        while True:
+            connection = self.pool.get(key)
+            reused = connection is not None
+            if not reused:
+                try:
+                    connection = await self._new_connection(parsed_url)
+                except OSError as e:
+                    raise urllib_error.URLError(e)
+
+            completed = False
+            try:
+                await connection.write(request.encode("latin-1"))
+                (
+                    status,
+                    reason,
+                    headers,
+                    body,
+                    wire_bytes,
+                    will_close,
+                ) = await self._read_response(connection)
+                completed = True
+            except (
+                http_client.HTTPException,
+                OSError,
+                asyncio.IncompleteReadError,
+                zlib.error,
+            ) as e:
+                if reused and not isinstance(e, socket.timeout):
+                    # The server closed an idle connection, retry on a new one
+                    continue
+                raise urllib_error.URLError(e)
+            finally:
+                if not completed:
+                    # The request failed, timed out or was cancelled, and the response may be partially read
+                    connection.close()
+
+            if will_close:
+                connection.close()
+            else:
+                self.pool.put(key, connection)
+
+            return status, reason, headers, body, wire_bytes
+
+    async def _read_response(self, connection):
+        status_line = await connection.readline()
+        if not status_line:
+            raise http_client.RemoteDisconnected(
+                "Remote end closed connection without response"
+            )
+
+        try:
+            http_version, status, reason = (
+                status_line.decode("latin-1").rstrip("\r\n").split(" ", 2) + [""]
+            )[:3]
+            status = int(status)
+        except ValueError:
+            raise http_client.BadStatusLine(status_line)
+
+        header_lines = []
+        while True:
+            line = await connection.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            header_lines.append(line.decode("latin-1"))
+        headers = email_parser.Parser(_class=http_client.HTTPMessage).parsestr(
+            "".join(header_lines)
+        )
+
+        will_close = (
+            http_version == "HTTP/1.0"
+            or headers.get("Connection", "").lower() == "close"
+        )
+
+        # Compressed bodies are decompressed as they are received
+        decoder = ContentDecoder.from_headers(headers)
+        chunks = []
+        wire_bytes = 0
+
+        def add_chunk(chunk):
+            chunks.append(chunk if decoder is None else decoder.decompress(chunk))
+
+        if headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                chunk_size = int((await connection.readline()).split(b";")[0], 16)
+                if chunk_size == 0:
+                    break
+                add_chunk(await connection.readexactly(chunk_size))
+                wire_bytes += chunk_size
+                await connection.readline()
+            # Skip trailers
+            while (await connection.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+        elif headers.get("Content-Length") is not None:
+            wire_bytes = int(headers["Content-Length"])
+            remaining = wire_bytes
+            while remaining:
+                chunk = await connection.readexactly(
+                    min(remaining, DECOMPRESS_BLOCK_SIZE)
+                )
+                remaining -= len(chunk)
+                add_chunk(chunk)
+        elif status in (204, 304) or 100 <= status < 200:
+            pass
+        else:
+            # Body is delimited by the server closing the connection
+            while True:
+                chunk = await connection.read(DECOMPRESS_BLOCK_SIZE)
+                if not chunk:
+                    break
+                wire_bytes += len(chunk)
+                add_chunk(chunk)
+            will_close = True
+
+        if decoder is not None:
+            chunks.append(decoder.flush())
+
+        return status, reason, headers, b"".join(chunks), wire_bytes, will_close
+
+
+class SharedRequests:
+    """Process-wide registry of the responses to requests sent to NetBox, shared by all inventory sources.
+
+    Requests with the same key - URL and credentials - in flight at the same time are only sent once, and
+    the other callers wait for its response. Responses are kept for ttl seconds, for the sources parsed next.
+    When the request fails, each waiting caller sends its own request.
+
+    Expired responses are dropped as soon as they expire, even when no more requests are sent once the inventory is
+    parsed, and the oldest responses are dropped when they take more than max_size bytes.
+    """
+
+    def __init__(self, max_size=SHARED_REQUESTS_MAX_SIZE):
+        self.max_size = max_size
+        self._lock = Lock()
+        # Requests in flight, and completed requests from the oldest to the most recent
+        self._flights = {}
+        self._completed = OrderedDict()
+        self._size = 0
+        self._next_expiry = None
+        self._purge_timer = None
+
+    def fetch(self, key, ttl, open_response):
+        # Return the response body of the request of key, calling open_response() if it has to be sent
+        with self._lock:
+            body = self._get(key, ttl)
+            if body is not None:
+                return body
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = SharedRequestFlight()
+
+        if not leader:
+            flight.wait()
+            if flight.body is not None:
+                return flight.body
+            return open_response().read()
+
+        try:
+            body = open_response().read()
+        except BaseException:
+            with self._lock:
+                del self._flights[key]
+            flight.set()
+            raise
+
+        flight.body = body
+        with self._lock:
+            del self._flights[key]
+            self._store(key, body, ttl)
+        flight.set()
+        return body
+
+    def get(self, key, ttl):
+        # Response body of a completed request of key, None if there is none
+        with self._lock:
+            return self._get(key, ttl)
+
+    def put(self, key, body, ttl):
+        with self._lock:
+            self._store(key, body, ttl)
+
+    def _get(self, key, ttl):
+        # Called with the lock held
+        now = time.monotonic()
+        self._purge(now)
+        response = self._completed.get(key)
+        if response is None or now - response.completed > ttl:
+            return None
+        return response.body
+
+    def _store(self, key, body, ttl):
+        # Called with the lock held
+        now = time.monotonic()
+        self._purge(now)
+        self._discard(key)
+        if len(body) > self.max_size:
+            return
+
+        response = self._completed[key] = SharedResponse(body, now, now + ttl)
+        self._size += len(body)
+        while self._size > self.max_size:
+            self._discard(next(iter(self._completed)))
+
+        if self._next_expiry is None or response.expires < self._next_expiry:
+            self._next_expiry = response.expires
+        self._schedule_purge()
+
+    def _discard(self, key):
+        # Called with the lock held
+        response = self._completed.pop(key, None)
+        if response is not None:
+            self._size -= len(response.body)
+
+    def _purge(self, now):
+        # Called with the lock held. Responses are only scanned once one of them has expired
+        if self._next_expiry is None or now < self._next_expiry:
+            return
+
+        for key, response in list(self._completed.items()):
+            if response.expires <= now:
+                self._discard(key)
+        self._next_expiry = min(
+            (response.expires for response in self._completed.values()), default=None
+        )
+
+    def _schedule_purge(self):
+        # Called with the lock held. Purge the responses when the next one expires
+        if self._next_expiry is None:
+            return
+        if self._purge_timer is not None:
+            if self._purge_timer.purge_at <= self._next_expiry:
+                return
+            self._purge_timer.cancel()
+
+        self._purge_timer = Timer(
+            max(self._next_expiry - time.monotonic(), 0), self._purge_expired
+        )
+        self._purge_timer.purge_at = self._next_expiry
+        self._purge_timer.daemon = True
+        self._purge_timer.start()
+
+    def _purge_expired(self):
+        with self._lock:
+            if self._purge_timer is not current_thread():
+                # Replaced by a timer purging earlier
+                return
+            self._purge_timer = None
+            self._purge(time.monotonic())
+            self._schedule_purge()
+
+
+class SharedRequestFlight(Event):
+    """Request of SharedRequests in flight, set once its response body is known or it failed."""
+
+    body = None
+
+
+class SharedResponse:
+    """Completed request of SharedRequests, with its response body."""
+
+    def __init__(self, body, completed, expires):
+        self.body = body
+        self.completed = completed
+        self.expires = expires
+
+
+SHARED_REQUESTS = SharedRequests()
+
+
+# Object type of the NetBox change log records, by path of the API endpoint listing the objects
+CHANGELOG_OBJECT_TYPES = {
+    "/api/dcim/devices/": "dcim.device",
+    "/api/dcim/interfaces/": "dcim.interface",
+    "/api/dcim/sites/": "dcim.site",
+    "/api/dcim/regions/": "dcim.region",
+    "/api/dcim/site-groups/": "dcim.sitegroup",
+    "/api/dcim/locations/": "dcim.location",
+    "/api/dcim/racks/": "dcim.rack",
+    "/api/dcim/rack-groups/": "dcim.rackgroup",
+    "/api/dcim/rack-roles/": "dcim.rackrole",
+    "/api/dcim/device-roles/": "dcim.devicerole",
+    "/api/dcim/device-types/": "dcim.devicetype",
+    "/api/dcim/manufacturers/": "dcim.manufacturer",
+    "/api/dcim/platforms/": "dcim.platform",
+    "/api/tenancy/tenants/": "tenancy.tenant",
+    "/api/tenancy/tenant-groups/": "tenancy.tenantgroup",
+    "/api/ipam/ip-addresses/": "ipam.ipaddress",
+    "/api/ipam/prefixes/": "ipam.prefix",
+    "/api/ipam/services/": "ipam.service",
+    "/api/virtualization/virtual-machines/": "virtualization.virtualmachine",
+    "/api/virtualization/interfaces/": "virtualization.vminterface",
+    "/api/virtualization/virtual-disks/": "virtualization.virtualdisk",
+    "/api/virtualization/clusters/": "virtualization.cluster",
+    "/api/virtualization/cluster-groups/": "virtualization.clustergroup",
+    "/api/virtualization/cluster-types/": "virtualization.clustertype",
+    "/api/dcim/virtual-chassis/": "dcim.virtualchassis",
+    "/api/extras/tags/": "extras.tag",
+    "/api/extras/config-templates/": "extras.configtemplate",
+}
+
+# Object types the fields computed by NetBox from other objects depend on, by object type of the listed objects.
+# Lists are fetched again in full when one of these objects changed, eg. sites for their prefix count
+CHANGELOG_DERIVED_FROM = {
+    "dcim.site": ("ipam.prefix",),
+}
+
+# Object types the config context rendered by NetBox for a host depends on, besides the objects embedded in the host:
+# config contexts, and the parents of the regions, site groups, locations and tenant groups they are assigned to
+CHANGELOG_CONFIG_CONTEXT_OBJECT_TYPES = (
+    "extras.configcontext",
+    "dcim.region",
+    "dcim.sitegroup",
+    "dcim.location",
+    "tenancy.tenantgroup",
+)
+
+CHANGELOG_SNAPSHOT_VERSION = 2
+
+# Lookups, and the host vars and group_by options they are used by, before pluralization
+LOOKUP_ATTRIBUTES = {
+    "refresh_sites_lookup": (
+        "site",
+        "region",
+        "site_group",
+        "location",
+        "time_zone",
+        "utc_offset",
+        "facility",
+    ),
+    "refresh_regions_lookup": ("region",),
+    "refresh_site_groups_lookup": ("site_group",),
+    "refresh_locations_lookup": ("location",),
+    "refresh_tenants_lookup": ("tenant",),
+    "refresh_device_roles_lookup": ("role",),
+    "refresh_platforms_lookup": ("platform",),
+    "refresh_device_types_lookup": ("device_type",),
+    "refresh_manufacturers_lookup": ("manufacturer",),
+    "refresh_clusters_lookup": ("cluster_group", "cluster_type"),
+    "refresh_racks_lookup": ("rack", "rack_role", "rack_group"),
+    "refresh_rack_groups_lookup": ("rack_group",),
+}
+
+# Lookups used to render config contexts, if option config_context_source is local
+CONFIG_CONTEXT_LOOKUPS = (
+    "refresh_sites_lookup",
+    "refresh_regions_lookup",
+    "refresh_site_groups_lookup",
+    "refresh_locations_lookup",
+    "refresh_tenants_lookup",
+    "refresh_clusters_lookup",
+)
+
+# Assignments of config contexts, and the field of the assigned objects compared to the host criteria
+CONFIG_CONTEXT_ASSIGNMENTS = {
+    "regions": "id",
+    "site_groups": "id",
+    "sites": "id",
+    "locations": "id",
+    "device_types": "id",
+    "roles": "id",
+    "platforms": "id",
+    "cluster_types": "slug",
+    "cluster_groups": "slug",
+    "clusters": "id",
+    "tenant_groups": "id",
+    "tenants": "id",
+    "tags": "slug",
+}
+
+# Version of the file format of options snapshot_export and snapshot_import
+OFFLINE_SNAPSHOT_VERSION = 1
+
+# Default MAX_PAGE_SIZE of NetBox, used by fetch_all auto to estimate the requests fetching all objects
+NETBOX_MAX_PAGE_SIZE = 1000
+
+# Special cases of host var names - all group_by options are single strings, but tag is a list of tags
+# Keep the groups named singular "tag_sometag", but host attribute should be "tags":["sometag", "someothertag"]
+HOST_VAR_NAMES = {
+    "tag": "tags",
+    "region": "regions",
+    "site_group": "site_groups",
+    "location": "locations",
+    "rack_group": "rack_groups",
+}
+
+
+class ObjectChanges(object):
+    """Objects changed since a NetBox change log record, by object type"""
+
+    def __init__(self):
+        # Ids of created and updated objects, and of the objects they are related to
+        self.changed = defaultdict(set)
+        # Ids of deleted objects
+        self.deleted = defaultdict(set)
+
+    def __bool__(self):
+        return bool(self.changed or self.deleted)
+
+    def add(self, change):
+        action = change["action"]
+        if isinstance(action, dict):
+            action = action["value"]
+
+        object_type = change["changed_object_type"]
+        if action == "delete":
+            self.deleted[object_type].add(change["changed_object_id"])
+        else:
+            self.changed[object_type].add(change["changed_object_id"])
+
+        # Eg. the device of an interface, whose interface count changed
+        if change.get("related_object_type") and change.get("related_object_id"):
+            self.changed[change["related_object_type"]].add(change["related_object_id"])
+
+    def includes(self, object_types):
+        # Whether objects of one of object_types were changed or deleted
+        return any(
+            object_type in self.changed or object_type in self.deleted
+            for object_type in object_types
+        )
+
+    def __contains__(self, url):
+        # Whether url is the API URL of a changed or deleted object
+        segments = urlparse(url).path.rstrip("/").split("/")
+        if len(segments) < 4 or not segments[-1].isdigit():
+            return False
+
+        object_type = CHANGELOG_OBJECT_TYPES.get("/%s/" % "/".join(segments[-4:-1]))
+        object_id = int(segments[-1])
+        return object_id in self.changed.get(
+            object_type, ()
+        ) or object_id in self.deleted.get(object_type, ())
+
+    def references(self, resource):
+        # Whether resource embeds one of the changed or deleted objects, eg. the site of a device
+        stack = [value for key, value in resource.items() if key != "url"]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, dict):
+                if value.get("url") and value["url"] in self:
+                    return True
+                stack.extend(value.values())
+            elif isinstance(value, list):
+                stack.extend(value)
+
+        return False
+
+
+class FetchStats(object):
+    """Wall time of the phases of the inventory, and statistics of requests to each NetBox endpoint"""
+
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self, api_endpoint):
+        self.base_path = urlparse(api_endpoint).path
+        self.lock = Lock()
+        self.phases = {}
+        self.endpoints = defaultdict(
+            lambda: {
+                "requests": 0,
+                "bytes": 0,
+                "shared": 0,
+                "snapshot": 0,
+                "cache_hits": 0,
+                "cache_misses": 0,
+                "latencies": [],
+            }
+        )
+
+    def _endpoint(self, url):
+        path = urlparse(url).path
+        if self.base_path and path.startswith(self.base_path):
+            path = path[len(self.base_path) :]  # noqa: E203
+        if not path.endswith("/"):
+            path += "/"
+
+        return path
+
+    def record_phase(self, name, seconds):
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0) + seconds
+
+    def run_phase(self, name, function, *args, **kwargs):
+        started = time.monotonic()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.record_phase(name, time.monotonic() - started)
+
+    def record_request(self, url, size, latency=None):
+        with self.lock:
+            endpoint = self.endpoints[self._endpoint(url)]
+            endpoint["requests"] += 1
+            endpoint["bytes"] += size
+            if latency is not None:
+                endpoint["latencies"].append(latency)
+
+    def record_shared(self, url):
+        # Response to another request of url, see option shared_requests
+        with self.lock:
+            self.endpoints[self._endpoint(url)]["shared"] += 1
+
+    def record_snapshot(self, url):
+        # List of url taken from a snapshot, see options changelog_refresh and snapshot_import
+        with self.lock:
+            self.endpoints[self._endpoint(url)]["snapshot"] += 1
+
+    def record_cache(self, url, hit):
+        with self.lock:
+            self.endpoints[self._endpoint(url)][
+                "cache_hits" if hit else "cache_misses"
+            ] += 1
+
+    @classmethod
+    def percentiles(cls, latencies):
+        # Nearest-rank percentiles, and the maximum
+        latencies = sorted(latencies)
+        if not latencies:
+            return {}
+
+        result = dict(
+            (
+                "p%s" % percentile,
+                latencies[
+                    max(int(math.ceil(percentile / 100.0 * len(latencies))) - 1, 0)
+                ],
+            )
+            for percentile in cls.PERCENTILES
+        )
+        result["max"] = latencies[-1]
+        return result
+
+    def to_dict(self):
+        with self.lock:
+            endpoints = dict(
+                (
+                    path,
+                    dict(
+                        [
+                            (key, value)
+                            for key, value in stats.items()
+                            if key != "latencies"
+                        ]
+                        + [("latency", self.percentiles(stats["latencies"]))]
+                    ),
+                )
+                for path, stats in sorted(self.endpoints.items())
+            )
+            all_latencies = list(
+                chain.from_iterable(
+                    stats["latencies"] for stats in self.endpoints.values()
+                )
+            )
+            phases = dict(self.phases)
+
+        total = dict(
+            (key, sum(stats[key] for stats in endpoints.values()))
+            for key in (
+                "requests",
+                "bytes",
+                "shared",
+                "snapshot",
+                "cache_hits",
+                "cache_misses",
+            )
+        )
+        total["latency"] = self.percentiles(all_latencies)
+
+        return {"phases": phases, "endpoints": endpoints, "total": total}
+
+    def report(self):
+        # Lines of the report displayed to the user
+        stats = self.to_dict()
+
+        def latency(percentiles):
+            return " ".join(
+                "%s %.3fs" % (name, percentiles[name])
+                for name in ["p%s" % p for p in self.PERCENTILES] + ["max"]
+                if name in percentiles
+            )
+
+        lines = ["NetBox inventory statistics", "Phases (wall time):"]
+        for name, seconds in sorted(
+            stats["phases"].items(), key=lambda item: item[1], reverse=True
+        ):
+            lines.append("  %-40s %9.3fs" % (name, seconds))
+
+        lines.append(
+            "Endpoints (requests, bytes received, shared, snapshot, cache hits/misses, latency):"
+        )
+        for path, endpoint in list(stats["endpoints"].items()) + [
+            ("total", stats["total"])
+        ]:
+            lines.append(
+                "  %-40s %6d %14s %6d %6d %6d/%-6d %s"
+                % (
+                    path,
+                    endpoint["requests"],
+                    "{0:,}".format(endpoint["bytes"]),
+                    endpoint["shared"],
+                    endpoint["snapshot"],
+                    endpoint["cache_hits"],
+                    endpoint["cache_misses"],
+                    latency(endpoint["latency"]),
+                )
+            )
+
+        return [line.rstrip() for line in lines]
+
+
+class CacheCodec(object):
+    """Compact and compressed encoding of the values stored in the inventory cache"""
+
+    MARKER = "__nb_inventory_cache_codec__"
+    REFERENCE = "$ref"
+
+    @classmethod
+    def encode(cls, value):
+        objects = []
+        try:
+            value = cls._deduplicate(value, objects, {}, nested=False)
+        except ValueError:
+            # The data uses the reference key itself, store it without deduplication
+            objects = []
+
+        payload = json.dumps(
+            {"objects": objects, "value": value}, separators=(",", ":")
+        )
+        return {
+            cls.MARKER: "zlib",
+            "data": to_text(base64.b64encode(zlib.compress(to_bytes(payload)))),
+        }
+
+    @classmethod
+    def _deduplicate(cls, value, objects, index, nested):
+        # Replace nested objects having a "url" by a reference to a single copy in objects
+        if isinstance(value, list):
+            return [cls._deduplicate(item, objects, index, True) for item in value]
+
+        if not isinstance(value, dict):
+            return value
+
+        if cls.REFERENCE in value:
+            raise ValueError(cls.REFERENCE)
+
+        value = dict(
+            (key, cls._deduplicate(item, objects, index, True))
+            for key, item in value.items()
+        )
+        if not nested or "url" not in value:
+            return value
+
+        key = json.dumps(value, sort_keys=True, separators=(",", ":"))
+        if key not in index:
+            index[key] = len(objects)
+            objects.append(value)
+
+        return {cls.REFERENCE: index[key]}
+
+    @classmethod
+    def decode(cls, value):
+        if not isinstance(value, dict) or value.get(cls.MARKER) != "zlib":
+            # Not encoded
+            return value
+
+        payload = json.loads(to_text(zlib.decompress(base64.b64decode(value["data"]))))
+
+        if not payload["objects"]:
+            # Nothing was deduplicated
+            return payload["value"]
+
+        # Objects only reference objects stored before them, and are shared by all their references
+        objects = []
+        for obj in payload["objects"]:
+            objects.append(cls._resolve(obj, objects))
+
+        return cls._resolve(payload["value"], objects)
+
+    @classmethod
+    def _resolve(cls, value, objects):
+        if isinstance(value, list):
+            return [cls._resolve(item, objects) for item in value]
+
+        if not isinstance(value, dict):
+            return value
+
+        if len(value) == 1 and cls.REFERENCE in value:
+            return objects[value[cls.REFERENCE]]
+
+        return dict((key, cls._resolve(item, objects)) for key, item in value.items())
+
+
+class InventoryModelRecorder(object):
+    """Inventory proxy recording the changes made to the inventory, to replay them from the cache"""
+
+    RECORDED_METHODS = ("add_group", "add_host", "add_child", "set_variable")
+
+    def __init__(self, inventory):
+        self.inventory = inventory
+        self.calls = []
+
+    def __getattr__(self, name):
+        attribute = getattr(self.inventory, name)
+        if name not in self.RECORDED_METHODS:
+            return attribute
+
+        def record(*args, **kwargs):
+            self.calls.append([name, list(args), kwargs])
+            return attribute(*args, **kwargs)
+
+        return record
+
+    @staticmethod
+    def replay(inventory, calls):
+        for name, args, kwargs in calls:
+            getattr(inventory, name)(*args, **kwargs)
+
 
 class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
     NAME = "netbox.netbox.nb_inventory"
 
-    def _fetch_information(self, url):
-        results = None
+    def _cache_get(self, cache_key):
+        return CacheCodec.decode(self._cache[cache_key])
+
+    def _cache_set(self, cache_key, value):
+        if self.get_option("cache_codec") == "zlib":
+            value = CacheCodec.encode(value)
+
+        self._cache[cache_key] = value
+
+    def _read_cache(self, url):
+        # Returns the cached results for url, and whether url needs to be fetched
         cache_key = self.get_cache_key(url)
 
         # get the user's cache option to see if we should save the cache if it is changing
@@ -440,63 +2072,285 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         # attempt to read the cache if inventory isn't being refreshed and the user has caching enabled
         if attempt_to_read_cache:
             try:
-                results = self._cache[cache_key]
-                need_to_fetch = False
+                results = self._cache_get(cache_key)
             except KeyError:
                 # occurs if the cache_key is not in the cache or if the cache_key expired
                 # we need to fetch the URL now
-                need_to_fetch = True
+                if self.fetch_stats is not None:
+                    self.fetch_stats.record_cache(url, hit=False)
+                return None, True
+
+            if self.fetch_stats is not None:
+                self.fetch_stats.record_cache(url, hit=True)
+            return results, False
+
+        # not reading from cache so do fetch
+        return None, True
+
+    def _load_response(self, url, response, use_cache=True, started=None):
+        # Load the JSON payload of a response, or handle the HTTPError raised when requesting url
+        # started is the time the request was sent, for fetch_stats
+        if isinstance(response, urllib_error.HTTPError):
+            if self.fetch_stats is not None:
+                self.fetch_stats.record_request(url, 0)
+
+            """This will return the response body when we encounter an error.
+            This is to help determine what might be the issue when encountering an error.
+            Please check issue #294 for more info.
+            """
+            # Prevent inventory from failing completely if the token does not have the proper permissions for specific URLs
+            if response.code == 403:
+                self.display.display(
+                    "Permission denied: {0}. This may impair functionality of the"
+                    " inventory plugin.".format(url),
+                    color="red",
+                )
+                # Need to return mock response data that is empty to prevent any failures downstream
+                return {"results": [], "next": None}
+
+            raise AnsibleError(to_native(response.fp.read()))
+
+        raw_bytes = response.read()
+        if self.fetch_stats is not None:
+            if getattr(response, "shared", False):
+                self.fetch_stats.record_shared(url)
+            else:
+                latency = getattr(response, "elapsed", None)
+                if started is not None:
+                    latency = time.monotonic() - started
+                # Size of the body received, before decompression
+                wire_bytes = getattr(response, "wire_bytes", None)
+                self.fetch_stats.record_request(
+                    url, len(raw_bytes) if wire_bytes is None else wire_bytes, latency
+                )
+
+        try:
+            raw_data = to_text(raw_bytes, errors="surrogate_or_strict")
+        except UnicodeError:
+            raise AnsibleError("Incorrect encoding of fetched payload from NetBox API.")
+
+        try:
+            results = self.loader.load(raw_data, json_only=True)
+        except ValueError:
+            raise AnsibleError("Incorrect JSON payload: %s" % raw_data)
+
+        # put result in cache if enabled
+        if use_cache and self.get_option("cache"):
+            self._cache_set(self.get_cache_key(url), results)
+
+        return results
+
+    def _fetch_information(self, url, use_cache=True):
+        if use_cache:
+            results, need_to_fetch = self._read_cache(url)
         else:
-            # not reading from cache so do fetch
-            need_to_fetch = True
+            results, need_to_fetch = None, True
 
         if need_to_fetch:
             self.display.v("Fetching: " + url)
+            started = time.monotonic()
             try:
-                response = open_url(
-                    url,
-                    headers=self.headers,
-                    timeout=self.timeout,
-                    validate_certs=self.validate_certs,
-                    follow_redirects=self.follow_redirects,
-                    client_cert=self.cert,
-                    client_key=self.key,
-                    ca_path=self.ca_path,
-                )
+                response = self._open_url(url)
             except urllib_error.HTTPError as e:
-                """This will return the response body when we encounter an error.
-                This is to help determine what might be the issue when encountering an error.
-                Please check issue #294 for more info.
-                """
-                # Prevent inventory from failing completely if the token does not have the proper permissions for specific URLs
-                if e.code == 403:
-                    self.display.display(
-                        "Permission denied: {0}. This may impair functionality of the"
-                        " inventory plugin.".format(url),
-                        color="red",
-                    )
-                    # Need to return mock response data that is empty to prevent any failures downstream
-                    return {"results": [], "next": None}
+                response = e
 
-                raise AnsibleError(to_native(e.fp.read()))
+            results = self._load_response(
+                url, response, use_cache=use_cache, started=started
+            )
+
+        return results
+
+    def _fetch_information_many(self, urls, max_workers, use_cache=True):
+        # Fetch several URLs, and return their results in the order of urls
+        if self.fetch_engine != "asyncio":
+            return self._map_concurrently(
+                partial(self._fetch_information, use_cache=use_cache), urls, max_workers
+            )
+
+        # The asyncio engine sends all requests missing from the cache at once on its event loop,
+        # the number of requests in flight is limited by max_concurrent_requests
+        if use_cache:
+            cached = [self._read_cache(url) for url in urls]
+        else:
+            cached = [(None, True)] * len(urls)
+        missing_urls = [url for url, (_results, need) in zip(urls, cached) if need]
+
+        responses = {}
+        if self.shared_requests:
+            # Responses of other sources are used as is, the responses of this batch are shared once received
+            for url in missing_urls:
+                body = SHARED_REQUESTS.get(
+                    self._shared_request_key(url), self.shared_requests_ttl
+                )
+                if body is not None:
+                    responses[url] = decoded_response(body, shared=True)
+            missing_urls = [url for url in missing_urls if url not in responses]
+
+        for url in missing_urls:
+            self.display.v("Fetching: " + url)
+        for url, response in zip(
+            missing_urls, self.http_transport.open_many(missing_urls)
+        ):
+            if not isinstance(response, Exception):
+                try:
+                    response = self._decode_response(response)
+                except urllib_error.URLError as e:
+                    response = e
+            if self.shared_requests and not isinstance(response, Exception):
+                body = response.read()
+                SHARED_REQUESTS.put(
+                    self._shared_request_key(url), body, self.shared_requests_ttl
+                )
+                response = decoded_response(body, getattr(response, "wire_bytes", None))
+            responses[url] = response
+
+        results = []
+        for url, (cached_results, need_to_fetch) in zip(urls, cached):
+            if need_to_fetch:
+                response = responses[url]
+                if isinstance(response, Exception) and not isinstance(
+                    response, urllib_error.HTTPError
+                ):
+                    raise response
+                cached_results = self._load_response(url, response, use_cache=use_cache)
+            results.append(cached_results)
+
+        return results
+
+    @property
+    def _open_url_kwargs(self):
+        kwargs = dict(
+            headers=self.headers,
+            timeout=self.timeout,
+            validate_certs=self.validate_certs,
+            follow_redirects=self.follow_redirects,
+            client_cert=self.cert,
+            client_key=self.key,
+            ca_path=self.ca_path,
+        )
+        if self.compression:
+            # Responses are decompressed by _decode_response, whatever their encoding
+            kwargs["decompress"] = False
+
+        return kwargs
+
+    def _shared_request_key(self, url):
+        # Responses are only shared between sources using the same credentials
+        credentials = json.dumps(
+            [
+                sorted(self.headers.items()),
+                self.cert,
+                self.key,
+                self.ca_path,
+                self.validate_certs,
+            ],
+            default=str,
+        )
+        return url, hashlib.sha1(to_bytes(credentials)).hexdigest()
+
+    def _open_url(self, url):
+        if self.offline_snapshot_import:
+            raise AnsibleError(
+                "%s is not in the snapshot %s, it must be exported with the same options fetching data"
+                % (url, self.get_option("snapshot_import"))
+            )
 
+        if self.shared_requests:
+            # Shared responses are decompressed, the response of the request sent by this call keeps its size
+            sent = []
+
+            def open_response():
+                response = self._open_url_controlled(url)
+                sent.append(response)
+                return response
+
+            body = SHARED_REQUESTS.fetch(
+                self._shared_request_key(url), self.shared_requests_ttl, open_response
+            )
+            if sent:
+                return decoded_response(body, getattr(sent[0], "wire_bytes", None))
+            return decoded_response(body, shared=True)
+
+        return self._open_url_controlled(url)
+
+    def _open_url_controlled(self, url):
+        controller = getattr(self, "request_controller", None)
+        if controller is None or self.fetch_engine == "asyncio":
+            # The asyncio transport uses the controller on its event loop
+            return self._send_request(url)
+
+        attempt = 0
+        while True:
+            ticket = controller.acquire()
+            started = time.monotonic()
             try:
-                raw_data = to_text(response.read(), errors="surrogate_or_strict")
-            except UnicodeError:
-                raise AnsibleError(
-                    "Incorrect encoding of fetched payload from NetBox API."
+                response = self._send_request(url)
+            except Exception as e:
+                delay = controller.retry_delay(e, attempt)
+                controller.release(ticket, overloaded=delay is not None)
+                if delay is None:
+                    raise
+                controller.log_retry(url, e, delay)
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            controller.release(ticket, latency=time.monotonic() - started)
+            return response
+
+    def _send_request(self, url):
+        if getattr(self, "http_transport", None) is not None:
+            response = self.http_transport.open(url)
+        else:
+            try:
+                response = open_url(url, **self._open_url_kwargs)
+            except urllib_error.HTTPError as e:
+                if not self.compression or not e.headers.get("Content-Encoding"):
+                    raise
+                # The body of errors is displayed, decompress it as well
+                raise urllib_error.HTTPError(
+                    e.url, e.code, e.msg, e.headers, self._decode_response(e)
                 )
 
+        return self._decode_response(response)
+
+    def _decode_response(self, response):
+        # Decompress the response of open_url, and count the bytes received if option compression is enabled
+        # Transports return decompressed responses, with the size of the body received as wire_bytes
+        if not self.compression:
+            return response
+
+        if getattr(response, "wire_bytes", None) is None:
             try:
-                results = self.loader.load(raw_data, json_only=True)
-            except ValueError:
-                raise AnsibleError("Incorrect JSON payload: %s" % raw_data)
+                decoder = ContentDecoder.from_headers(response.headers)
+                if decoder is None:
+                    response = decoded_response(response.read())
+                else:
+                    response = decoded_response(
+                        decoder.read(response), decoder.wire_bytes
+                    )
+            except (http_client.HTTPException, zlib.error) as e:
+                raise urllib_error.URLError(e)
 
-            # put result in cache if enabled
-            if user_cache_setting:
-                self._cache[cache_key] = results
+        with self._transfer_lock:
+            self._transfer_bytes[0] += response.wire_bytes
+            self._transfer_bytes[1] += len(response.getvalue())
 
-        return results
+        return response
+
+    def _report_transfer(self):
+        wire_bytes, decompressed_bytes = self._transfer_bytes
+        if not decompressed_bytes:
+            return
+
+        self.display.v(
+            "Received %s bytes from NetBox, %s bytes decompressed, %.1f%% saved by compression"
+            % (
+                "{0:,}".format(wire_bytes),
+                "{0:,}".format(decompressed_bytes),
+                100.0 * (decompressed_bytes - wire_bytes) / decompressed_bytes,
+            )
+        )
 
     def get_resource_list(self, api_url):
         """Retrieves resource list from netbox API.
@@ -506,56 +2360,585 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         if not api_url:
             raise AnsibleError("Please check API URL in script configuration file.")
 
+        if self.offline_snapshot_import:
+            resources = self._offline_snapshot_get("lists", api_url)
+            if self.fetch_stats is not None:
+                self.fetch_stats.record_snapshot(api_url)
+            return resources
+
+        if self.changelog_refresh:
+            resources = self._get_resource_list_from_snapshot(api_url)
+        else:
+            resources = self._collect_pages(self._pop_first_page(api_url))
+
+        self._offline_snapshot_put("lists", api_url, resources)
+        return resources
+
+    def _fetch_resource_list_uncached(self, api_url):
+        # Resources of all pages of api_url, always fetched from NetBox
+        return self._collect_pages(
+            self._fetch_information(api_url, use_cache=False), use_cache=False
+        )
+
+    @property
+    def changelog_snapshot_path(self):
+        path = self.get_option("changelog_snapshot_path")
+        if path:
+            return path
+
+        # Snapshots of different NetBox instances and tokens are kept apart
+        key = hashlib.sha1(
+            to_bytes(self.api_endpoint + self.headers.get("Authorization", ""))
+        ).hexdigest()
+        tmp_dir = os.path.split(DEFAULT_LOCAL_TMP)[0]
+        return os.path.join(tmp_dir, "netbox_changelog_%s.json" % key[:16])
+
+    def _load_changelog_snapshot(self):
+        # Returns the snapshot saved by the previous run, or None if it can't be used
+        try:
+            with open(self.changelog_snapshot_path) as file:
+                snapshot = json.load(file)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if (
+            not isinstance(snapshot, dict)
+            or snapshot.get("version") != CHANGELOG_SNAPSHOT_VERSION
+            or snapshot.get("api_endpoint") != self.api_endpoint
+            or snapshot.get("api_version") != str(self.api_version)
+        ):
+            return None
+
+        age = time.time() - snapshot.get("timestamp", 0)
+        if age > self.get_option("changelog_snapshot_max_age"):
+            self.display.v("Changelog snapshot expired, fetching everything")
+            return None
+
+        return snapshot
+
+    def _save_changelog_snapshot(self):
+        path = self.changelog_snapshot_path
+        snapshot = {
+            "version": CHANGELOG_SNAPSHOT_VERSION,
+            "api_endpoint": self.api_endpoint,
+            "api_version": str(self.api_version),
+            "timestamp": self._changelog_timestamp,
+            "last_change_id": self._changelog_last_change_id,
+            "lists": self._changelog_lists,
+            "chunks": self._changelog_chunks,
+        }
+
+        try:
+            self._write_private_json(path, snapshot)
+        except (IOError, OSError) as e:
+            self.display.warning(
+                "Unable to save changelog snapshot %s: %s" % (path, to_native(e))
+            )
+
+    @staticmethod
+    def _write_private_json(path, data):
+        # Write to a temporary file readable only by its owner, then move it in place
+        tmp_path = "%s.%s.tmp" % (path, uuid.uuid4().hex)
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "w") as file:
+                json.dump(data, file, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except (IOError, OSError):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _offline_snapshot_key(self, url):
+        # URLs are stored relative to api_endpoint
+        if url.startswith(self.api_endpoint):
+            return url[len(self.api_endpoint) :]  # noqa: E203
+        return url
+
+    def _offline_snapshot_get(self, kind, url):
+        try:
+            return self.offline_snapshot[kind][self._offline_snapshot_key(url)]
+        except KeyError:
+            raise AnsibleError(
+                "%s is not in the snapshot %s, it must be exported with the same options fetching data"
+                % (url, self.get_option("snapshot_import"))
+            )
+
+    def _offline_snapshot_put(self, kind, url, value):
+        if self.offline_snapshot is not None and not self.offline_snapshot_import:
+            self.offline_snapshot[kind][self._offline_snapshot_key(url)] = value
+
+    def _load_offline_snapshot(self, path):
+        try:
+            with open(path) as file:
+                snapshot = CacheCodec.decode(json.load(file))
+        except (IOError, OSError, ValueError) as e:
+            raise AnsibleError("Unable to load snapshot %s: %s" % (path, to_native(e)))
+
+        if (
+            not isinstance(snapshot, dict)
+            or snapshot.get("version") != OFFLINE_SNAPSHOT_VERSION
+        ):
+            raise AnsibleError("Unsupported snapshot %s" % path)
+
+        return snapshot
+
+    def _save_offline_snapshot(self):
+        path = self.get_option("snapshot_export")
+        try:
+            self._write_private_json(path, CacheCodec.encode(self.offline_snapshot))
+        except (IOError, OSError) as e:
+            raise AnsibleError("Unable to save snapshot %s: %s" % (path, to_native(e)))
+
+    def _read_object_changes(self):
+        # Read the changes made since the snapshot of the previous run from the NetBox change log
+        if self.api_version >= version.parse("4.1"):
+            url = self.api_endpoint + "/api/core/object-changes/"
+        else:
+            url = self.api_endpoint + "/api/extras/object-changes/"
+
+        changes = ObjectChanges()
+        self._changelog_timestamp = time.time()
+        latest = self._fetch_information(url + "?limit=1&ordering=-id", use_cache=False)
+        if "count" not in latest:
+            # The token is not allowed to read the change log
+            self.display.warning(
+                "Unable to read the NetBox change log, changelog_refresh is disabled"
+            )
+            self.changelog_refresh = False
+            return changes
+
+        # Changes made while the inventory is fetched are read again on the next run
+        self._changelog_last_change_id = (
+            latest["results"][0]["id"] if latest["results"] else 0
+        )
+
+        snapshot = self._load_changelog_snapshot()
+        if (
+            snapshot is None
+            or snapshot["last_change_id"] > self._changelog_last_change_id
+        ):
+            return changes
+
+        self._changelog_previous_lists = snapshot["lists"]
+        self._changelog_previous_chunks = snapshot["chunks"]
+        if self._changelog_last_change_id > snapshot["last_change_id"]:
+            records = self._fetch_resource_list_uncached(
+                url
+                + "?limit=0&id__gt=%d&id__lte=%d"
+                % (snapshot["last_change_id"], self._changelog_last_change_id)
+            )
+            for record in records:
+                changes.add(record)
+            self.display.v(
+                "Applying %d changes from the NetBox change log" % len(records)
+            )
+
+        return changes
+
+    def _get_object_changes(self):
+        # The change log is read once, by the first resource list fetched
+        with self._changelog_lock:
+            if self._object_changes is None:
+                self._object_changes = self._read_object_changes()
+
+            return self._object_changes
+
+    def _changelog_object_type(self, api_url):
+        # Object type of the resources listed by api_url, if they are tracked by the change log
+        path = urlparse(api_url).path
+        base_path = urlparse(self.api_endpoint).path
+        if base_path and path.startswith(base_path):
+            path = path[len(base_path) :]  # noqa: E203
+        if not path.endswith("/"):
+            path += "/"
+
+        return CHANGELOG_OBJECT_TYPES.get(path)
+
+    def _changelog_derived_from(self, object_type):
+        # Object types the fields computed by NetBox for the resources of object_type depend on
+        derived_from = CHANGELOG_DERIVED_FROM.get(object_type, ())
+        if (
+            object_type in ("dcim.device", "virtualization.virtualmachine")
+            and self.config_context
+            and not self.local_config_context
+        ):
+            derived_from += CHANGELOG_CONFIG_CONTEXT_OBJECT_TYPES
+
+        return derived_from
+
+    def _get_resource_list_from_snapshot(self, api_url):
+        changes = self._get_object_changes()
+        object_type = self._changelog_object_type(api_url)
+        if not self.changelog_refresh or object_type is None:
+            return self._collect_pages(self._fetch_information(api_url))
+
+        previous = self._changelog_previous_lists.get(api_url)
+        if (
+            previous is None
+            or previous["object_type"] != object_type
+            or changes.includes(self._changelog_derived_from(object_type))
+        ):
+            # The list is saved with the id of the last change, it can't come from responses cached before that change
+            resources = self._collect_pages(
+                self._pop_first_page(api_url, use_cache=False), use_cache=False
+            )
+        else:
+            if self.fetch_stats is not None:
+                self.fetch_stats.record_snapshot(api_url)
+            resources = self._apply_object_changes(
+                api_url, object_type, previous["results"], changes
+            )
+
+        with self._changelog_lock:
+            self._changelog_lists[api_url] = {
+                "object_type": object_type,
+                "results": resources,
+            }
+
+        return resources
+
+    def _apply_object_changes(self, api_url, object_type, resources, changes):
+        # Apply changes to the resources listed by api_url in the previous snapshot
+        deleted = changes.deleted.get(object_type, set())
+        changed = set(changes.changed.get(object_type, ()))
+        if changes:
+            # Resources embedding a changed object, eg. the devices of a renamed site
+            changed.update(
+                resource["id"] for resource in resources if changes.references(resource)
+            )
+        changed -= deleted
+
+        if not changed and not deleted:
+            return resources
+
+        # Fetch changed and created resources again, with the query filters of api_url
+        refetched = {}
+        if changed:
+            chunks = self._map_concurrently(
+                self._fetch_resource_list_uncached,
+                self._chunked_urls(api_url, "id", sorted(changed)),
+                self.chunk_fetch_workers,
+            )
+            for resource in chain.from_iterable(chunks):
+                refetched[resource["id"]] = resource
+
+        updated = []
+        for resource in resources:
+            if resource["id"] in changed or resource["id"] in deleted:
+                # Resources no longer matching the query filters are removed
+                resource = refetched.pop(resource["id"], None)
+                if resource is None:
+                    continue
+            updated.append(resource)
+
+        # Created resources, and resources now matching the query filters
+        updated.extend(refetched.values())
+
+        return updated
+
+    def _collect_pages(self, api_output, use_cache=True):
+        # Returns the resources of the first page api_output, followed by the resources of all the following pages
         resources = []
+        resources.extend(api_output["results"])
+
+        # Fetch the remaining pages concurrently when the page count is known
+        page_urls = self._remaining_page_urls(api_output)
+        if page_urls:
+            pages = self._fetch_information_many(
+                page_urls, self.page_fetch_workers, use_cache=use_cache
+            )
+            for page in pages:
+                resources.extend(page["results"])
+
+            return resources
 
         # Handle pagination
+        api_url = api_output["next"]
         while api_url:
-            api_output = self._fetch_information(api_url)
+            api_output = self._fetch_information(api_url, use_cache=use_cache)
             resources.extend(api_output["results"])
             api_url = api_output["next"]
 
         return resources
 
-    def get_resource_list_chunked(self, api_url, query_key, query_values):
-        # Make an API call for multiple specific IDs, like /api/ipam/ip-addresses?limit=0&device_id=1&device_id=2&device_id=3
-        # Drastically cuts down HTTP requests comnpared to 1 request per host, in the case where we don't want to fetch_all
+    def _remaining_page_urls(self, api_output):
+        # Build the URLs of all pages after the first one, from the "next" link and the total "count"
+        # eg. /api/dcim/interfaces/?limit=1000&offset=1000, /api/dcim/interfaces/?limit=1000&offset=2000, ...
+        if self.page_fetch_workers <= 1 and self.fetch_engine != "asyncio":
+            return None
+
+        next_url = api_output.get("next")
+        count = api_output.get("count")
+        if not next_url or count is None:
+            return None
+
+        parsed_url = urlparse(next_url)
+        query = parse_qsl(parsed_url.query, keep_blank_values=True)
+        query_params = dict(query)
+        try:
+            limit = int(query_params["limit"])
+            offset = int(query_params["offset"])
+        except (KeyError, ValueError):
+            return None
+
+        if limit < 1:
+            return None
+
+        page_urls = []
+        for page_offset in range(offset, count, limit):
+            page_query = [
+                (key, page_offset if key == "offset" else value) for key, value in query
+            ]
+            page_urls.append(parsed_url._replace(query=urlencode(page_query)).geturl())
+
+        return page_urls
+
+    def _map_concurrently(self, function, items, max_workers):
+        # Call function for each item on a bounded pool of threads, and return the results in the order of items
+        # Exceptions raised by function are raised again in the calling thread
+        items = list(items)
+        if max_workers <= 1 or len(items) <= 1:
+            return [function(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+            return list(executor.map(function, items))
+
+    def _chunked_urls(self, api_url, query_key, query_values):
+        # URLs querying api_url for each of query_values, as few as possible within max_uri_length
+        return [
+            self._chunk_url(api_url, query_key, chunk)
+            for chunk in self._chunked_query_values(api_url, query_key, query_values)
+        ]
+
+    @staticmethod
+    def _chunk_url(api_url, query_key, chunk):
+        # URL querying api_url for each value of chunk
+        url = api_url
+        for value in chunk:
+            url += ("&" if "?" in url else "?") + query_key + "=" + str(value)
+
+        return url
+
+    def _chunked_query_values(self, api_url, query_key, query_values):
+        # Split query_values in chunks, as few as possible with URLs querying api_url within max_uri_length
 
         # Make sure query_values is subscriptable
         if not isinstance(query_values, list):
             query_values = list(query_values)
 
-        def query_string(value, separator="&"):
-            return separator + query_key + "=" + str(value)
+        def query_string(value, separator="&"):
+            return separator + query_key + "=" + str(value)
+
+        # Calculate how many queries we can do per API call to stay within max_url_length
+        largest_value = str(max(query_values, default=0))  # values are always id ints
+        length_per_value = len(query_string(largest_value))
+        chunk_size = math.floor((self.max_uri_length - len(api_url)) / length_per_value)
+
+        # Sanity check, for case where max_uri_length < (api_url + length_per_value)
+        if chunk_size < 1:
+            chunk_size = 1
+
+        if self.api_version in specifiers.SpecifierSet("~=2.6.0"):
+            # Issue netbox-community/netbox#3507 was fixed in v2.7.5
+            # If using NetBox v2.7.0-v2.7.4 will have to manually set max_uri_length to 0,
+            # but it's probably faster to keep fetch_all: true
+            # (You should really just upgrade your NetBox install)
+            chunk_size = 1
+
+        return [
+            query_values[i : i + chunk_size]  # noqa: E203
+            for i in range(0, len(query_values), chunk_size)
+        ]
+
+    @staticmethod
+    def _hosts_with_related(hosts_lookup, count_field):
+        # Ids of the hosts of hosts_lookup that have related objects according to their count_field counter
+        # Hosts without the counter, from older NetBox versions, are kept
+        return [
+            host_id
+            for host_id, host in hosts_lookup.items()
+            if host.get(count_field) != 0
+        ]
+
+    def get_object_count(self, api_url):
+        # Total number of objects of api_url. Counts of the lists of the changelog snapshot are known, otherwise the first
+        # page of api_url is fetched, and kept for get_resource_list
+        if self.offline_snapshot_import:
+            return self._offline_snapshot_get("counts", api_url)
+
+        if self.changelog_refresh:
+            # The snapshot is loaded with the change log, which is read before any list is fetched
+            self._get_object_changes()
+            previous = self._changelog_previous_lists.get(api_url)
+            if previous is not None:
+                return len(previous["results"])
+
+        # Lists saved to the changelog snapshot can't come from responses cached before the last change
+        api_output = self._fetch_information(
+            api_url, use_cache=not self.changelog_refresh
+        )
+        self._first_pages[api_url] = api_output
+        self._offline_snapshot_put("counts", api_url, api_output["count"])
+        return api_output["count"]
+
+    def _pop_first_page(self, api_url, use_cache=True):
+        # First page of api_url, fetched by get_object_count or now
+        api_output = self._first_pages.pop(api_url, None)
+        if api_output is None:
+            api_output = self._fetch_information(api_url, use_cache=use_cache)
+        return api_output
+
+    def use_fetch_all(self, api_url, queries, nested=False):
+        # Whether to fetch all objects of api_url, instead of chunked requests for each (query_key, query_values) of queries.
+        # nested is whether the parents of the objects are then requested as well, eg. the parents of regions
+        if self.fetch_all != "auto":
+            return self.fetch_all
+
+        chunked_requests = sum(
+            len(self._chunked_urls(api_url, query_key, query_values))
+            for query_key, query_values in queries
+        )
+        if not chunked_requests:
+            return False
+        if chunked_requests == 1 and not nested:
+            # Fetching all objects takes a request as well
+            return False
+
+        count = self.get_object_count(api_url)
+        first_page = self._first_pages.get(api_url)
+        if first_page is None:
+            # Each chunked request returns at least one page, all objects take a page per MAX_PAGE_SIZE objects
+            fetch_all_requests = max(math.ceil(count / NETBOX_MAX_PAGE_SIZE), 1)
+        elif first_page.get("next") and first_page["results"]:
+            # The first page is fetched already, the following ones have the same size
+            page_size = len(first_page["results"])
+            fetch_all_requests = math.ceil((count - page_size) / page_size)
+        else:
+            fetch_all_requests = 0
+        fetch_all = fetch_all_requests <= chunked_requests
+
+        self.display.v(
+            "fetch_all auto: %s has %d objects, %d more requests to fetch all of them or %d chunked requests, %s"
+            % (
+                urlparse(api_url).path,
+                count,
+                fetch_all_requests,
+                chunked_requests,
+                "fetching all" if fetch_all else "fetching chunks",
+            )
+        )
+        if not fetch_all:
+            self._first_pages.pop(api_url, None)
+        return fetch_all
+
+    def get_resource_list_chunked(self, api_url, query_key, query_values):
+        # Make an API call for multiple specific IDs, like /api/ipam/ip-addresses?limit=0&device_id=1&device_id=2&device_id=3
+        # Drastically cuts down HTTP requests comnpared to 1 request per host, in the case where we don't want to fetch_all
+
+        if self.changelog_refresh and self.offline_snapshot is None:
+            urls = self._chunked_urls_from_snapshot(api_url, query_key, query_values)
+        else:
+            urls = self._chunked_urls(api_url, query_key, query_values)
+
+        if (
+            self.fetch_engine == "asyncio"
+            and not self.changelog_refresh
+            and self.offline_snapshot is None
+        ):
+            # Request the first page of every chunk at once, then the following pages of each chunk
+            chunks = [
+                self._collect_pages(api_output)
+                for api_output in self._fetch_information_many(
+                    urls, self.chunk_fetch_workers
+                )
+            ]
+        else:
+            chunks = self._map_concurrently(
+                self.get_resource_list, urls, self.chunk_fetch_workers
+            )
+
+        resources = []
+
+        # Chunks are fetched concurrently, but merged in the order they were requested
+        for chunk_resources in chunks:
+            resources.extend(chunk_resources)
+
+        return resources
+
+    def _chunked_urls_from_snapshot(self, api_url, query_key, query_values):
+        # Chunked URLs of query_values, re-using the chunks of the previous snapshot whose values are all still queried.
+        # Hosts added or removed since then only change the URLs of the chunks they are in, instead of every following
+        # chunk, and the lists of the other chunks are updated from the change log instead of being fetched again.
+        # The previous snapshot is loaded with the change log
+        self._get_object_changes()
+
+        key = "%s %s" % (api_url, query_key)
+        remaining = set(query_values)
+        chunks = []
+        for chunk in self._changelog_previous_chunks.get(key, []):
+            if remaining.issuperset(chunk):
+                chunks.append(chunk)
+                remaining.difference_update(chunk)
+
+        chunks.extend(
+            self._chunked_query_values(
+                api_url,
+                query_key,
+                [value for value in query_values if value in remaining],
+            )
+        )
+
+        with self._changelog_lock:
+            self._changelog_chunks[key] = chunks
 
-        # Calculate how many queries we can do per API call to stay within max_url_length
-        largest_value = str(max(query_values, default=0))  # values are always id ints
-        length_per_value = len(query_string(largest_value))
-        chunk_size = math.floor((self.max_uri_length - len(api_url)) / length_per_value)
+        return [self._chunk_url(api_url, query_key, chunk) for chunk in chunks]
 
-        # Sanity check, for case where max_uri_length < (api_url + length_per_value)
-        if chunk_size < 1:
-            chunk_size = 1
+    def get_referenced_resource_list(self, api_url, ids, parent_key=None):
+        # All objects of api_url, or if option fetch_all is not true only the objects of ids,
+        # and their parents following parent_key. ids is only iterated when the objects are looked up by id
+        if self.fetch_all is True:
+            return self.get_resource_list(api_url=api_url)
 
-        if self.api_version in specifiers.SpecifierSet("~=2.6.0"):
-            # Issue netbox-community/netbox#3507 was fixed in v2.7.5
-            # If using NetBox v2.7.0-v2.7.4 will have to manually set max_uri_length to 0,
-            # but it's probably faster to keep fetch_all: true
-            # (You should really just upgrade your NetBox install)
-            chunk_size = 1
+        ids = set(ids)
+        ids.discard(None)
+        if self.use_fetch_all(api_url, [("id", ids)], nested=parent_key is not None):
+            return self.get_resource_list(api_url=api_url)
 
         resources = []
+        fetched_ids = set()
+        while ids:
+            chunk_resources = self.get_resource_list_chunked(
+                api_url=api_url, query_key="id", query_values=sorted(ids)
+            )
+            resources.extend(chunk_resources)
+            fetched_ids.update(ids)
 
-        for i in range(0, len(query_values), chunk_size):
-            chunk = query_values[i : i + chunk_size]  # noqa: E203
-            # process chunk of size <= chunk_size
-            url = api_url
-            for value in chunk:
-                url += query_string(value, "&" if "?" in url else "?")
-
-            resources.extend(self.get_resource_list(url))
+            # Parents that are not fetched yet
+            ids = set()
+            if parent_key:
+                for resource in chunk_resources:
+                    parent = resource.get(parent_key)
+                    if parent and parent["id"] not in fetched_ids:
+                        ids.add(parent["id"])
 
         return resources
 
+    def _lookup_values(self, name):
+        # Values of the lookup of attribute name, read once iterated as the lookup may not be fetched yet
+        yield from getattr(self, name).values()
+
+    def _referenced_ids(self, key, nested_key=None):
+        # Ids of the objects referenced by key of the hosts, or by nested_key of that object
+        for host in chain(self.devices_list, self.vms_list):
+            reference = host.get(key)
+            if nested_key and isinstance(reference, dict):
+                reference = reference.get(nested_key)
+            if isinstance(reference, dict):
+                yield reference.get("id")
+
     @property
     def group_extractors(self):
         # List of group_by options and hostvars to extract
@@ -692,6 +3075,27 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
         return objects
 
+    def _ancestors_closure(self, object_lookup, object_parent_lookup):
+        # Dictionary of object id to the slugs of the object and its ancestors, computed once for all hosts
+        closure = {}
+        for object_id in object_lookup:
+            try:
+                closure[object_id] = self._objects_array_following_parents(
+                    object_id, object_lookup, object_parent_lookup
+                )
+            except KeyError:
+                # An ancestor is missing from the lookup, fail as before when a host uses this object
+                continue
+
+        return closure
+
+    @staticmethod
+    def _ancestors(object_id, closure):
+        if object_id is None:
+            return []
+
+        return closure[object_id]
+
     def extract_disk(self, host):
         return host.get("disk")
 
@@ -752,10 +3156,8 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
             # Device has no rack
             return None
 
-        return self._objects_array_following_parents(
-            initial_object_id=self.racks_group_lookup[rack_id],
-            object_lookup=self.rack_groups_lookup,
-            object_parent_lookup=self.rack_group_parent_lookup,
+        return self._ancestors(
+            self.racks_group_lookup[rack_id], self.rack_groups_ancestors
         )
 
     def extract_rack_role(self, host):
@@ -813,14 +3215,105 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
     def extract_config_context(self, host):
         try:
+            if self.local_config_context:
+                config_context = self._render_config_context(host)
+            else:
+                config_context = host["config_context"]
+
             if self.flatten_config_context:
                 # Don't wrap in an array if we're about to flatten it to separate host vars
-                return host["config_context"]
+                return config_context
             else:
-                return self._pluralize(host["config_context"])
+                return self._pluralize(config_context)
         except Exception:
             return
 
+    @staticmethod
+    def _ancestor_ids(object_id, parent_lookup):
+        # Ids of the object and its parents
+        ancestor_ids = []
+        while object_id is not None and object_id not in ancestor_ids:
+            ancestor_ids.append(object_id)
+            object_id = parent_lookup.get(object_id)
+
+        return ancestor_ids
+
+    def _config_context_criteria(self, host):
+        # Values of each config context assignment matching host, as in NetBox ConfigContextQuerySet.get_for_object
+        def related(key, field="id"):
+            return (host.get(key) or {}).get(field)
+
+        site_id = related("site")
+        cluster_id = related("cluster")
+        tenant_id = related("tenant")
+
+        return {
+            "regions": self._ancestor_ids(
+                getattr(self, "sites_region_lookup", {}).get(site_id),
+                getattr(self, "regions_parent_lookup", {}),
+            ),
+            "site_groups": self._ancestor_ids(
+                getattr(self, "sites_site_group_lookup", {}).get(site_id),
+                getattr(self, "site_groups_parent_lookup", {}),
+            ),
+            "sites": [site_id],
+            "locations": self._ancestor_ids(
+                related("location"), getattr(self, "locations_parent_lookup", {})
+            ),
+            "device_types": [related("device_type")],
+            "roles": [related("role") or related("device_role")],
+            "platforms": [related("platform")],
+            "cluster_types": [self.clusters_type_lookup.get(cluster_id)],
+            "cluster_groups": [self.clusters_group_lookup.get(cluster_id)],
+            "clusters": [cluster_id],
+            "tenant_groups": self._ancestor_ids(
+                self.tenants_group_lookup.get(tenant_id),
+                getattr(self, "tenant_groups_parent_lookup", {}),
+            ),
+            "tenants": [tenant_id],
+            "tags": [tag["slug"] for tag in host.get("tags") or ()],
+        }
+
+    def _render_config_context(self, host):
+        # Merge the config contexts assigned to host, then its local context data, as NetBox does
+        criteria = self._config_context_criteria(host)
+        key = tuple(
+            (assignment, frozenset(values)) for assignment, values in criteria.items()
+        )
+
+        config_context = self._config_context_cache.get(key)
+        if config_context is None:
+            config_context = {}
+            for assignments, data in self.config_contexts:
+                if all(
+                    not values.isdisjoint(criteria[assignment])
+                    for assignment, values in assignments.items()
+                ):
+                    config_context = self._deepmerge(config_context, data)
+            self._config_context_cache[key] = config_context
+
+        if host.get("local_context_data"):
+            config_context = self._deepmerge(config_context, host["local_context_data"])
+
+        return config_context
+
+    @classmethod
+    def _deepmerge(cls, original, new):
+        # Same as netbox.utilities.data.deepmerge: nested dicts are merged, other values replaced
+        merged = dict(original)
+        for key, value in new.items():
+            if (
+                key in original
+                and isinstance(original[key], dict)
+                and value
+                and isinstance(value, dict)
+            ):
+                merged[key] = cls._deepmerge(original[key], value)
+            else:
+                merged[key] = value
+
+        return merged
+
     def extract_local_context_data(self, host):
         try:
             if self.flatten_local_context_data:
@@ -883,41 +3376,19 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
     def extract_virtual_disks(self, host):
         try:
-            virtual_disks_lookup = self.vm_virtual_disks_lookup
-            virtual_disks = deepcopy(list(virtual_disks_lookup[host["id"]].values()))
-
-            return virtual_disks
+            return self.vm_virtual_disks_lists.get(host["id"], [])
         except Exception:
             return
 
     def extract_interfaces(self, host):
         try:
-            interfaces_lookup = (
-                self.vm_interfaces_lookup
+            interface_views = (
+                self.vm_interface_views
                 if host["is_virtual"]
-                else self.device_interfaces_lookup
+                else self.device_interface_views
             )
 
-            interfaces = deepcopy(list(interfaces_lookup[host["id"]].values()))
-
-            before_netbox_v29 = bool(self.ipaddresses_intf_lookup)
-            # Attach IP Addresses to their interface
-            for interface in interfaces:
-                if before_netbox_v29:
-                    interface["ip_addresses"] = list(
-                        self.ipaddresses_intf_lookup[interface["id"]].values()
-                    )
-                else:
-                    interface["ip_addresses"] = list(
-                        self.vm_ipaddresses_intf_lookup[interface["id"]].values()
-                        if host["is_virtual"]
-                        else self.device_ipaddresses_intf_lookup[
-                            interface["id"]
-                        ].values()
-                    )
-                    interface["tags"] = list(sub["slug"] for sub in interface["tags"])
-
-            return interfaces
+            return interface_views.get(host["id"], [])
         except Exception:
             return
 
@@ -948,10 +3419,8 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
             # Device has no site
             return []
 
-        return self._objects_array_following_parents(
-            initial_object_id=self.sites_region_lookup[site_id],
-            object_lookup=self.regions_lookup,
-            object_parent_lookup=self.regions_parent_lookup,
+        return self._ancestors(
+            self.sites_region_lookup[site_id], self.regions_ancestors
         )
 
     def extract_site_groups(self, host):
@@ -971,10 +3440,8 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
             # Device has no site
             return []
 
-        return self._objects_array_following_parents(
-            initial_object_id=self.sites_site_group_lookup[site_id],
-            object_lookup=self.site_groups_lookup,
-            object_parent_lookup=self.site_groups_parent_lookup,
+        return self._ancestors(
+            self.sites_site_group_lookup[site_id], self.site_groups_ancestors
         )
 
     def extract_location(self, host):
@@ -990,11 +3457,7 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
             # Device has no location
             return []
 
-        return self._objects_array_following_parents(
-            initial_object_id=location_id,
-            object_lookup=self.locations_lookup,
-            object_parent_lookup=self.locations_parent_lookup,
-        )
+        return self._ancestors(location_id, self.locations_ancestors)
 
     def extract_cluster(self, host):
         try:
@@ -1049,9 +3512,66 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
     def extract_asset_tag(self, host):
         return host.get("asset_tag", None)
 
+    def _field_projection(self, fields, brief=False):
+        # Query string limiting the fields returned by NetBox, if option field_projection is enabled
+        # brief indicates that the fields are all part of the brief representation of the objects
+        if not self.field_projection:
+            return ""
+
+        # Dynamic fields were added in NetBox v4.0
+        if self.api_version >= version.parse("4.0"):
+            return "&fields=" + ",".join(fields)
+
+        if brief:
+            return "&brief=1"
+
+        return ""
+
+    @property
+    def host_fields(self):
+        # Fields of devices and VMs used by extractors, and to name the hosts
+        fields = [
+            "id",
+            "name",
+            "status",
+            "site",
+            "location",
+            "rack",
+            "tenant",
+            "role",
+            "platform",
+            "device_type",
+            "cluster",
+            "device",
+            "virtual_chassis",
+            "primary_ip",
+            "primary_ip4",
+            "primary_ip6",
+            "oob_ip",
+            "serial",
+            "asset_tag",
+            "disk",
+            "memory",
+            "vcpus",
+            "tags",
+            "custom_fields",
+            "local_context_data",
+            # Counters used to skip hosts without related objects in chunked requests
+            "interface_count",
+            "virtual_disk_count",
+        ]
+
+        if self.config_context and not self.local_config_context:
+            fields.append("config_context")
+
+        return fields
+
     def refresh_platforms_lookup(self):
         url = self.api_endpoint + "/api/dcim/platforms/?limit=0"
-        platforms = self.get_resource_list(api_url=url)
+        url += self._field_projection(["id", "slug"], brief=True)
+        platforms = self.get_referenced_resource_list(
+            api_url=url, ids=self._referenced_ids("platform")
+        )
         self.platforms_lookup = dict(
             (platform["id"], platform["slug"]) for platform in platforms
         )
@@ -1062,7 +3582,21 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         # "sites_lookup" contains the full data structure. Most site lookups use this
         # "sites_with_prefixes" keeps track of which sites have prefixes assigned. Passed to get_resource_list_chunked()
         url = self.api_endpoint + "/api/dcim/sites/?limit=0"
-        sites = self.get_resource_list(api_url=url)
+        if not (self.site_data or self.prefixes):
+            url += self._field_projection(
+                [
+                    "id",
+                    "slug",
+                    "region",
+                    "group",
+                    "time_zone",
+                    "facility",
+                    "prefix_count",
+                ]
+            )
+        sites = self.get_referenced_resource_list(
+            api_url=url, ids=self._referenced_ids("site")
+        )
         # The following dictionary is used for host group creation only,
         # as the grouping function expects a string as the value of each key
         self.sites_lookup_slug = dict((site["id"], site["slug"]) for site in sites)
@@ -1078,7 +3612,7 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
         for site in sites:
             if site["prefix_count"] and site["prefix_count"] > 0:
-                self.sites_with_prefixes.add(site["slug"])
+                self.sites_with_prefixes.add(site["id"])
                 # Used by refresh_prefixes()
 
         def get_region_for_site(site):
@@ -1146,10 +3680,22 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
     # Note: depends on the result of refresh_sites_lookup for self.sites_with_prefixes
     def refresh_prefixes(self):
-        # Pull all prefixes defined in NetBox
-        url = self.api_endpoint + "/api/ipam/prefixes"
+        # Pull the prefixes of the sites of the hosts, if they have any
+        url = self.api_endpoint + "/api/ipam/prefixes/?limit=0"
+        site_ids = sorted(
+            self.sites_with_prefixes.intersection(self._referenced_ids("site"))
+        )
+
+        # Prefixes are assigned to a scope since NetBox v4.2
+        if self.api_version >= version.parse("4.2"):
+            url += "&scope_type=dcim.site"
+            query_key = "scope_id"
+        else:
+            query_key = "site_id"
 
-        prefixes = self.get_resource_list(url)
+        prefixes = self.get_resource_list_chunked(
+            api_url=url, query_key=query_key, query_values=site_ids
+        )
         self.prefixes_sites_lookup = defaultdict(list)
 
         # We are only concerned with Prefixes that have actually been assigned to sites
@@ -1162,13 +3708,20 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
                 self.prefixes_sites_lookup[prefix["scope"]["id"]].append(prefix)
             # NetBox <=4.1
             elif prefix.get("site"):
-                self.prefixes_sites_lookup[prefix["site"]["id"]].append(prefix)
                 # Remove "site" attribute, as it's redundant when prefixes are assigned to site
+                site_id = prefix["site"]["id"]
+                prefix = dict(prefix)
                 del prefix["site"]
+                self.prefixes_sites_lookup[site_id].append(prefix)
 
     def refresh_regions_lookup(self):
         url = self.api_endpoint + "/api/dcim/regions/?limit=0"
-        regions = self.get_resource_list(api_url=url)
+        url += self._field_projection(["id", "slug", "parent"])
+        regions = self.get_referenced_resource_list(
+            api_url=url,
+            ids=self._lookup_values("sites_region_lookup"),
+            parent_key="parent",
+        )
         self.regions_lookup = dict((region["id"], region["slug"]) for region in regions)
 
         def get_region_parent(region):
@@ -1182,13 +3735,22 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         self.regions_parent_lookup = dict(
             filter(lambda x: x is not None, map(get_region_parent, regions))
         )
+        # Dictionary of region id to the slugs of the region and its parents
+        self.regions_ancestors = self._ancestors_closure(
+            self.regions_lookup, self.regions_parent_lookup
+        )
 
     def refresh_site_groups_lookup(self):
         if self.api_version < version.parse("2.11"):
             return
 
         url = self.api_endpoint + "/api/dcim/site-groups/?limit=0"
-        site_groups = self.get_resource_list(api_url=url)
+        url += self._field_projection(["id", "slug", "parent"])
+        site_groups = self.get_referenced_resource_list(
+            api_url=url,
+            ids=self._lookup_values("sites_site_group_lookup"),
+            parent_key="parent",
+        )
         self.site_groups_lookup = dict(
             (site_group["id"], site_group["slug"]) for site_group in site_groups
         )
@@ -1204,6 +3766,10 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         self.site_groups_parent_lookup = dict(
             filter(lambda x: x is not None, map(get_site_group_parent, site_groups))
         )
+        # Dictionary of site_group id to the slugs of the site_group and its parents
+        self.site_groups_ancestors = self._ancestors_closure(
+            self.site_groups_lookup, self.site_groups_parent_lookup
+        )
 
     def refresh_locations_lookup(self):
         # Locations were added in v2.11. Return empty lookups for previous versions.
@@ -1211,7 +3777,10 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
             return
 
         url = self.api_endpoint + "/api/dcim/locations/?limit=0"
-        locations = self.get_resource_list(api_url=url)
+        url += self._field_projection(["id", "slug", "parent", "site"])
+        locations = self.get_referenced_resource_list(
+            api_url=url, ids=self._referenced_ids("location"), parent_key="parent"
+        )
         self.locations_lookup = dict(
             (location["id"], location["slug"]) for location in locations
         )
@@ -1231,17 +3800,82 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         self.locations_parent_lookup = dict(
             filter(None, map(get_location_parent, locations))
         )
+        # Dictionary of location id to the slugs of the location and its parents
+        self.locations_ancestors = self._ancestors_closure(
+            self.locations_lookup, self.locations_parent_lookup
+        )
         # Location to site lookup
         self.locations_site_lookup = dict(map(get_location_site, locations))
 
     def refresh_tenants_lookup(self):
         url = self.api_endpoint + "/api/tenancy/tenants/?limit=0"
-        tenants = self.get_resource_list(api_url=url)
+        if self.local_config_context:
+            # Config contexts can be assigned to tenant groups
+            url += self._field_projection(["id", "slug", "group"])
+        else:
+            url += self._field_projection(["id", "slug"], brief=True)
+        tenants = self.get_referenced_resource_list(
+            api_url=url, ids=self._referenced_ids("tenant")
+        )
         self.tenants_lookup = dict((tenant["id"], tenant["slug"]) for tenant in tenants)
+        self.tenants_group_lookup = dict(
+            (tenant["id"], (tenant.get("group") or {}).get("id")) for tenant in tenants
+        )
+
+    def refresh_tenant_groups_lookup(self):
+        # Only used to render config contexts, which match the tenant group of the tenant and its parents
+        url = self.api_endpoint + "/api/tenancy/tenant-groups/?limit=0"
+        url += self._field_projection(["id", "parent"])
+        tenant_groups = self.get_referenced_resource_list(
+            api_url=url,
+            ids=self._lookup_values("tenants_group_lookup"),
+            parent_key="parent",
+        )
+
+        # Dictionary of tenant group id to parent tenant group id
+        self.tenant_groups_parent_lookup = dict(
+            (tenant_group["id"], (tenant_group.get("parent") or {}).get("id"))
+            for tenant_group in tenant_groups
+        )
+
+    def refresh_config_contexts(self):
+        url = self.api_endpoint + "/api/extras/config-contexts/?limit=0&is_active=true"
+        config_contexts = self.get_resource_list(api_url=url)
+
+        # Config contexts in the order NetBox merges them, with the values of each of their assignments
+        self.config_contexts = [
+            (
+                dict(
+                    (
+                        assignment,
+                        # Tags are listed by their slug, the other assignments by nested objects
+                        set(
+                            item if isinstance(item, str) else item[field]
+                            for item in config_context[assignment]
+                        ),
+                    )
+                    for assignment, field in CONFIG_CONTEXT_ASSIGNMENTS.items()
+                    if config_context.get(assignment)
+                ),
+                config_context["data"],
+            )
+            for config_context in sorted(
+                config_contexts,
+                key=lambda config_context: (
+                    config_context["weight"],
+                    config_context["name"],
+                ),
+            )
+        ]
+        # Merged config contexts of the hosts matching the same criteria
+        self._config_context_cache = {}
 
     def refresh_racks_lookup(self):
         url = self.api_endpoint + "/api/dcim/racks/?limit=0"
-        racks = self.get_resource_list(api_url=url)
+        url += self._field_projection(["id", "name", "group", "role"])
+        racks = self.get_referenced_resource_list(
+            api_url=url, ids=self._referenced_ids("rack")
+        )
         self.racks_lookup = dict((rack["id"], rack["name"]) for rack in racks)
 
         def get_group_for_rack(rack):
@@ -1265,7 +3899,11 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
             return
 
         url = self.api_endpoint + "/api/dcim/rack-groups/?limit=0"
-        rack_groups = self.get_resource_list(api_url=url)
+        rack_groups = self.get_referenced_resource_list(
+            api_url=url,
+            ids=self._lookup_values("racks_group_lookup"),
+            parent_key="parent",
+        )
         self.rack_groups_lookup = dict(
             (rack_group["id"], rack_group["slug"]) for rack_group in rack_groups
         )
@@ -1278,31 +3916,51 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
         # Dictionary of rack group id to parent rack group id
         self.rack_group_parent_lookup = dict(map(get_rack_group_parent, rack_groups))
+        # Dictionary of rack group id to the slugs of the rack group and its parents
+        self.rack_groups_ancestors = self._ancestors_closure(
+            self.rack_groups_lookup, self.rack_group_parent_lookup
+        )
 
     def refresh_device_roles_lookup(self):
         url = self.api_endpoint + "/api/dcim/device-roles/?limit=0"
-        device_roles = self.get_resource_list(api_url=url)
+        url += self._field_projection(["id", "slug"], brief=True)
+        # Devices have a device_role before NetBox v4.0
+        device_roles = self.get_referenced_resource_list(
+            api_url=url,
+            ids=chain(
+                self._referenced_ids("role"), self._referenced_ids("device_role")
+            ),
+        )
         self.device_roles_lookup = dict(
             (device_role["id"], device_role["slug"]) for device_role in device_roles
         )
 
     def refresh_device_types_lookup(self):
         url = self.api_endpoint + "/api/dcim/device-types/?limit=0"
-        device_types = self.get_resource_list(api_url=url)
+        url += self._field_projection(["id", "slug"], brief=True)
+        device_types = self.get_referenced_resource_list(
+            api_url=url, ids=self._referenced_ids("device_type")
+        )
         self.device_types_lookup = dict(
             (device_type["id"], device_type["slug"]) for device_type in device_types
         )
 
     def refresh_manufacturers_lookup(self):
         url = self.api_endpoint + "/api/dcim/manufacturers/?limit=0"
-        manufacturers = self.get_resource_list(api_url=url)
+        url += self._field_projection(["id", "slug"], brief=True)
+        manufacturers = self.get_referenced_resource_list(
+            api_url=url, ids=self._referenced_ids("device_type", "manufacturer")
+        )
         self.manufacturers_lookup = dict(
             (manufacturer["id"], manufacturer["slug"]) for manufacturer in manufacturers
         )
 
     def refresh_clusters_lookup(self):
         url = self.api_endpoint + "/api/virtualization/clusters/?limit=0"
-        clusters = self.get_resource_list(api_url=url)
+        url += self._field_projection(["id", "type", "group"])
+        clusters = self.get_referenced_resource_list(
+            api_url=url, ids=self._referenced_ids("cluster")
+        )
 
         def get_cluster_type(cluster):
             # Will fail if cluster does not have a type (required property so should always be true)
@@ -1325,29 +3983,32 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         url = self.api_endpoint + "/api/ipam/services/?limit=0"
         services = []
 
-        if self.fetch_all:
-            services = self.get_resource_list(url)
+        # With fetch_all true, hosts may not be fetched yet
+        if self.fetch_all is True:
+            queries = []
         elif self.api_version >= version.parse("4.3.0"):
-            services = self.get_resource_list_chunked(
-                api_url=url,
-                query_key="parent_object_id",
-                # Query only affected devices and vms and sanitize the list to only contain every ID once
-                query_values=set(
-                    chain(self.vms_lookup.keys(), self.devices_lookup.keys())
-                ),
-            )
+            queries = [
+                (
+                    "parent_object_id",
+                    # Query only affected devices and vms and sanitize the list to only contain every ID once
+                    set(chain(self.vms_lookup.keys(), self.devices_lookup.keys())),
+                )
+            ]
         else:
-            device_services = self.get_resource_list_chunked(
-                api_url=url,
-                query_key="device_id",
-                query_values=self.devices_lookup.keys(),
-            )
-            vm_services = self.get_resource_list_chunked(
-                api_url=url,
-                query_key="virtual_machine_id",
-                query_values=self.vms_lookup.keys(),
+            queries = [
+                ("device_id", self.devices_lookup.keys()),
+                ("virtual_machine_id", self.vms_lookup.keys()),
+            ]
+
+        if self.use_fetch_all(url, queries):
+            services = self.get_resource_list(url)
+        else:
+            services = chain.from_iterable(
+                self.get_resource_list_chunked(
+                    api_url=url, query_key=query_key, query_values=query_values
+                )
+                for query_key, query_values in queries
             )
-            services = chain(device_services, vm_services)
 
         # Construct a dictionary of dictionaries, separately for devices and vms.
         # Allows looking up services by device id or vm id
@@ -1385,13 +4046,18 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
         vm_virtual_disks = []
 
-        if self.fetch_all:
+        # With fetch_all true, hosts may not be fetched yet
+        vm_ids = []
+        if self.fetch_all is not True:
+            vm_ids = self._hosts_with_related(self.vms_lookup, "virtual_disk_count")
+
+        if self.use_fetch_all(url_vm_virtual_disks, [("virtual_machine_id", vm_ids)]):
             vm_virtual_disks = self.get_resource_list(url_vm_virtual_disks)
         else:
             vm_virtual_disks = self.get_resource_list_chunked(
                 api_url=url_vm_virtual_disks,
                 query_key="virtual_machine_id",
-                query_values=self.vms_lookup.keys(),
+                query_values=vm_ids,
             )
 
         self.vm_virtual_disks_lookup = defaultdict(dict)
@@ -1402,6 +4068,12 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
             self.vm_virtual_disks_lookup[vm_id][virtual_disk_id] = virtual_disk
 
+        # List of virtual disks of each VM, shared by the host vars of the VM
+        self.vm_virtual_disks_lists = dict(
+            (vm_id, list(virtual_disks.values()))
+            for vm_id, virtual_disks in self.vm_virtual_disks_lookup.items()
+        )
+
     def refresh_interfaces(self):
         url_device_interfaces = self.api_endpoint + "/api/dcim/interfaces/?limit=0"
         url_vm_interfaces = (
@@ -1411,19 +4083,25 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         device_interfaces = []
         vm_interfaces = []
 
-        if self.fetch_all:
+        device_ids = self._hosts_with_related(self.devices_lookup, "interface_count")
+        vm_ids = self._hosts_with_related(self.vms_lookup, "interface_count")
+
+        if self.use_fetch_all(url_device_interfaces, [("device_id", device_ids)]):
             device_interfaces = self.get_resource_list(url_device_interfaces)
-            vm_interfaces = self.get_resource_list(url_vm_interfaces)
         else:
             device_interfaces = self.get_resource_list_chunked(
                 api_url=url_device_interfaces,
                 query_key="device_id",
-                query_values=self.devices_lookup.keys(),
+                query_values=device_ids,
             )
+
+        if self.use_fetch_all(url_vm_interfaces, [("virtual_machine_id", vm_ids)]):
+            vm_interfaces = self.get_resource_list(url_vm_interfaces)
+        else:
             vm_interfaces = self.get_resource_list_chunked(
                 api_url=url_vm_interfaces,
                 query_key="virtual_machine_id",
-                query_values=self.vms_lookup.keys(),
+                query_values=vm_ids,
             )
 
         # Construct a dictionary of dictionaries, separately for devices and vms.
@@ -1462,7 +4140,7 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
             self.vm_interfaces_lookup[vm_id][interface_id] = interface
 
-    # Note: depends on the result of refresh_interfaces for self.devices_with_ips
+    # Note: depends on the result of refresh_interfaces for self.devices_with_ips, if option interfaces is enabled
     def refresh_ipaddresses(self):
         url = (
             self.api_endpoint
@@ -1470,21 +4148,31 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         )
         ipaddresses = []
 
-        if self.fetch_all:
-            ipaddresses = self.get_resource_list(url)
+        if self.interfaces:
+            device_ids = list(self.devices_with_ips)
         else:
-            device_ips = self.get_resource_list_chunked(
-                api_url=url,
-                query_key="device_id",
-                query_values=list(self.devices_with_ips),
-            )
-            vm_ips = self.get_resource_list_chunked(
-                api_url=url,
-                query_key="virtual_machine_id",
-                query_values=self.vms_lookup.keys(),
+            device_ids = self._hosts_with_related(
+                self.devices_lookup, "interface_count"
             )
 
-            ipaddresses = chain(device_ips, vm_ips)
+        # Only IP addresses assigned to interfaces are queried
+        queries = [
+            ("device_id", device_ids),
+            (
+                "virtual_machine_id",
+                self._hosts_with_related(self.vms_lookup, "interface_count"),
+            ),
+        ]
+
+        if self.use_fetch_all(url, queries):
+            ipaddresses = self.get_resource_list(url)
+        else:
+            ipaddresses = chain.from_iterable(
+                self.get_resource_list_chunked(
+                    api_url=url, query_key=query_key, query_values=query_values
+                )
+                for query_key, query_values in queries
+            )
 
         # Construct a dictionary of lists, to allow looking up ip addresses by interface id
         # Note that interface ids share the same namespace for both devices and vms so this is a single dictionary
@@ -1534,6 +4222,50 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
             # Remove "interface" attribute, as that's redundant when ipaddress is added to an interface
             del ipaddress_copy["interface"]
 
+        if self.interfaces:
+            self._build_interface_views()
+
+    # Note: depends on the result of refresh_interfaces and refresh_ipaddresses
+    def _build_interface_views(self):
+        # Interfaces of each host with their IP addresses attached, built once and shared by the host vars of the host
+        # Interfaces are shallow copies, to preserve the originals in case caching is used
+        before_netbox_v29 = bool(self.ipaddresses_intf_lookup)
+
+        def interface_view(interface, ipaddresses_intf_lookup):
+            view = interface.copy()
+            if before_netbox_v29:
+                view["ip_addresses"] = list(
+                    self.ipaddresses_intf_lookup.get(interface["id"], {}).values()
+                )
+            else:
+                view["ip_addresses"] = list(
+                    ipaddresses_intf_lookup.get(interface["id"], {}).values()
+                )
+                view["tags"] = list(sub["slug"] for sub in interface["tags"])
+
+            return view
+
+        self.device_interface_views = dict(
+            (
+                device_id,
+                [
+                    interface_view(interface, self.device_ipaddresses_intf_lookup)
+                    for interface in interfaces.values()
+                ],
+            )
+            for device_id, interfaces in self.device_interfaces_lookup.items()
+        )
+        self.vm_interface_views = dict(
+            (
+                vm_id,
+                [
+                    interface_view(interface, self.vm_ipaddresses_intf_lookup)
+                    for interface in interfaces.values()
+                ],
+            )
+            for vm_id, interfaces in self.vm_interfaces_lookup.items()
+        )
+
     @property
     def lookup_processes(self):
         lookups = [
@@ -1548,6 +4280,14 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
             self.refresh_manufacturers_lookup,
             self.refresh_clusters_lookup,
         ]
+        if self.config_context and self.local_config_context:
+            lookups.extend(
+                [
+                    self.refresh_tenant_groups_lookup,
+                    self.refresh_config_contexts,
+                ]
+            )
+
         if self.virtual_disks:
             lookups.append(self.refresh_virtual_disks)
 
@@ -1565,8 +4305,37 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
                 ]
             )
 
+        if self.hostvars is not None:
+            # Only the lookups used by host vars and groups
+            lookups = [lookup for lookup in lookups if self._lookup_used(lookup)]
+
         return lookups
 
+    def _attribute_used(self, attribute):
+        # attribute is set as a host var, or used by group_by, if option hostvars is set
+        if self.hostvars is None:
+            return True
+
+        attribute = self._pluralize_group_by(attribute)
+        return (
+            attribute in self.group_by
+            or HOST_VAR_NAMES.get(attribute, attribute) in self.hostvars
+        )
+
+    def _lookup_used(self, lookup):
+        name = lookup.__name__
+        if name not in LOOKUP_ATTRIBUTES:
+            # Lookups of related objects are disabled with their option
+            return True
+
+        if self.config_context and self.local_config_context:
+            if name in CONFIG_CONTEXT_LOOKUPS:
+                return True
+
+        return any(
+            self._attribute_used(attribute) for attribute in LOOKUP_ATTRIBUTES[name]
+        )
+
     @property
     def lookup_processes_secondary(self):
         lookups = []
@@ -1580,44 +4349,127 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
         return lookups
 
-    def refresh_lookups(self, lookups):
-        # Exceptions that occur in threads by default are printed to stderr, and ignored by the main thread
-        # They need to be caught, and raised in the main thread to prevent further execution of this plugin
-
-        thread_exceptions = []
+    @property
+    def fetch_tasks(self):
+        # Mapping of task name to the function fetching data from NetBox, and the names of the tasks it depends on
+        tasks = {
+            # Get info about the API - version, allowed query parameters
+            "fetch_api_docs": (self.fetch_api_docs, []),
+            "fetch_hosts": (self.fetch_hosts, ["fetch_api_docs"]),
+        }
 
-        def handle_thread_exceptions(lookup):
-            def wrapper():
-                try:
-                    lookup()
-                except Exception as e:
-                    # Save for the main-thread to re-raise
-                    # Also continue to raise on this thread, so the default handler can run to print to stderr
-                    thread_exceptions.append(e)
-                    raise e
+        # Lookups only depend on the API version, they don't need to wait for the hosts
+        for lookup in self.lookup_processes:
+            tasks[lookup.__name__] = (lookup, ["fetch_api_docs"])
+
+        # Interfaces are assigned to their virtual chassis master, which requires the hosts
+        # Services and virtual disk lookups depend on hosts, if option fetch_all is false or auto
+        host_lookups = ["refresh_interfaces"]
+        if self.fetch_all is not True:
+            host_lookups.extend(["refresh_services", "refresh_virtual_disks"])
+
+        for name in host_lookups:
+            if name in tasks:
+                tasks[name][1].append("fetch_hosts")
+
+        # Unless option fetch_all is true, lookups only fetch the objects referenced by the hosts or other lookups
+        if self.fetch_all is not True:
+            referenced_lookups = {
+                "refresh_sites_lookup": "fetch_hosts",
+                "refresh_regions_lookup": "refresh_sites_lookup",
+                "refresh_site_groups_lookup": "refresh_sites_lookup",
+                "refresh_locations_lookup": "fetch_hosts",
+                "refresh_tenants_lookup": "fetch_hosts",
+                "refresh_tenant_groups_lookup": "refresh_tenants_lookup",
+                "refresh_device_roles_lookup": "fetch_hosts",
+                "refresh_platforms_lookup": "fetch_hosts",
+                "refresh_device_types_lookup": "fetch_hosts",
+                "refresh_manufacturers_lookup": "fetch_hosts",
+                "refresh_clusters_lookup": "fetch_hosts",
+                "refresh_racks_lookup": "fetch_hosts",
+                "refresh_rack_groups_lookup": "refresh_racks_lookup",
+            }
+            for name, dependency in referenced_lookups.items():
+                if name in tasks:
+                    tasks[name][1].append(dependency)
 
-            return wrapper
+        for lookup in self.lookup_processes_secondary:
+            tasks[lookup.__name__] = (lookup, ["fetch_api_docs"])
 
-        thread_list = []
+        # Looking up IP Addresses depends on the result of interfaces count_ipaddresses field
+        # - can skip any device/vm without any IPs
+        if "refresh_ipaddresses" in tasks:
+            tasks["refresh_ipaddresses"][1].append("fetch_hosts")
+            if "refresh_interfaces" in tasks:
+                tasks["refresh_ipaddresses"][1].append("refresh_interfaces")
+
+        # Prefixes are attached to the sites of the hosts, and depend on self.sites_with_prefixes
+        if "refresh_prefixes" in tasks:
+            tasks["refresh_prefixes"][1].extend(["fetch_hosts", "refresh_sites_lookup"])
+
+        return tasks
+
+    def run_fetch_tasks(self, tasks):
+        # Run each task on a bounded pool of threads, as soon as all of the tasks it depends on have completed
+        # Exceptions that occur in threads need to be raised in the main thread to prevent further execution of this plugin
+        # Once a task failed no new tasks are started, and the first exception is raised after running tasks completed
+        pending = dict(tasks)
+        completed = set()
+        running = {}
+        thread_exceptions = []
 
-        try:
-            for lookup in lookups:
-                thread = Thread(target=handle_thread_exceptions(lookup))
-                thread_list.append(thread)
-                thread.start()
+        with ThreadPoolExecutor(max_workers=max(self.fetch_workers, 1)) as executor:
+            while True:
+                if not thread_exceptions:
+                    for name, (task, dependencies) in list(pending.items()):
+                        if all(dependency in completed for dependency in dependencies):
+                            running[executor.submit(self._run_phase, task)] = name
+                            del pending[name]
+
+                if not running:
+                    break
+
+                done, _not_done = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        thread_exceptions.append(future.exception())
+                    else:
+                        completed.add(name)
+
+        for exception in thread_exceptions:
+            raise exception
+
+        if pending:
+            raise AnsibleError(
+                "Unable to run %s, tasks depend on tasks that do not exist or depend on each other"
+                % ", ".join(str(name) for name in pending)
+            )
 
-            for thread in thread_list:
-                thread.join()
+    def _run_phase(self, function, name=None):
+        # Run function, timing it as a phase of the inventory when statistics are collected
+        if self.fetch_stats is None:
+            return function()
 
-            # Wait till we've joined all threads before raising any exceptions
-            for exception in thread_exceptions:
-                raise exception
+        return self.fetch_stats.run_phase(name or function.__name__, function)
 
-        finally:
-            # Avoid retain cycles
-            thread_exceptions = None
+    def refresh_lookups(self, lookups):
+        # Run lookups in parallel, without dependencies between them
+        self.run_fetch_tasks(
+            dict((index, (lookup, [])) for index, lookup in enumerate(lookups))
+        )
 
     def fetch_api_docs(self):
+        if self.offline_snapshot_import:
+            self.api_version = version.parse(self.offline_snapshot["api_version"])
+            self.allowed_device_query_parameters = self.offline_snapshot[
+                "allowed_device_query_parameters"
+            ]
+            self.allowed_vm_query_parameters = self.offline_snapshot[
+                "allowed_vm_query_parameters"
+            ]
+            return
+
         try:
             tmp_dir = os.path.split(DEFAULT_LOCAL_TMP)[0]
             tmp_file = os.path.join(tmp_dir, "netbox_api_dump.json")
@@ -1678,6 +4530,13 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
                 ]["get"]["parameters"]
             ]
 
+        if self.offline_snapshot is not None:
+            self.offline_snapshot.update(
+                api_version=str(self.api_version),
+                allowed_device_query_parameters=self.allowed_device_query_parameters,
+                allowed_vm_query_parameters=self.allowed_vm_query_parameters,
+            )
+
     def validate_query_parameter(self, parameter, allowed_query_parameters):
         if not (isinstance(parameter, dict) and len(parameter) == 1):
             self.display.warning(
@@ -1763,26 +4622,35 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         if vm_url:
             vm_url = vm_url + urlencode(vm_query_parameters)
 
-        # Exclude config_context if not required
-        if not self.config_context:
+        # Exclude config_context if not required, or computed by this plugin
+        if not self.config_context or self.local_config_context:
             if device_url:
                 device_url = device_url + "&exclude=config_context"
             if vm_url:
                 vm_url = vm_url + "&exclude=config_context"
 
+        # compose, groups and keyed_groups may use any field of the hosts
+        if self.field_projection and not (
+            self.get_option("compose")
+            or self.get_option("groups")
+            or self.get_option("keyed_groups")
+        ):
+            if device_url:
+                device_url = device_url + self._field_projection(self.host_fields)
+            if vm_url:
+                vm_url = vm_url + self._field_projection(self.host_fields)
+
         return device_url, vm_url
 
     def fetch_hosts(self):
         device_url, vm_url = self.refresh_url()
 
-        self.devices_list = []
-        self.vms_list = []
-
-        if device_url:
-            self.devices_list = self.get_resource_list(device_url)
-
-        if vm_url:
-            self.vms_list = self.get_resource_list(vm_url)
+        # Fetch devices and VMs at the same time
+        self.devices_list, self.vms_list = self._map_concurrently(
+            lambda url: self.get_resource_list(url) if url else [],
+            [device_url, vm_url],
+            2,
+        )
 
         # Allow looking up devices/vms by their ids
         self.devices_lookup = {device["id"]: device for device in self.devices_list}
@@ -1830,24 +4698,68 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         else:
             return "_".join([grouping, group])
 
-    def add_host_to_groups(self, host, hostname):
+    def compile_extraction_plan(self):
+        # Resolve the extractors, host var names and group_by options once, instead of for each host
+        group_extractors = self.group_extractors
+        flatten = {
+            "config_context": self.flatten_config_context,
+            "custom_fields": self.flatten_custom_fields,
+            "local_context_data": self.flatten_local_context_data,
+        }
+
+        # List of (attribute, extractor, host var name, flatten)
+        self.host_vars_plan = [
+            (
+                attribute,
+                extractor,
+                self._rename_variable(HOST_VAR_NAMES.get(attribute, attribute)),
+                flatten.get(attribute, False),
+            )
+            for attribute, extractor in group_extractors.items()
+            if self.hostvars is None
+            or HOST_VAR_NAMES.get(attribute, attribute) in self.hostvars
+        ]
+
+        # Don't handle regions here since no hosts are ever added to region groups
+        # Sites and locations are also specially handled in the main()
         site_group_by = self._pluralize_group_by("site")
         site_group_group_by = self._pluralize_group_by("site_group")
 
-        for grouping in self.group_by:
-            # Don't handle regions here since no hosts are ever added to region groups
-            # Sites and locations are also specially handled in the main()
-            if grouping in ["region", site_group_by, "location", site_group_group_by]:
-                continue
+        # List of (grouping, extractor), the extractor is None when the group_by option is not valid
+        self.group_by_plan = [
+            (grouping, group_extractors.get(grouping))
+            for grouping in self.group_by
+            if grouping
+            not in ["region", site_group_by, "location", site_group_group_by]
+        ]
+
+        # Group name to name transformed by the inventory
+        self.transformed_group_names = {}
+
+        # IP address host vars set by _fill_host_variables, besides the extractors
+        self.ip_host_vars_plan = frozenset(
+            attribute
+            for attribute in ("primary_ip4", "primary_ip6", "oob_ip")
+            if self._attribute_used(attribute)
+        )
+
+    def add_host_to_groups(self, host, hostname, extracted_values=None):
+        # extracted_values are the values already extracted from host, by attribute
+        if extracted_values is None:
+            extracted_values = {}
 
-            if grouping not in self.group_extractors:
+        for grouping, extractor in self.group_by_plan:
+            if extractor is None:
                 raise AnsibleError(
                     'group_by option "%s" is not valid. Check group_by documentation or'
                     " check the plurals option, as well as the racks options. It can"
                     " determine what group_by options are valid." % grouping
                 )
 
-            groups_for_host = self.group_extractors[grouping](host)
+            if grouping in extracted_values:
+                groups_for_host = extracted_values[grouping]
+            else:
+                groups_for_host = extractor(host)
 
             if not groups_for_host:
                 continue
@@ -1864,7 +4776,10 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
                 # Group names may be transformed by the ansible TRANSFORM_INVALID_GROUP_CHARS setting
                 # add_group returns the actual group name used
-                transformed_group_name = self.inventory.add_group(group=group_name)
+                transformed_group_name = self.transformed_group_names.get(group_name)
+                if transformed_group_name is None:
+                    transformed_group_name = self.inventory.add_group(group=group_name)
+                    self.transformed_group_names[group_name] = transformed_group_name
                 self.inventory.add_host(group=transformed_group_name, host=hostname)
 
     def _add_site_groups(self):
@@ -1957,13 +4872,15 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
         return transformed_group_names
 
-    def _set_variable(self, hostname, key, value):
+    def _rename_variable(self, key):
         for item in self.rename_variables:
             if item["pattern"].match(key):
-                key = item["pattern"].sub(item["repl"], key)
-                break
+                return item["pattern"].sub(item["repl"], key)
+
+        return key
 
-        self.inventory.set_variable(hostname, key, value)
+    def _set_variable(self, hostname, key, value):
+        self.inventory.set_variable(hostname, self._rename_variable(key), value)
 
     def _fill_host_variables(self, host, hostname):
         extracted_primary_ip = self.extract_primary_ip(host=host)
@@ -1975,57 +4892,42 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
             if extracted_dns_name:
                 self._set_variable(hostname, "ansible_host", extracted_dns_name)
 
-        extracted_primary_ip4 = self.extract_primary_ip4(host=host)
-        if extracted_primary_ip4:
-            self._set_variable(hostname, "primary_ip4", extracted_primary_ip4)
+        if "primary_ip4" in self.ip_host_vars_plan:
+            extracted_primary_ip4 = self.extract_primary_ip4(host=host)
+            if extracted_primary_ip4:
+                self._set_variable(hostname, "primary_ip4", extracted_primary_ip4)
 
-        extracted_primary_ip6 = self.extract_primary_ip6(host=host)
-        if extracted_primary_ip6:
-            self._set_variable(hostname, "primary_ip6", extracted_primary_ip6)
+        if "primary_ip6" in self.ip_host_vars_plan:
+            extracted_primary_ip6 = self.extract_primary_ip6(host=host)
+            if extracted_primary_ip6:
+                self._set_variable(hostname, "primary_ip6", extracted_primary_ip6)
 
         extracted_oob_ip = self.extract_oob_ip(host=host)
         if extracted_oob_ip:
-            self._set_variable(hostname, "oob_ip", extracted_oob_ip)
+            if "oob_ip" in self.ip_host_vars_plan:
+                self._set_variable(hostname, "oob_ip", extracted_oob_ip)
             if self.oob_ip_as_primary_ip:
                 self._set_variable(hostname, "ansible_host", extracted_oob_ip)
 
-        for attribute, extractor in self.group_extractors.items():
+        # Values extracted from host, by attribute, to be reused for groups
+        extracted_values = {}
+
+        for attribute, extractor, var_name, flatten in self.host_vars_plan:
             extracted_value = extractor(host)
+            extracted_values[attribute] = extracted_value
 
             # Compare with None, not just check for a truth comparison - allow empty arrays, etc to be host vars
             if extracted_value is None:
                 continue
 
-            # Special case - all group_by options are single strings, but tag is a list of tags
-            # Keep the groups named singular "tag_sometag", but host attribute should be "tags":["sometag", "someothertag"]
-            if attribute == "tag":
-                attribute = "tags"
-
-            if attribute == "region":
-                attribute = "regions"
-
-            if attribute == "site_group":
-                attribute = "site_groups"
-
-            if attribute == "location":
-                attribute = "locations"
-
-            if attribute == "rack_group":
-                attribute = "rack_groups"
-
             # Flatten the dict into separate host vars, if enabled
-            if isinstance(extracted_value, dict) and (
-                (attribute == "config_context" and self.flatten_config_context)
-                or (attribute == "custom_fields" and self.flatten_custom_fields)
-                or (
-                    attribute == "local_context_data"
-                    and self.flatten_local_context_data
-                )
-            ):
+            if flatten and isinstance(extracted_value, dict):
                 for key, value in extracted_value.items():
                     self._set_variable(hostname, key, value)
             else:
-                self._set_variable(hostname, attribute, extracted_value)
+                self.inventory.set_variable(hostname, var_name, extracted_value)
+
+        return extracted_values
 
     def _get_host_virtual_chassis_master(self, host):
         virtual_chassis = host.get("virtual_chassis", None)
@@ -2047,17 +4949,20 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
                 "pytz must be installed to use this plugin"
             ) from PYTZ_IMPORT_ERROR
 
-        # Get info about the API - version, allowed query parameters
-        self.fetch_api_docs()
+        # Fetch API docs, hosts and lookups, each as soon as the data it depends on is available
+        self.run_fetch_tasks(self.fetch_tasks)
 
-        self.fetch_hosts()
+        if self.changelog_refresh:
+            self._save_changelog_snapshot()
 
-        # Interface, and Service lookup will depend on hosts, if option fetch_all is false
-        self.refresh_lookups(self.lookup_processes)
+        if self.offline_snapshot is not None and not self.offline_snapshot_import:
+            self._save_offline_snapshot()
 
-        # Looking up IP Addresses depends on the result of interfaces count_ipaddresses field
-        # - can skip any device/vm without any IPs
-        self.refresh_lookups(self.lookup_processes_secondary)
+        self._run_phase(self.build_inventory)
+
+    def build_inventory(self):
+        # Add hosts and groups to the inventory, from the data fetched from NetBox
+        self.compile_extraction_plan()
 
         # If we're grouping by regions, hosts are not added to region groups
         # If we're grouping by locations, hosts may be added to the site or location
@@ -2097,7 +5002,7 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
             hostname = self.extract_name(host=host)
             self.inventory.add_host(host=hostname)
-            self._fill_host_variables(host=host, hostname=hostname)
+            extracted_values = self._fill_host_variables(host=host, hostname=hostname)
 
             strict = self.get_option("strict")
 
@@ -2115,7 +5020,9 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
             self._add_host_to_keyed_groups(
                 self.get_option("keyed_groups"), host, hostname, strict=strict
             )
-            self.add_host_to_groups(host=host, hostname=hostname)
+            self.add_host_to_groups(
+                host=host, hostname=hostname, extracted_values=extracted_values
+            )
 
             # Special processing for sites and locations as those groups were already created
             if getattr(self, "location_group_names", None) and host.get("location"):
@@ -2164,10 +5071,14 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         self.api_endpoint = self.get_option("api_endpoint").strip("/")
         self.timeout = self.get_option("timeout")
         self.max_uri_length = self.get_option("max_uri_length")
+        self.page_fetch_workers = self.get_option("page_fetch_workers")
+        self.chunk_fetch_workers = self.get_option("chunk_fetch_workers")
+        self.fetch_workers = self.get_option("fetch_workers")
         self.validate_certs = self.get_option("validate_certs")
         self.follow_redirects = self.get_option("follow_redirects")
         self.config_context = self.get_option("config_context")
         self.flatten_config_context = self.get_option("flatten_config_context")
+        self.local_config_context = self.get_option("config_context_source") == "local"
         self.flatten_local_context_data = self.get_option("flatten_local_context_data")
         self.flatten_custom_fields = self.get_option("flatten_custom_fields")
         self.plurals = self.get_option("plurals")
@@ -2177,11 +5088,54 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         self.site_data = self.get_option("site_data")
         self.prefixes = self.get_option("prefixes")
         self.fetch_all = self.get_option("fetch_all")
+        if to_text(self.fetch_all).lower() == "auto":
+            self.fetch_all = "auto"
+        else:
+            try:
+                self.fetch_all = boolean(self.fetch_all, strict=True)
+            except TypeError as e:
+                raise AnsibleError("fetch_all must be a boolean or auto: %s" % e)
+        self.field_projection = self.get_option("field_projection")
+        self.changelog_refresh = self.get_option("changelog_refresh")
+        self._changelog_lock = Lock()
+        self._object_changes = None
+        self._changelog_previous_lists = {}
+        self._changelog_lists = {}
+        self._changelog_previous_chunks = {}
+        self._changelog_chunks = {}
+        # First pages of lists fetched by fetch_all auto to count their objects
+        self._first_pages = {}
+
+        self.offline_snapshot = None
+        self.offline_snapshot_import = False
+        if self.get_option("snapshot_import"):
+            if self.get_option("snapshot_export"):
+                raise AnsibleError(
+                    "snapshot_import and snapshot_export are mutually exclusive"
+                )
+            self.offline_snapshot = self._load_offline_snapshot(
+                self.get_option("snapshot_import")
+            )
+            self.offline_snapshot_import = True
+            # Everything is read from the snapshot
+            self.changelog_refresh = False
+        elif self.get_option("snapshot_export"):
+            self.offline_snapshot = {
+                "version": OFFLINE_SNAPSHOT_VERSION,
+                "lists": {},
+                "counts": {},
+            }
         self.headers = {
             "User-Agent": "ansible %s Python %s"
             % (ansible_version, python_version.split(" ", maxsplit=1)[0]),
             "Content-type": "application/json",
         }
+        self.compression = self.get_option("compression")
+        if self.compression:
+            self.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        self._transfer_lock = Lock()
+        # Bytes received from NetBox, and their size once decompressed
+        self._transfer_bytes = [0, 0]
         self.cert = self.get_option("cert")
         self.key = self.get_option("key")
         self.ca_path = self.get_option("ca_path")
@@ -2190,6 +5144,43 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
         self._set_authorization()
 
+        self.http_transport = None
+        self.fetch_engine = self.get_option("fetch_engine")
+
+        self.shared_requests = self.get_option("shared_requests")
+        self.shared_requests_ttl = self.get_option("shared_requests_ttl")
+
+        self.request_controller = None
+        adaptive_concurrency = self.get_option("adaptive_concurrency")
+        if adaptive_concurrency or self.get_option("max_retries") > 0:
+            # The asyncio engine always limits the requests in flight to max_concurrent_requests
+            max_window = None
+            if adaptive_concurrency or self.fetch_engine == "asyncio":
+                max_window = max(self.get_option("max_concurrent_requests"), 1)
+
+            self.request_controller = RequestController(
+                max_window=max_window,
+                adaptive=adaptive_concurrency,
+                max_retries=self.get_option("max_retries"),
+                backoff=self.get_option("retry_backoff"),
+                display=self.display,
+            )
+
+        if self.fetch_engine == "asyncio":
+            self.http_transport = AsyncHTTPTransport(
+                max_concurrent_requests=self.get_option("max_concurrent_requests"),
+                pool_size=self.get_option("connection_pool_size"),
+                keepalive=self.get_option("connection_keepalive"),
+                controller=self.request_controller,
+                **self._open_url_kwargs,
+            )
+        elif self.get_option("http_transport") == "pooled":
+            self.http_transport = PooledHTTPTransport(
+                pool_size=self.get_option("connection_pool_size"),
+                keepalive=self.get_option("connection_keepalive"),
+                **self._open_url_kwargs,
+            )
+
         # Filter and group_by options
         self.group_by = self.get_option("group_by")
         self.group_names_raw = self.get_option("group_names_raw")
@@ -2210,12 +5201,103 @@ class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
         self.ansible_host_dns_name = self.get_option("ansible_host_dns_name")
         self.racks = self.get_option("racks")
 
+        self.hostvars = self.get_option("hostvars")
+        if self.hostvars is not None:
+            # Don't fetch the related objects of hosts that are neither host vars nor used by group_by
+            self.config_context = self.config_context and self._attribute_used(
+                "config_context"
+            )
+            self.virtual_disks = self.virtual_disks and self._attribute_used(
+                "virtual_disks"
+            )
+            # Interfaces also set the dns_name host var, only the IP addresses are fetched for it without the interfaces
+            self.dns_name = (self.dns_name or self.interfaces) and self._attribute_used(
+                "dns_name"
+            )
+            self.interfaces = self.interfaces and self._attribute_used("interfaces")
+            self.services = self.services and self._attribute_used("services")
+            self.prefixes = self.prefixes and self._attribute_used("site")
+            self.racks = self.racks and any(
+                self._attribute_used(attribute)
+                for attribute in ("rack", "rack_role", "rack_group", "location")
+            )
+
         # Compile regular expressions, if any
         self.rename_variables = self.parse_rename_variables(
             self.get_option("rename_variables")
         )
 
-        self.main()
+        self.fetch_stats = None
+        if self.get_option("fetch_stats") or self.get_option("fetch_stats_file"):
+            self.fetch_stats = FetchStats(self.api_endpoint)
+
+        try:
+            if self.get_option("cache") and self.get_option("cache_inventory_model"):
+                self._run_phase(partial(self._main_cached, path), "main")
+            else:
+                self._run_phase(self.main)
+        finally:
+            if self.http_transport is not None:
+                self.http_transport.close()
+
+        if self.compression:
+            self._report_transfer()
+
+        if self.fetch_stats is not None:
+            self._report_fetch_stats()
+
+    def _report_fetch_stats(self):
+        if self.get_option("fetch_stats"):
+            # On stderr, not to mix the report with the output of ansible-inventory
+            for line in self.fetch_stats.report():
+                self.display.display(line, stderr=True)
+
+        path = self.get_option("fetch_stats_file")
+        if path:
+            try:
+                with open(path, "w") as file:
+                    json.dump(self.fetch_stats.to_dict(), file, indent=2)
+            except (IOError, OSError) as e:
+                raise AnsibleError(
+                    "Unable to write fetch_stats_file %s: %s" % (path, to_native(e))
+                )
+
+    def _inventory_model_cache_key(self, path):
+        # The inventory model depends on every option, and on the rendered filters and token
+        options = dict(self._options)
+        options.update(
+            query_filters=self.query_filters,
+            device_query_filters=self.device_query_filters,
+            vm_query_filters=self.vm_query_filters,
+            headers=self.headers,
+        )
+        options_hash = hashlib.sha1(
+            to_bytes(json.dumps(options, sort_keys=True, default=to_text))
+        ).hexdigest()
+
+        return "%s_model_%s" % (self.get_cache_key(path), options_hash)
+
+    def _main_cached(self, path):
+        cache_key = self._inventory_model_cache_key(path)
+
+        if self.use_cache:
+            try:
+                calls = self._cache_get(cache_key)
+            except KeyError:
+                pass
+            else:
+                self.display.v("Using cached inventory model")
+                InventoryModelRecorder.replay(self.inventory, calls)
+                return
+
+        recorder = InventoryModelRecorder(self.inventory)
+        self.inventory = recorder
+        try:
+            self.main()
+        finally:
+            self.inventory = recorder.inventory
+
+        self._cache_set(cache_key, recorder.calls)
 
     def parse_rename_variables(self, rename_variables):
         return [
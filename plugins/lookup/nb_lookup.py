@@ -76,6 +76,15 @@ DOCUMENTATION = """
             description:
                 - Whether to return raw API data with the lookup/query or whether to return a key/value dict
             required: false
+        compression:
+            type: bool
+            description:
+                - Request compressed responses from NetBox, with the content encodings supported by the requests library.
+                - The number of bytes received for each response before decompression, according to its Content-Length header, is
+                  displayed in verbose mode.
+            required: false
+            default: false
+            version_added: "3.23.0"
     requirements:
         - pynetbox
 """
@@ -405,6 +414,24 @@ def make_netbox_call(nb_endpoint, filters=None):
     return results
 
 
+def display_transfer(response, *args, **kwargs):
+    """
+    Response hook of requests, displaying the bytes received before decompression, from the Content-Length header.
+    The body is left for the caller to read.
+    """
+    size = response.headers.get("Content-Length")
+    if size is None:
+        Display().v(
+            "NetBox lookup received a response of unknown size from %s" % response.url
+        )
+        return
+
+    Display().v(
+        "NetBox lookup received %s bytes from %s, Content-Encoding %s"
+        % (size, response.url, response.headers.get("Content-Encoding", "identity"))
+    )
+
+
 class LookupModule(LookupBase):
     """
     LookupModule(LookupBase) is defined by Ansible
@@ -438,6 +465,7 @@ class LookupModule(LookupBase):
         netbox_api_filter = kwargs.get("api_filter")
         netbox_raw_return = kwargs.get("raw_data")
         netbox_plugin = kwargs.get("plugin")
+        netbox_compression = kwargs.get("compression", False)
 
         if not isinstance(terms, list):
             terms = [terms]
@@ -450,6 +478,14 @@ class LookupModule(LookupBase):
             session.headers = netbox_headers
             session.verify = netbox_ssl_verify
 
+            if netbox_compression:
+                # Responses are decompressed by requests as they are read
+                session.headers = dict(netbox_headers)
+                session.headers["Accept-Encoding"] = requests.utils.default_headers()[
+                    "Accept-Encoding"
+                ]
+                session.hooks["response"].append(display_transfer)
+
             if Version(version("pynetbox")) < Version("7.0.0"):
                 netbox = pynetbox.api(
                     netbox_api_endpoint,
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Benchmark nb_inventory against a local mock NetBox serving synthetic datasets.
+
+Each scenario parses the inventory in a separate Python process, and reports
+the wall time of InventoryModule.parse, the peak RSS of that process, and the
+number of requests and bytes served by the mock NetBox.
+
+Run from the collection installed in an ansible_collections directory, for
+example the one installed by hacking/local-test.sh:
+
+    python tests/benchmarks/bench_nb_inventory.py --devices 10000 100000
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from mock_netbox import MockNetbox  # noqa: E402
+from netbox_dataset import generate_dataset  # noqa: E402
+
+# Options combined into the benchmarked scenarios
+SCENARIO_OPTIONS = ("fetch_all", "interfaces", "services")
+
+
+def default_collections_path():
+    # tests/benchmarks is in ansible_collections/netbox/netbox when the collection is installed
+    collection_dir = os.path.dirname(os.path.dirname(BENCHMARKS_DIR))
+    namespace_dir = os.path.dirname(collection_dir)
+    collections_dir = os.path.dirname(namespace_dir)
+    if os.path.basename(collections_dir) != "ansible_collections":
+        return None
+
+    return os.path.dirname(collections_dir)
+
+
+def run_child(inventory_path, collections_path):
+    # Parse the inventory in this process, and print the measures as JSON
+    import resource
+
+    from ansible.inventory.data import InventoryData
+    from ansible.parsing.dataloader import DataLoader
+    from ansible.plugins.loader import init_plugin_loader, inventory_loader
+
+    init_plugin_loader([collections_path])
+    plugin = inventory_loader.get("netbox.netbox.nb_inventory")
+    inventory = InventoryData()
+
+    start = time.perf_counter()
+    plugin.parse(inventory, DataLoader(), inventory_path, cache=False)
+    wall_time = time.perf_counter() - start
+
+    json.dump(
+        {
+            "wall_time": wall_time,
+            # Kilobytes on Linux
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "hosts": len(inventory.hosts),
+            "groups": len(inventory.groups),
+        },
+        sys.stdout,
+    )
+
+
+def run_scenario(server, options, collections_path, tmp_dir):
+    inventory_path = os.path.join(tmp_dir, "netbox.yml")
+    config = {
+        "plugin": "netbox.netbox.nb_inventory",
+        "api_endpoint": server.url,
+        "validate_certs": False,
+        "group_by": ["sites", "tenants", "device_roles", "platforms", "tags"],
+    }
+    config.update(options)
+
+    # JSON is valid YAML
+    with open(inventory_path, "w") as file:
+        json.dump(config, file)
+
+    env = dict(os.environ)
+    env.update(
+        ANSIBLE_LOCAL_TEMP=os.path.join(tmp_dir, "tmp"),
+        ANSIBLE_COLLECTIONS_PATH=collections_path,
+    )
+
+    server.reset_stats()
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--child",
+            inventory_path,
+            "--collections-path",
+            collections_path,
+        ],
+        env=env,
+    )
+
+    result = json.loads(output)
+    result.update(
+        requests=sum(server.requests.values()),
+        bytes_received=server.bytes_sent,
+    )
+    return result
+
+
+def parse_option(value):
+    # KEY=VALUE, VALUE parsed as JSON when possible
+    key, _sep, raw = value.partition("=")
+    try:
+        return key, json.loads(raw)
+    except ValueError:
+        return key, raw
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.splitlines()[1:]),
+    )
+    parser.add_argument(
+        "--devices",
+        type=int,
+        nargs="+",
+        default=[1000],
+        help="Number of devices of each dataset (default: 1000)",
+    )
+    parser.add_argument(
+        "--vms",
+        type=int,
+        help="Number of VMs of each dataset (default: a tenth of the devices)",
+    )
+    parser.add_argument(
+        "--interfaces-per-host",
+        type=int,
+        default=4,
+    )
+    parser.add_argument(
+        "--max-page-size",
+        type=int,
+        default=1000,
+        help="MAX_PAGE_SIZE of the mock NetBox",
+    )
+    parser.add_argument(
+        "--option",
+        action="append",
+        type=parse_option,
+        default=[],
+        metavar="KEY=VALUE",
+        help="nb_inventory option set in every scenario, for example fetch_engine=asyncio",
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=["".join(flags) for flags in itertools.product("01", repeat=3)],
+        help="Only run the given scenarios, as a fetch_all, interfaces and services flags string, for example 011",
+    )
+    parser.add_argument("--collections-path", default=default_collections_path())
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if not args.collections_path:
+        parser.error(
+            "the collection must be installed in an ansible_collections directory,"
+            " or --collections-path must be set"
+        )
+
+    if args.child:
+        return run_child(args.child, args.collections_path)
+
+    results = []
+    server = MockNetbox(max_page_size=args.max_page_size)
+    server.start()
+
+    try:
+        for devices in args.devices:
+            server.set_dataset(
+                generate_dataset(
+                    server.url,
+                    devices=devices,
+                    vms=args.vms,
+                    interfaces_per_host=args.interfaces_per_host,
+                )
+            )
+
+            for flags in itertools.product((False, True), repeat=3):
+                name = "".join(str(int(flag)) for flag in flags)
+                if args.scenario and name not in args.scenario:
+                    continue
+
+                options = dict(zip(SCENARIO_OPTIONS, flags))
+                options.update(args.option)
+
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    result = run_scenario(
+                        server, options, args.collections_path, tmp_dir
+                    )
+
+                result.update(devices=devices, scenario=name, options=options)
+                results.append(result)
+                print(
+                    "devices={devices:<7} fetch_all={0:d} interfaces={1:d} services={2:d}"
+                    "  {wall_time:8.2f}s  {requests:6d} requests  {bytes_received:>12,d} bytes"
+                    "  {peak_rss_mb:8.1f} MB peak RSS  {hosts} hosts".format(
+                        *flags, **result
+                    ),
+                    flush=True,
+                )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Local HTTP stand-in for the NetBox API, serving a synthetic dataset.
+
+Supports what nb_inventory uses: pagination with limit and offset (capped to
+MAX_PAGE_SIZE like NetBox), filtering by id and by the id of the related
+device, virtual machine, site or scope, the "fields" and "brief" query
+parameters, gzip compressed responses, and the status and schema endpoints.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import gzip
+import json
+import threading
+from collections import Counter, defaultdict
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+# Query parameters filtering objects by id, and the function returning that id for an object
+ID_FILTERS = {
+    "id": lambda obj: obj["id"],
+    "device_id": lambda obj: _related_id(obj, "device"),
+    "virtual_machine_id": lambda obj: _related_id(obj, "virtual_machine"),
+    "site_id": lambda obj: _related_id(obj, "site"),
+    "scope_id": lambda obj: obj.get("scope_id"),
+}
+
+# Query parameters filtering objects by slug
+SLUG_FILTERS = {
+    "site": lambda obj: [(obj.get("site") or {}).get("slug")],
+    "role": lambda obj: [(obj.get("role") or {}).get("slug")],
+    "tag": lambda obj: [tag["slug"] for tag in obj.get("tags") or ()],
+}
+
+# Query parameters filtering objects by a range of ids
+RANGE_FILTERS = {
+    "id__gt": lambda value, object_id: object_id > value,
+    "id__lte": lambda value, object_id: object_id <= value,
+}
+
+BRIEF_FIELDS = ["id", "url", "display", "name", "slug", "model", "parent"]
+
+QUERY_PARAMETERS = ["id", "name", "site", "site_id", "role", "tag", "status"]
+
+
+def _related_id(obj, key):
+    related = obj.get(key)
+    if related is None and isinstance(obj.get("assigned_object"), dict):
+        # IP addresses are filtered by the host of their interface
+        related = obj["assigned_object"].get(key)
+
+    return related["id"] if isinstance(related, dict) else None
+
+
+class MockNetboxHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = parse_qsl(url.query)
+        endpoint = url.path[len("/api/") :].strip("/")  # noqa: E203
+
+        with server.lock:
+            server.requests[endpoint] += 1
+
+        if endpoint == "status":
+            return self.send_json({"netbox-version": server.netbox_version})
+        if endpoint == "schema":
+            return self.send_json(server.schema)
+        if endpoint not in server.dataset:
+            return self.send_json({"detail": "Not found."}, status=404)
+
+        objects = server.filter(endpoint, query)
+
+        params = dict(query)
+        limit = int(params.get("limit", 50))
+        if limit == 0 or limit > server.max_page_size:
+            limit = server.max_page_size
+        offset = int(params.get("offset", 0))
+        page = objects[offset : offset + limit]  # noqa: E203
+
+        fields = None
+        if params.get("fields"):
+            fields = params["fields"].split(",")
+        elif params.get("brief") in ("1", "true", "True"):
+            fields = BRIEF_FIELDS
+        if fields:
+            page = [
+                dict((key, obj[key]) for key in fields if key in obj) for obj in page
+            ]
+
+        next_url = None
+        if offset + limit < len(objects):
+            next_query = [
+                (key, value) for key, value in query if key not in ("limit", "offset")
+            ]
+            next_query.extend([("limit", limit), ("offset", offset + limit)])
+            next_url = "%s%s?%s" % (server.url, url.path, urlencode(next_query))
+
+        self.send_json(
+            {
+                "count": len(objects),
+                "next": next_url,
+                "previous": None,
+                "results": page,
+            }
+        )
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json"}
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+
+        with self.server.lock:
+            self.server.bytes_sent += len(body)
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MockNetbox(ThreadingHTTPServer):
+    """NetBox API stand-in, serving dataset on a local port until shutdown() is called"""
+
+    daemon_threads = True
+
+    def __init__(
+        self, dataset=None, netbox_version="4.2.0", max_page_size=1000, port=0
+    ):
+        super(MockNetbox, self).__init__(("127.0.0.1", port), MockNetboxHandler)
+        self.url = "http://127.0.0.1:%s" % self.server_port
+        self.netbox_version = netbox_version
+        self.max_page_size = max_page_size
+        self.lock = threading.Lock()
+        self.schema = {
+            "info": {"version": netbox_version},
+            "paths": dict(
+                (path, {"get": {"parameters": [{"name": p} for p in QUERY_PARAMETERS]}})
+                for path in (
+                    "/api/dcim/devices/",
+                    "/api/virtualization/virtual-machines/",
+                )
+            ),
+        }
+        self.set_dataset(dataset or {})
+        self.reset_stats()
+
+    def set_dataset(self, dataset):
+        self.dataset = dataset
+        # Per endpoint and filter, index of filter value to positions of the matching objects
+        self._indexes = {}
+
+    def reset_stats(self):
+        with self.lock:
+            self.requests = Counter()
+            self.bytes_sent = 0
+
+    def _index(self, endpoint, name, values_of):
+        key = (endpoint, name)
+        with self.lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = defaultdict(list)
+                for position, obj in enumerate(self.dataset[endpoint]):
+                    for value in values_of(obj):
+                        index[value].append(position)
+                self._indexes[key] = index
+
+        return index
+
+    def filter(self, endpoint, query):
+        # Objects of endpoint matching all filters of query, in the order of the dataset
+        objects = self.dataset[endpoint]
+
+        filters = defaultdict(set)
+        id_ranges = []
+        for key, value in query:
+            if key in ID_FILTERS:
+                filters[key].add(int(value))
+            elif key in SLUG_FILTERS:
+                filters[key].add(value)
+            elif key in RANGE_FILTERS:
+                id_ranges.append(partial(RANGE_FILTERS[key], int(value)))
+
+        if filters:
+            objects = self._filter_indexed(endpoint, filters)
+
+        if id_ranges:
+            objects = [
+                obj for obj in objects if all(check(obj["id"]) for check in id_ranges)
+            ]
+
+        return objects
+
+    def _filter_indexed(self, endpoint, filters):
+        positions = None
+        for name, values in filters.items():
+            if name in ID_FILTERS:
+                get_id = ID_FILTERS[name]
+                index = self._index(endpoint, name, lambda obj: [get_id(obj)])
+            else:
+                index = self._index(endpoint, name, SLUG_FILTERS[name])
+
+            matching = set()
+            for value in values:
+                matching.update(index.get(value, ()))
+
+            positions = matching if positions is None else positions & matching
+
+        objects = self.dataset[endpoint]
+        return [objects[position] for position in sorted(positions)]
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
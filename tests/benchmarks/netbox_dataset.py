@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Generate synthetic NetBox datasets to benchmark the nb_inventory plugin.
+
+The dataset is a dictionary of API endpoint (for example "dcim/devices") to the
+list of objects returned by NetBox v4.2 for that endpoint. Nested objects use
+the brief representation of NetBox, with their "url".
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import argparse
+import json
+import random
+
+
+def _brief(base_url, endpoint, obj, *fields):
+    nested = {
+        "id": obj["id"],
+        "url": "%s/api/%s/%s/" % (base_url, endpoint, obj["id"]),
+        "display": obj.get("name", obj.get("model")),
+    }
+    for field in fields or ("name", "slug"):
+        nested[field] = obj[field]
+
+    return nested
+
+
+def _tree(base_url, endpoint, count, prefix, children_per_node=4):
+    # Objects with a "parent", each having up to children_per_node children
+    objects = []
+    for object_id in range(1, count + 1):
+        parent_id = (object_id - 2) // children_per_node + 1 if object_id > 1 else None
+        obj = {
+            "id": object_id,
+            "name": "%s %s" % (prefix, object_id),
+            "slug": "%s_%s" % (prefix.replace("-", "_"), object_id),
+            "parent": None,
+        }
+        if parent_id is not None:
+            obj["parent"] = _brief(base_url, endpoint, objects[parent_id - 1])
+        objects.append(obj)
+
+    return objects
+
+
+def generate_dataset(
+    base_url,
+    devices=10000,
+    vms=None,
+    interfaces_per_host=4,
+    services_per_host=1,
+    virtual_disks_per_vm=2,
+    devices_per_site=50,
+    seed=0,
+):
+    """Returns a dataset of the given number of devices and VMs.
+
+    Every host gets interfaces_per_host interfaces, the first one with an IP
+    address used as the primary IP of the host. One host in three gets
+    services_per_host services.
+    """
+    rng = random.Random(seed)
+    if vms is None:
+        vms = devices // 10
+
+    def brief(endpoint, obj, *fields):
+        return _brief(base_url, endpoint, obj, *fields)
+
+    site_count = max(1, devices // devices_per_site)
+
+    regions = _tree(base_url, "dcim/regions", max(1, site_count // 10), "region")
+    site_groups = _tree(base_url, "dcim/site-groups", 8, "site-group")
+    tenants = [
+        {"id": i, "name": "Tenant %s" % i, "slug": "tenant_%s" % i}
+        for i in range(1, 21)
+    ]
+    sites = [
+        {
+            "id": i,
+            "name": "Site %s" % i,
+            "slug": "site_%s" % i,
+            "status": {"value": "active", "label": "Active"},
+            "region": brief("dcim/regions", rng.choice(regions)),
+            "group": brief("dcim/site-groups", rng.choice(site_groups)),
+            "tenant": brief("tenancy/tenants", rng.choice(tenants)),
+            "facility": "Facility %s" % i,
+            "time_zone": rng.choice(["UTC", "Europe/Paris", "America/New_York"]),
+            "description": "",
+            "physical_address": "%s Main Street" % i,
+            "prefix_count": 1,
+            "latitude": None,
+            "longitude": None,
+            "tags": [],
+            "custom_fields": {},
+        }
+        for i in range(1, site_count + 1)
+    ]
+    locations = [
+        {
+            "id": site["id"],
+            "name": "Location %s" % site["id"],
+            "slug": "location_%s" % site["id"],
+            "parent": None,
+            "site": brief("dcim/sites", site),
+        }
+        for site in sites
+    ]
+    racks = [
+        {
+            "id": i,
+            "name": "Rack %s" % i,
+            "group": None,
+            "role": None,
+            "site": brief("dcim/sites", sites[(i - 1) // 4]),
+            "location": brief("dcim/locations", locations[(i - 1) // 4]),
+        }
+        for i in range(1, site_count * 4 + 1)
+    ]
+    device_roles = [
+        {"id": i, "name": name, "slug": name}
+        for i, name in enumerate(["router", "switch", "firewall", "server"], 1)
+    ]
+    platforms = [
+        {"id": i, "name": name, "slug": name}
+        for i, name in enumerate(["ios", "junos", "eos", "linux"], 1)
+    ]
+    manufacturers = [
+        {"id": i, "name": name, "slug": name}
+        for i, name in enumerate(["cisco", "juniper", "arista"], 1)
+    ]
+    device_types = [
+        {
+            "id": i,
+            "model": "Model %s" % i,
+            "slug": "model_%s" % i,
+            "manufacturer": brief("dcim/manufacturers", manufacturers[i % 3]),
+        }
+        for i in range(1, 11)
+    ]
+    tags = [
+        {"id": i, "name": "Tag %s" % i, "slug": "tag_%s" % i, "color": "9e9e9e"}
+        for i in range(1, 11)
+    ]
+    cluster_types = [{"id": 1, "name": "VMware", "slug": "vmware"}]
+    cluster_groups = [{"id": 1, "name": "Cluster group", "slug": "cluster_group"}]
+    clusters = [
+        {
+            "id": i,
+            "name": "Cluster %s" % i,
+            "type": brief("virtualization/cluster-types", cluster_types[0]),
+            "group": brief("virtualization/cluster-groups", cluster_groups[0]),
+            "scope_type": "dcim.site",
+            "scope_id": sites[i % site_count]["id"],
+            "scope": brief("dcim/sites", sites[i % site_count]),
+        }
+        for i in range(1, max(1, vms // 100) + 1)
+    ]
+
+    dataset = {
+        "dcim/regions": regions,
+        "dcim/site-groups": site_groups,
+        "dcim/sites": sites,
+        "dcim/locations": locations,
+        "dcim/racks": racks,
+        "dcim/rack-groups": [],
+        "dcim/device-roles": device_roles,
+        "dcim/platforms": platforms,
+        "dcim/manufacturers": manufacturers,
+        "dcim/device-types": device_types,
+        "tenancy/tenants": tenants,
+        "extras/tags": tags,
+        "virtualization/cluster-types": cluster_types,
+        "virtualization/cluster-groups": cluster_groups,
+        "virtualization/clusters": clusters,
+        "dcim/devices": [],
+        "dcim/interfaces": [],
+        "virtualization/virtual-machines": [],
+        "virtualization/interfaces": [],
+        "virtualization/virtual-disks": [],
+        "ipam/ip-addresses": [],
+        "ipam/services": [],
+        "ipam/prefixes": [],
+        "extras/config-contexts": [],
+        "core/object-changes": [],
+    }
+
+    ip_ids = iter(range(1, (devices + vms) * interfaces_per_host + 1))
+    service_ids = iter(range(1, (devices + vms) * services_per_host + 1))
+
+    def add_host(host, host_type, interface_endpoint, interface_type):
+        host_key = "device" if host_type == "dcim/devices" else "virtual_machine"
+        nested_host = brief(host_type, host, "name")
+
+        for index in range(interfaces_per_host):
+            interface_id = (host["id"] - 1) * interfaces_per_host + index + 1
+            interface = {
+                "id": interface_id,
+                "url": "%s/api/%s/%s/" % (base_url, interface_endpoint, interface_id),
+                "name": "eth%s" % index,
+                host_key: nested_host,
+                "enabled": True,
+                "mtu": 1500,
+                "mac_address": "00:00:%02x:%02x:%02x:%02x"
+                % (
+                    interface_id >> 24 & 255,
+                    interface_id >> 16 & 255,
+                    interface_id >> 8 & 255,
+                    interface_id & 255,
+                ),
+                "description": "",
+                "mode": None,
+                "tags": [],
+                "count_ipaddresses": 1 if index == 0 else 0,
+            }
+            dataset[interface_endpoint].append(interface)
+
+            if index:
+                continue
+
+            ip_id = next(ip_ids)
+            ipaddress = {
+                "id": ip_id,
+                "url": "%s/api/ipam/ip-addresses/%s/" % (base_url, ip_id),
+                "address": "10.%s.%s.%s/16"
+                % (ip_id >> 16 & 255, ip_id >> 8 & 255, ip_id & 255),
+                "status": {"value": "active", "label": "Active"},
+                "dns_name": "%s.example.com" % host["name"],
+                "assigned_object_type": interface_type,
+                "assigned_object_id": interface_id,
+                "assigned_object": {
+                    "id": interface_id,
+                    "url": interface["url"],
+                    "name": interface["name"],
+                    host_key: nested_host,
+                },
+                "tags": [],
+            }
+            dataset["ipam/ip-addresses"].append(ipaddress)
+            host["primary_ip"] = host["primary_ip4"] = {
+                "id": ip_id,
+                "url": ipaddress["url"],
+                "address": ipaddress["address"],
+                "family": 4,
+            }
+
+        host["interface_count"] = interfaces_per_host
+
+        if host["id"] % 3 == 0:
+            for index in range(services_per_host):
+                service_id = next(service_ids)
+                dataset["ipam/services"].append(
+                    {
+                        "id": service_id,
+                        "name": "service-%s" % index,
+                        "protocol": {"value": "tcp", "label": "TCP"},
+                        "ports": [22 + index],
+                        "device": nested_host if host_key == "device" else None,
+                        "virtual_machine": (
+                            nested_host if host_key == "virtual_machine" else None
+                        ),
+                        "ipaddresses": [],
+                        "tags": [],
+                    }
+                )
+
+    for device_id in range(1, devices + 1):
+        site = sites[(device_id - 1) // devices_per_site % site_count]
+        device = {
+            "id": device_id,
+            "url": "%s/api/dcim/devices/%s/" % (base_url, device_id),
+            "name": "device-%s" % device_id,
+            "display": "device-%s" % device_id,
+            "device_type": brief(
+                "dcim/device-types", rng.choice(device_types), "model", "slug"
+            ),
+            "role": brief("dcim/device-roles", rng.choice(device_roles)),
+            "tenant": brief("tenancy/tenants", rng.choice(tenants)),
+            "platform": brief("dcim/platforms", rng.choice(platforms)),
+            "serial": "SN%08d" % device_id,
+            "asset_tag": None,
+            "site": brief("dcim/sites", site),
+            "location": brief("dcim/locations", locations[site["id"] - 1]),
+            "rack": brief("dcim/racks", racks[(site["id"] - 1) * 4], "name"),
+            "status": {"value": "active", "label": "Active"},
+            "primary_ip": None,
+            "primary_ip4": None,
+            "primary_ip6": None,
+            "oob_ip": None,
+            "cluster": None,
+            "virtual_chassis": None,
+            "config_context": {"ntp_servers": ["192.0.2.1", "192.0.2.2"]},
+            "local_context_data": None,
+            "tags": [
+                brief("extras/tags", tag) for tag in rng.sample(tags, rng.randint(0, 3))
+            ],
+            "custom_fields": {"owner": "team-%s" % (device_id % 7), "ticket": None},
+        }
+        add_host(device, "dcim/devices", "dcim/interfaces", "dcim.interface")
+        dataset["dcim/devices"].append(device)
+
+    for vm_id in range(1, vms + 1):
+        cluster = clusters[(vm_id - 1) % len(clusters)]
+        vm = {
+            "id": vm_id,
+            "url": "%s/api/virtualization/virtual-machines/%s/" % (base_url, vm_id),
+            "name": "vm-%s" % vm_id,
+            "display": "vm-%s" % vm_id,
+            "role": brief("dcim/device-roles", device_roles[3]),
+            "tenant": brief("tenancy/tenants", rng.choice(tenants)),
+            "platform": brief("dcim/platforms", platforms[3]),
+            "site": cluster["scope"],
+            "cluster": brief("virtualization/clusters", cluster, "name"),
+            "status": {"value": "active", "label": "Active"},
+            "primary_ip": None,
+            "primary_ip4": None,
+            "primary_ip6": None,
+            "vcpus": 2,
+            "memory": 4096,
+            "disk": 40 * virtual_disks_per_vm,
+            "config_context": {},
+            "local_context_data": None,
+            "tags": [],
+            "custom_fields": {"owner": "team-%s" % (vm_id % 7), "ticket": None},
+            "virtual_disk_count": virtual_disks_per_vm,
+        }
+        add_host(
+            vm,
+            "virtualization/virtual-machines",
+            "virtualization/interfaces",
+            "virtualization.vminterface",
+        )
+        dataset["virtualization/virtual-machines"].append(vm)
+
+        for index in range(virtual_disks_per_vm):
+            disk_id = (vm_id - 1) * virtual_disks_per_vm + index + 1
+            dataset["virtualization/virtual-disks"].append(
+                {
+                    "id": disk_id,
+                    "name": "disk-%s" % index,
+                    "size": 40,
+                    "virtual_machine": brief(
+                        "virtualization/virtual-machines", vm, "name"
+                    ),
+                }
+            )
+
+    for site in sites:
+        dataset["ipam/prefixes"].append(
+            {
+                "id": site["id"],
+                "prefix": "172.%s.%s.0/24" % (site["id"] >> 8 & 255, site["id"] & 255),
+                "scope_type": "dcim.site",
+                "scope_id": site["id"],
+                "scope": brief("dcim/sites", site),
+                "status": {"value": "active", "label": "Active"},
+            }
+        )
+
+    return dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--vms", type=int)
+    parser.add_argument("--interfaces-per-host", type=int, default=4)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("output", help="Path of the JSON file to write")
+    args = parser.parse_args()
+
+    dataset = generate_dataset(
+        args.base_url,
+        devices=args.devices,
+        vms=args.vms,
+        interfaces_per_host=args.interfaces_per_host,
+        seed=args.seed,
+    )
+    with open(args.output, "w") as file:
+        json.dump(dataset, file)
+
+
+if __name__ == "__main__":
+    main()
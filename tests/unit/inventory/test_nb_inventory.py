@@ -6,16 +6,42 @@ from __future__ import absolute_import, division, print_function
 
 __metaclass__ = type
 
+import asyncio
+import datetime
+import gzip
+import ipaddress
+import json
+import ssl
+import threading
+import time
+import zlib
+from io import BytesIO
 from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from unittest.mock import Mock, call, mock_open, patch
+from unittest.mock import ANY, Mock, call, mock_open, patch
 
 import pytest
+from ansible.errors import AnsibleError
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+from ansible.module_utils.six.moves.urllib import error as urllib_error
+from ansible.module_utils.six.moves.urllib.parse import parse_qsl, urlparse
 from packaging import version
 
 try:
     from ansible_collections.netbox.netbox.plugins.inventory.nb_inventory import (
+        AsyncHTTPTransport,
+        CacheCodec,
+        FetchStats,
         InventoryModule,
+        ObjectChanges,
+        PooledHTTPTransport,
+        RequestController,
+        SharedRequests,
+        decoded_response,
     )
     from ansible_collections.netbox.netbox.tests.unit.helpers.load_data import (
         load_test_data,
@@ -34,6 +60,170 @@ except ImportError:
 load_relative_test_data = partial(load_test_data, Path(__file__).resolve().parent)
 
 
+class MockNetboxHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        self.server.connections.add(self.client_address)
+        if isinstance(self.connection, ssl.SSLSocket):
+            self.server.client_certificates.append(bool(self.connection.getpeercert()))
+
+        headers = {}
+        if self.path.startswith("/stall"):
+            # Never respond, until the client closes the connection
+            self.server.stalled.set()
+            self.rfile.read(1)
+            self.server.closed.set()
+            self.close_connection = True
+            return
+        elif self.path.startswith("/forbidden"):
+            status, payload = 403, {"detail": "Permission denied"}
+        elif (
+            self.path.startswith("/unavailable")
+            and self.server.requests.count(self.path) == 1
+        ):
+            # Only the first request of each URL fails
+            status, payload = 503, {"detail": "Service unavailable"}
+            headers["Retry-After"] = "0"
+        elif self.path.startswith("/redirect"):
+            self.send_response(302)
+            self.send_header("Location", "/api/dcim/sites/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        else:
+            status, payload = 200, {"results": [{"id": 1}], "next": None}
+
+        body = json.dumps(payload).encode()
+        accept_encoding = self.headers.get("Accept-Encoding", "")
+        if self.path.startswith("/deflate") and "deflate" in accept_encoding:
+            # Raw deflate data, without the zlib header
+            compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+            body = compressor.compress(body) + compressor.flush()
+            headers["Content-Encoding"] = "deflate"
+        elif "gzip" in accept_encoding:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        self.server.bytes_sent.append(len(body))
+
+        if self.path.startswith("/chunked"):
+            headers["Transfer-Encoding"] = "chunked"
+        else:
+            headers["Content-Length"] = str(len(body))
+        if self.path.startswith("/close"):
+            headers["Connection"] = "close"
+            self.close_connection = True
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        if self.path.startswith("/chunked"):
+            for offset in range(0, len(body), 8):
+                chunk = body[offset : offset + 8]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        elif self.path.startswith("/slow"):
+            # Each part is sent within the timeout of the client, but not the whole body
+            for offset in range(0, len(body), len(body) // 4 + 1):
+                self.wfile.write(body[offset : offset + len(body) // 4 + 1])
+                time.sleep(0.2)
+        else:
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_netbox(ssl_context=None):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockNetboxHandler)
+    if ssl_context is not None:
+        server.socket = ssl_context.wrap_socket(
+            server.socket, server_side=True, do_handshake_on_connect=False
+        )
+        # Ignore the handshakes aborted by clients not trusting the certificate
+        server.handle_error = lambda request, client_address: None
+    server.requests = []
+    server.connections = set()
+    server.bytes_sent = []
+    server.client_certificates = []
+    server.stalled = threading.Event()
+    server.closed = threading.Event()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+@pytest.fixture
+def netbox_server():
+    server = serve_netbox()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def make_certificate(path, name):
+    # Self-signed certificate of 127.0.0.1, returns the paths of the certificate and its key
+    key = ec.generate_private_key(ec.SECP256R1())
+    subject = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, name)])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(subject)
+        .issuer_name(subject)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(
+            x509.SubjectAlternativeName(
+                [x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]
+            ),
+            critical=False,
+        )
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+
+    certificate_path = path / ("%s.crt" % name)
+    key_path = path / ("%s.key" % name)
+    certificate_path.write_bytes(certificate.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    return str(certificate_path), str(key_path)
+
+
+@pytest.fixture
+def tls_netbox_server(tmp_path):
+    server_certificate = make_certificate(tmp_path, "server")
+    client_certificate = make_certificate(tmp_path, "client")
+
+    # Client certificates are verified when sent, but not required
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(*server_certificate)
+    context.verify_mode = ssl.CERT_OPTIONAL
+    context.load_verify_locations(client_certificate[0])
+
+    server = serve_netbox(context)
+    server.server_certificate = server_certificate
+    server.client_certificate = client_certificate
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
 class MockInventory:
     def __init__(self):
         self.variables = {}
@@ -57,6 +247,23 @@ def inventory_fixture(
     inventory.allowed_device_query_parameters = allowed_device_query_parameters_fixture
     inventory.allowed_vm_query_parameters = allowed_vm_query_parameters_fixture
 
+    # Options read in parse()
+    inventory.page_fetch_workers = 1
+    inventory.chunk_fetch_workers = 1
+    inventory.fetch_workers = 4
+    inventory.fetch_engine = "threads"
+    inventory.field_projection = False
+    inventory.changelog_refresh = False
+    inventory._first_pages = {}
+    inventory.fetch_stats = None
+    inventory.shared_requests = False
+    inventory.offline_snapshot = None
+    inventory.offline_snapshot_import = False
+    inventory.config_context = False
+    inventory.local_config_context = False
+    inventory.hostvars = None
+    inventory.compression = False
+
     # Inventory mock, to validate what has been set via inventory.inventory.set_variable
     inventory.inventory = MockInventory()
 
@@ -162,6 +369,54 @@ def test_refresh_lookups(inventory_fixture):
     inventory_fixture.refresh_lookups([does_not_raise, does_not_raise])
 
 
+def test_run_fetch_tasks_order(inventory_fixture):
+    started = []
+    sites_done = threading.Event()
+
+    def task(name, wait_for=None):
+        def run():
+            if wait_for:
+                assert wait_for.wait(5)
+            started.append(name)
+            if name == "sites":
+                sites_done.set()
+
+        return run
+
+    inventory_fixture.run_fetch_tasks(
+        {
+            "api_docs": (task("api_docs"), []),
+            # Hosts can't complete before sites, which only depend on api_docs
+            "hosts": (task("hosts", wait_for=sites_done), ["api_docs"]),
+            "sites": (task("sites"), ["api_docs"]),
+            "prefixes": (task("prefixes"), ["sites"]),
+            "interfaces": (task("interfaces"), ["hosts"]),
+        }
+    )
+
+    assert started[0] == "api_docs"
+    assert started.index("sites") < started.index("hosts")
+    assert started.index("hosts") < started.index("interfaces")
+    assert len(started) == 5
+
+
+def test_run_fetch_tasks_exception(inventory_fixture):
+    dependent_task = Mock()
+
+    def raises_exception():
+        raise Exception("Error from within a thread")
+
+    with pytest.raises(Exception, match="Error from within a thread"):
+        inventory_fixture.run_fetch_tasks(
+            {
+                "fails": (raises_exception, []),
+                "dependent": (dependent_task, ["fails"]),
+            }
+        )
+
+    dependent_task.assert_not_called()
+
+
 @pytest.mark.parametrize(
     "plurals, services, virtual_disks, interfaces, dns_name, ansible_host_dns_name, racks, expected, not_expected",
     load_relative_test_data("group_extractors"),
@@ -295,3 +550,1350 @@ def test_rename_variables(inventory_fixture):
         "netbox_cluster": "staging",
         "netbox_cluster_id": "0xdeadbeef",
     }
+
+
+def test_compile_extraction_plan(inventory_fixture):
+    inventory_fixture.plurals = False
+    inventory_fixture.services = False
+    inventory_fixture.virtual_disks = False
+    inventory_fixture.interfaces = False
+    inventory_fixture.dns_name = False
+    inventory_fixture.ansible_host_dns_name = False
+    inventory_fixture.racks = False
+    inventory_fixture.flatten_config_context = True
+    inventory_fixture.flatten_custom_fields = False
+    inventory_fixture.flatten_local_context_data = False
+    inventory_fixture.group_by = ["tag", "site", "invalid"]
+    inventory_fixture.rename_variables = inventory_fixture.parse_rename_variables(
+        ({"pattern": r"tags", "repl": r"netbox_tags"},)
+    )
+
+    inventory_fixture.compile_extraction_plan()
+
+    plan = dict(
+        (attribute, (var_name, flatten))
+        for attribute, _extractor, var_name, flatten in inventory_fixture.host_vars_plan
+    )
+    assert plan["tag"] == ("netbox_tags", False)
+    assert plan["config_context"] == ("config_context", True)
+    assert plan["custom_fields"] == ("custom_fields", False)
+    assert [
+        (grouping, extractor is not None)
+        for grouping, extractor in inventory_fixture.group_by_plan
+    ] == [("tag", True), ("invalid", False)]
+    assert inventory_fixture.ip_host_vars_plan == {
+        "primary_ip4",
+        "primary_ip6",
+        "oob_ip",
+    }
+
+
+def test_render_config_context(inventory_fixture):
+    inventory_fixture.local_config_context = True
+    inventory_fixture.api_endpoint = "https://netbox.test.endpoint:1234"
+    inventory_fixture.sites_region_lookup = {1: 11}
+    inventory_fixture.regions_parent_lookup = {11: 10}
+    inventory_fixture.sites_site_group_lookup = {}
+    inventory_fixture.site_groups_parent_lookup = {}
+    inventory_fixture.locations_parent_lookup = {}
+    inventory_fixture.clusters_type_lookup = {}
+    inventory_fixture.clusters_group_lookup = {}
+    # Tenant 5 is in tenant group 51, nested in tenant group 50
+    inventory_fixture.tenants_group_lookup = {5: 51}
+    inventory_fixture.tenant_groups_parent_lookup = {51: 50, 50: None}
+    inventory_fixture.get_resource_list = lambda api_url: [
+        # Merged by weight, then name
+        {"name": "b", "weight": 1000, "data": {"ntp": {"servers": ["b"]}}},
+        {"name": "a", "weight": 1000, "data": {"ntp": {"servers": ["a"], "v": 4}}},
+        {"name": "global", "weight": 10, "data": {"dns": "8.8.8.8", "ntp": {}}},
+        {
+            "name": "parent_region",
+            "weight": 2000,
+            "regions": [{"id": 10}],
+            "tags": ["core"],
+            "data": {"dns": "192.0.2.53"},
+        },
+        {
+            "name": "other_tag",
+            "weight": 3000,
+            "tags": ["edge"],
+            "data": {"x": 1},
+        },
+        {
+            "name": "tenant_group",
+            "weight": 3000,
+            "tenant_groups": [{"id": 50}],
+            "data": {"y": 1},
+        },
+    ]
+    inventory_fixture.refresh_config_contexts()
+
+    host = {
+        "site": {"id": 1},
+        "tenant": {"id": 5},
+        "tags": [{"slug": "core"}],
+        "local_context_data": {"ntp": {"v": 3}},
+    }
+    assert inventory_fixture._render_config_context(host) == {
+        "dns": "192.0.2.53",
+        "ntp": {"servers": ["b"], "v": 3},
+        "y": 1,
+    }
+
+    # Hosts matching the same criteria share the merged config contexts
+    assert inventory_fixture._render_config_context({"site": {"id": 2}}) == {
+        "dns": "8.8.8.8",
+        "ntp": {"servers": ["b"], "v": 4},
+    }
+    assert len(inventory_fixture._config_context_cache) == 2
+
+
+def test_refresh_tenant_groups_lookup(inventory_fixture):
+    inventory_fixture.api_endpoint = "https://netbox.test.endpoint:1234"
+    inventory_fixture.tenants_group_lookup = {5: 51, 6: None}
+    inventory_fixture.get_referenced_resource_list = Mock(
+        return_value=[
+            {"id": 51, "parent": {"id": 50}},
+            {"id": 50, "parent": None},
+        ]
+    )
+
+    inventory_fixture.refresh_tenant_groups_lookup()
+
+    assert inventory_fixture.tenant_groups_parent_lookup == {51: 50, 50: None}
+    _args, kwargs = inventory_fixture.get_referenced_resource_list.call_args
+    assert kwargs["parent_key"] == "parent"
+    assert list(kwargs["ids"]) == [51, None]
+
+
+def test_hostvars_lookups(inventory_fixture):
+    inventory_fixture.plurals = True
+    inventory_fixture.config_context = False
+    inventory_fixture.virtual_disks = False
+    inventory_fixture.interfaces = False
+    inventory_fixture.services = False
+    inventory_fixture.racks = False
+    inventory_fixture.dns_name = False
+    inventory_fixture.ansible_host_dns_name = False
+    inventory_fixture.flatten_config_context = False
+    inventory_fixture.flatten_custom_fields = False
+    inventory_fixture.flatten_local_context_data = False
+    inventory_fixture.rename_variables = []
+    inventory_fixture.hostvars = ["tags", "regions", "primary_ip4"]
+    inventory_fixture.group_by = ["platforms"]
+
+    assert [lookup.__name__ for lookup in inventory_fixture.lookup_processes] == [
+        "refresh_sites_lookup",
+        "refresh_regions_lookup",
+        "refresh_platforms_lookup",
+    ]
+
+    inventory_fixture.compile_extraction_plan()
+    assert [
+        var_name
+        for _attribute, _extractor, var_name, _flatten in inventory_fixture.host_vars_plan
+    ] == ["regions", "tags"]
+    assert [grouping for grouping, _extractor in inventory_fixture.group_by_plan] == [
+        "platforms"
+    ]
+    assert inventory_fixture.ip_host_vars_plan == {"primary_ip4"}
+
+
+def test_get_referenced_resource_list(inventory_fixture):
+    regions = {
+        1: {"id": 1, "slug": "world", "parent": None},
+        2: {"id": 2, "slug": "europe", "parent": {"id": 1}},
+        3: {"id": 3, "slug": "germany", "parent": {"id": 2}},
+        4: {"id": 4, "slug": "france", "parent": {"id": 2}},
+    }
+    requested = []
+
+    def get_resource_list_chunked(api_url, query_key, query_values):
+        requested.append(query_values)
+        return [regions[region_id] for region_id in query_values]
+
+    inventory_fixture.fetch_all = False
+    inventory_fixture.get_resource_list_chunked = get_resource_list_chunked
+
+    resources = inventory_fixture.get_referenced_resource_list(
+        "https://netbox.test.endpoint:1234/api/dcim/regions/?limit=0",
+        ids=iter([3, None, 4]),
+        parent_key="parent",
+    )
+
+    # Parents are fetched until the root, once each
+    assert requested == [[3, 4], [2], [1]]
+    assert [region["slug"] for region in resources] == [
+        "germany",
+        "france",
+        "europe",
+        "world",
+    ]
+
+
+@pytest.mark.parametrize(
+    "api_version, url, query_key, prefix, expected",
+    [
+        (
+            "4.2",
+            "/api/ipam/prefixes/?limit=0&scope_type=dcim.site",
+            "scope_id",
+            {"id": 10, "scope_type": "dcim.site", "scope": {"id": 2}},
+            {"id": 10, "scope_type": "dcim.site", "scope": {"id": 2}},
+        ),
+        (
+            "4.1",
+            "/api/ipam/prefixes/?limit=0",
+            "site_id",
+            {"id": 10, "site": {"id": 2}},
+            # The site is removed from prefixes assigned to a site
+            {"id": 10},
+        ),
+    ],
+)
+def test_refresh_prefixes(
+    inventory_fixture, api_version, url, query_key, prefix, expected
+):
+    requests = []
+
+    def get_resource_list_chunked(api_url, query_key, query_values):
+        requests.append((api_url, query_key, query_values))
+        return [prefix]
+
+    inventory_fixture.api_version = version.Version(api_version)
+    inventory_fixture.get_resource_list_chunked = get_resource_list_chunked
+    inventory_fixture.sites_with_prefixes = {1, 2, 3}
+    inventory_fixture.devices_list = [{"site": {"id": 2}}, {"site": {"id": 4}}]
+    inventory_fixture.vms_list = [{"site": {"id": 1}}, {"site": None}]
+
+    inventory_fixture.refresh_prefixes()
+
+    # Only the sites of the hosts that have prefixes
+    assert requests == [(inventory_fixture.api_endpoint + url, query_key, [1, 2])]
+    assert inventory_fixture.prefixes_sites_lookup == {2: [expected]}
+
+
+def test_referenced_lookup_fetch_all(inventory_fixture):
+    inventory_fixture.api_version = version.Version("4.2")
+    inventory_fixture.fetch_all = True
+    inventory_fixture.get_resource_list = Mock(
+        return_value=[{"id": 1, "slug": "group", "parent": None}]
+    )
+
+    # Lookups don't wait for the lookups their ids come from when fetching everything
+    inventory_fixture.refresh_site_groups_lookup()
+
+    assert inventory_fixture.site_groups_lookup == {1: "group"}
+
+
+def test_interface_views(inventory_fixture):
+    interface = {"id": 10, "name": "eth0", "tags": [{"id": 1, "slug": "uplink"}]}
+    ipaddress = {"id": 20, "address": "192.0.2.1/24"}
+
+    inventory_fixture.interfaces = True
+    inventory_fixture.ipaddresses_intf_lookup = {}
+    inventory_fixture.device_interfaces_lookup = {1: {10: interface}}
+    inventory_fixture.device_ipaddresses_intf_lookup = {10: {20: ipaddress}}
+    inventory_fixture.vm_interfaces_lookup = {2: {}}
+    inventory_fixture.vm_ipaddresses_intf_lookup = {}
+
+    inventory_fixture._build_interface_views()
+
+    assert inventory_fixture.extract_interfaces({"id": 1, "is_virtual": False}) == [
+        {
+            "id": 10,
+            "name": "eth0",
+            "tags": ["uplink"],
+            "ip_addresses": [ipaddress],
+        }
+    ]
+    assert inventory_fixture.extract_interfaces({"id": 2, "is_virtual": True}) == []
+    assert inventory_fixture.extract_interfaces({"id": 3, "is_virtual": True}) == []
+    # The interfaces lookup keeps the original interface
+    assert interface == {
+        "id": 10,
+        "name": "eth0",
+        "tags": [{"id": 1, "slug": "uplink"}],
+    }
+
+
+def test_ancestors_closure(inventory_fixture):
+    regions_lookup = {1: "world", 2: "europe", 3: "france", 4: "orphan"}
+    regions_parent_lookup = {1: None, 2: 1, 3: 2, 4: 5}
+
+    inventory_fixture.regions_ancestors = inventory_fixture._ancestors_closure(
+        regions_lookup, regions_parent_lookup
+    )
+    inventory_fixture.sites_region_lookup = {10: 3, 11: None, 12: 4}
+
+    assert inventory_fixture.regions_ancestors == {
+        1: ["world"],
+        2: ["europe", "world"],
+        3: ["france", "europe", "world"],
+    }
+    assert inventory_fixture.extract_regions({"site": {"id": 10}}) == [
+        "france",
+        "europe",
+        "world",
+    ]
+    assert inventory_fixture.extract_regions({"site": {"id": 11}}) == []
+    assert inventory_fixture.extract_regions({"site": None}) == []
+    with pytest.raises(KeyError):
+        inventory_fixture.extract_regions({"site": {"id": 12}})
+
+
+@pytest.mark.parametrize(
+    "transport_class",
+    [PooledHTTPTransport, partial(AsyncHTTPTransport, max_concurrent_requests=4)],
+)
+def test_transport_reuses_connections(netbox_server, transport_class):
+    base_url = "http://127.0.0.1:%s" % netbox_server.server_port
+    transport = transport_class(
+        pool_size=2,
+        keepalive=30,
+        headers={"Authorization": "Token abc"},
+        timeout=5,
+        validate_certs=True,
+        follow_redirects="urllib2",
+        client_cert=False,
+        client_key=False,
+        ca_path=False,
+    )
+
+    try:
+        for page in range(3):
+            response = transport.open(base_url + "/api/dcim/devices/?offset=%s" % page)
+            assert json.loads(response.read())["results"] == [{"id": 1}]
+
+        # Redirects are followed on the same connection
+        transport.open(base_url + "/redirect")
+
+        with pytest.raises(urllib_error.HTTPError) as e:
+            transport.open(base_url + "/forbidden")
+        assert e.value.code == 403
+    finally:
+        transport.close()
+
+    assert len(netbox_server.requests) == 6
+    assert netbox_server.requests[4] == "/api/dcim/sites/"
+    assert len(netbox_server.connections) == 1
+
+
+def transport_kwargs(**kwargs):
+    # Arguments of the transports, as passed by parse()
+    return dict(
+        dict(
+            pool_size=2,
+            keepalive=30,
+            headers={},
+            timeout=5,
+            validate_certs=True,
+            follow_redirects="urllib2",
+            client_cert=False,
+            client_key=False,
+            ca_path=False,
+        ),
+        **kwargs
+    )
+
+
+TRANSPORT_CLASSES = [
+    PooledHTTPTransport,
+    partial(AsyncHTTPTransport, max_concurrent_requests=4),
+]
+
+
+@pytest.mark.parametrize("accept_encoding", ["identity", "gzip"])
+@pytest.mark.parametrize("transport_class", TRANSPORT_CLASSES)
+def test_transport_response_framing(netbox_server, transport_class, accept_encoding):
+    base_url = "http://127.0.0.1:%s" % netbox_server.server_port
+    transport = transport_class(
+        **transport_kwargs(headers={"Accept-Encoding": accept_encoding})
+    )
+
+    try:
+        for path in ["/chunked", "/chunked", "/close", "/close"]:
+            response = transport.open(base_url + path)
+            assert json.loads(response.read())["results"] == [{"id": 1}]
+    finally:
+        transport.close()
+
+    # Chunked responses keep the connection alive, the server closes it after each "Connection: close" response
+    assert len(netbox_server.connections) == 2
+
+
+@pytest.mark.parametrize("transport_class", TRANSPORT_CLASSES)
+def test_transport_timeout(netbox_server, transport_class):
+    base_url = "http://127.0.0.1:%s" % netbox_server.server_port
+    transport = transport_class(**transport_kwargs(timeout=0.5))
+
+    try:
+        # The timeout applies to each read, not to the whole response
+        response = transport.open(base_url + "/slow")
+        assert json.loads(response.read())["results"] == [{"id": 1}]
+
+        with pytest.raises(urllib_error.URLError):
+            transport.open(base_url + "/stall")
+    finally:
+        transport.close()
+
+    # The connection of the request that timed out isn't left open
+    assert netbox_server.closed.wait(5)
+
+
+def test_async_transport_cancelled(netbox_server):
+    transport = AsyncHTTPTransport(max_concurrent_requests=4, **transport_kwargs())
+
+    try:
+        future = asyncio.run_coroutine_threadsafe(
+            transport._open_many(
+                ["http://127.0.0.1:%s/stall" % netbox_server.server_port]
+            ),
+            transport.loop,
+        )
+        assert netbox_server.stalled.wait(5)
+        future.cancel()
+
+        # The connection of the cancelled request is closed, instead of leaking
+        assert netbox_server.closed.wait(5)
+    finally:
+        transport.close()
+
+
+@pytest.mark.parametrize("transport_class", TRANSPORT_CLASSES)
+def test_transport_proxy(netbox_server, transport_class, monkeypatch):
+    monkeypatch.setenv("http_proxy", "http://127.0.0.1:%s" % netbox_server.server_port)
+    monkeypatch.delenv("no_proxy", raising=False)
+    monkeypatch.delenv("NO_PROXY", raising=False)
+    transport = transport_class(**transport_kwargs())
+
+    try:
+        response = transport.open("http://netbox.invalid/api/dcim/devices/")
+        assert json.loads(response.read())["results"] == [{"id": 1}]
+    finally:
+        transport.close()
+
+    # The mock server received the request as a proxy
+    assert netbox_server.requests == ["http://netbox.invalid/api/dcim/devices/"]
+
+
+@pytest.mark.parametrize(
+    "validate_certs, trusted, client_certificate, error",
+    [
+        (True, False, False, True),
+        (False, False, False, False),
+        (True, True, False, False),
+        (True, True, True, False),
+    ],
+    ids=["untrusted", "validate_certs_false", "ca_path", "client_cert"],
+)
+@pytest.mark.parametrize("transport_class", TRANSPORT_CLASSES)
+def test_transport_tls(
+    tls_netbox_server,
+    transport_class,
+    validate_certs,
+    trusted,
+    client_certificate,
+    error,
+):
+    kwargs = dict(validate_certs=validate_certs)
+    if trusted:
+        kwargs["ca_path"] = tls_netbox_server.server_certificate[0]
+    if client_certificate:
+        kwargs["client_cert"], kwargs["client_key"] = (
+            tls_netbox_server.client_certificate
+        )
+    transport = transport_class(**transport_kwargs(**kwargs))
+    url = "https://127.0.0.1:%s/api/dcim/devices/" % tls_netbox_server.server_port
+
+    try:
+        if error:
+            with pytest.raises(urllib_error.URLError):
+                transport.open(url)
+            assert tls_netbox_server.requests == []
+        else:
+            response = transport.open(url)
+            assert json.loads(response.read())["results"] == [{"id": 1}]
+            assert tls_netbox_server.client_certificates == [client_certificate]
+    finally:
+        transport.close()
+
+
+def test_fetch_information_permission_denied(inventory_fixture, netbox_server):
+    inventory_fixture.get_option = Mock(return_value=False)
+    inventory_fixture.display = Mock()
+    inventory_fixture.http_transport = PooledHTTPTransport(
+        pool_size=1,
+        keepalive=30,
+        headers={},
+        timeout=5,
+        validate_certs=True,
+        follow_redirects="urllib2",
+        client_cert=False,
+        client_key=False,
+        ca_path=False,
+    )
+
+    result = inventory_fixture._fetch_information(
+        "http://127.0.0.1:%s/forbidden" % netbox_server.server_port
+    )
+
+    assert result == {"results": [], "next": None}
+
+
+@pytest.mark.parametrize("page_fetch_workers", [1, 4])
+def test_get_resource_list_pagination(inventory_fixture, page_fetch_workers):
+    api_url = "https://netbox:1234/api/dcim/interfaces/?limit=0&device_id=1"
+    page_url = "https://netbox:1234/api/dcim/interfaces/?limit=2&device_id=1&offset=%s"
+    pages = {
+        api_url: {"count": 5, "next": page_url % 2, "results": [1, 2]},
+        page_url % 2: {"count": 5, "next": page_url % 4, "results": [3, 4]},
+        page_url % 4: {"count": 5, "next": None, "results": [5]},
+    }
+
+    mock_fetch_information = Mock(side_effect=lambda url, use_cache=True: pages[url])
+    inventory_fixture._fetch_information = mock_fetch_information
+    inventory_fixture.page_fetch_workers = page_fetch_workers
+
+    resources = inventory_fixture.get_resource_list(api_url)
+
+    assert resources == [1, 2, 3, 4, 5]
+    assert sorted(c.args[0] for c in mock_fetch_information.call_args_list) == sorted(
+        pages
+    )
+
+
+def test_get_resource_list_chunked_concurrently(inventory_fixture):
+    mock_get_resource_list = Mock(side_effect=lambda url: [url.rsplit("=", 1)[-1]])
+
+    inventory_fixture.get_resource_list = mock_get_resource_list
+    inventory_fixture.max_uri_length = 35
+    inventory_fixture.chunk_fetch_workers = 3
+
+    resources = inventory_fixture.get_resource_list_chunked(
+        "https://netbox:1234?limit=0", "key", [1, 2, 3, 4, 5]
+    )
+
+    assert mock_get_resource_list.call_count == 5
+    assert resources == ["1", "2", "3", "4", "5"]
+
+
+def test_fetch_engine_asyncio(inventory_fixture, netbox_server):
+    inventory_fixture.get_option = Mock(return_value=False)
+    inventory_fixture.display = Mock()
+    inventory_fixture.loader = Mock(load=lambda data, json_only: json.loads(data))
+    inventory_fixture.fetch_engine = "asyncio"
+    inventory_fixture.max_uri_length = 50
+    inventory_fixture.http_transport = AsyncHTTPTransport(
+        max_concurrent_requests=2,
+        pool_size=2,
+        keepalive=30,
+        headers={},
+        timeout=5,
+        validate_certs=True,
+        follow_redirects="urllib2",
+        client_cert=False,
+        client_key=False,
+        ca_path=False,
+    )
+
+    try:
+        resources = inventory_fixture.get_resource_list_chunked(
+            "http://127.0.0.1:%s/api/dcim/interfaces/?limit=0"
+            % netbox_server.server_port,
+            "device_id",
+            range(1, 6),
+        )
+    finally:
+        inventory_fixture.http_transport.close()
+
+    assert resources == [{"id": 1}] * 5
+    assert sorted(netbox_server.requests) == [
+        "/api/dcim/interfaces/?limit=0&device_id=%s" % i for i in range(1, 6)
+    ]
+
+
+@pytest.mark.parametrize("path", ["/api/dcim/devices/", "/deflate"])
+@pytest.mark.parametrize("http_transport", [None, "pooled", "asyncio"])
+def test_compression(inventory_fixture, netbox_server, http_transport, path):
+    url = "http://127.0.0.1:%s%s" % (netbox_server.server_port, path)
+    transport_kwargs = dict(
+        headers={"Accept-Encoding": "gzip, deflate"},
+        timeout=5,
+        validate_certs=True,
+        follow_redirects="urllib2",
+        client_cert=False,
+        client_key=False,
+        ca_path=False,
+    )
+
+    inventory_fixture.get_option = Mock(return_value=False)
+    inventory_fixture.display = Mock()
+    inventory_fixture.loader = Mock(load=lambda data, json_only: json.loads(data))
+    inventory_fixture.compression = True
+    inventory_fixture._transfer_lock = threading.Lock()
+    inventory_fixture._transfer_bytes = [0, 0]
+    inventory_fixture.headers = transport_kwargs["headers"]
+    inventory_fixture.timeout = 5
+    inventory_fixture.validate_certs = True
+    inventory_fixture.follow_redirects = "urllib2"
+    inventory_fixture.cert = None
+    inventory_fixture.key = None
+    inventory_fixture.ca_path = None
+    inventory_fixture.http_transport = None
+    if http_transport == "asyncio":
+        inventory_fixture.fetch_engine = "asyncio"
+        inventory_fixture.http_transport = AsyncHTTPTransport(
+            max_concurrent_requests=2, pool_size=2, keepalive=30, **transport_kwargs
+        )
+    elif http_transport == "pooled":
+        inventory_fixture.http_transport = PooledHTTPTransport(
+            pool_size=2, keepalive=30, **transport_kwargs
+        )
+
+    try:
+        results = inventory_fixture._fetch_information_many([url], 1)
+    finally:
+        if inventory_fixture.http_transport is not None:
+            inventory_fixture.http_transport.close()
+
+    payload = {"results": [{"id": 1}], "next": None}
+    assert results == [payload]
+    # Bytes received compressed, and decompressed
+    assert inventory_fixture._transfer_bytes == [
+        netbox_server.bytes_sent[0],
+        len(json.dumps(payload)),
+    ]
+
+
+@pytest.mark.parametrize("fetch_engine", ["threads", "asyncio"])
+def test_request_controller_retries(inventory_fixture, netbox_server, fetch_engine):
+    url = "http://127.0.0.1:%s/unavailable" % netbox_server.server_port
+    transport_kwargs = dict(
+        pool_size=2,
+        keepalive=30,
+        headers={},
+        timeout=5,
+        validate_certs=True,
+        follow_redirects="urllib2",
+        client_cert=False,
+        client_key=False,
+        ca_path=False,
+    )
+
+    controller = RequestController(max_window=4, adaptive=True, max_retries=1)
+    inventory_fixture.get_option = Mock(return_value=False)
+    inventory_fixture.display = Mock()
+    inventory_fixture.loader = Mock(load=lambda data, json_only: json.loads(data))
+    inventory_fixture.fetch_engine = fetch_engine
+    inventory_fixture.request_controller = controller
+    if fetch_engine == "asyncio":
+        inventory_fixture.http_transport = AsyncHTTPTransport(
+            max_concurrent_requests=4, controller=controller, **transport_kwargs
+        )
+    else:
+        inventory_fixture.http_transport = PooledHTTPTransport(**transport_kwargs)
+
+    try:
+        assert inventory_fixture._fetch_information_many([url], 1) == [
+            {"results": [{"id": 1}], "next": None}
+        ]
+    finally:
+        inventory_fixture.http_transport.close()
+
+    # Retried once, after the delay of the Retry-After header
+    assert netbox_server.requests == ["/unavailable", "/unavailable"]
+    assert controller.window == 2
+    assert controller.in_flight == 0
+
+
+def test_request_controller_window():
+    controller = RequestController(max_window=8, adaptive=True)
+
+    tickets = [controller.try_acquire() for _ in range(8)]
+    assert tickets == list(range(1, 9))
+    assert controller.try_acquire() == 0
+
+    # Requests in flight when the window was halved do not halve it again
+    for ticket in tickets:
+        controller.release(ticket, overloaded=True)
+    assert controller.window == 4
+
+    # Grows by one after a window of healthy responses
+    for _ in range(4):
+        controller.release(controller.try_acquire(), latency=0.1)
+    assert controller.window == 5
+
+    # Halved when the latency rises
+    for _ in range(6):
+        controller.release(controller.try_acquire(), latency=1)
+    assert controller.window == 3
+
+
+@pytest.mark.parametrize(
+    "error, attempt, expected",
+    [
+        (urllib_error.HTTPError("url", 503, "", {"Retry-After": "7"}, None), 0, 7),
+        (urllib_error.HTTPError("url", 429, "", {"Retry-After": "7"}, None), 2, None),
+        (urllib_error.HTTPError("url", 404, "", {}, None), 0, None),
+        (urllib_error.HTTPError("url", 502, "", {}, None), 1, (0, 4)),
+        (urllib_error.URLError("refused"), 0, (0, 2)),
+        (ValueError(), 0, None),
+    ],
+)
+def test_request_controller_retry_delay(error, attempt, expected):
+    controller = RequestController(max_retries=2, backoff=2)
+
+    delay = controller.retry_delay(error, attempt)
+
+    if isinstance(expected, tuple):
+        assert expected[0] <= delay <= expected[1]
+    else:
+        assert delay == expected
+
+
+def test_shared_requests():
+    shared_requests = SharedRequests()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def open_response(body):
+        calls.append(body)
+        started.set()
+        release.wait(5)
+        return BytesIO(body)
+
+    results = []
+    leader = threading.Thread(
+        target=lambda: results.append(
+            shared_requests.fetch("key", 60, partial(open_response, b"first"))
+        )
+    )
+    leader.start()
+    started.wait(5)
+
+    # Waits for the request in flight instead of sending its own
+    follower = threading.Thread(
+        target=lambda: results.append(
+            shared_requests.fetch("key", 60, partial(open_response, b"second"))
+        )
+    )
+    follower.start()
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert results == [b"first", b"first"]
+    assert calls == [b"first"]
+
+    # Completed responses are shared until they expire
+    assert shared_requests.get("key", 60) == b"first"
+    assert shared_requests.fetch("key", 60, partial(open_response, b"third")) == (
+        b"first"
+    )
+    assert shared_requests.fetch("key", -1, partial(open_response, b"third")) == (
+        b"third"
+    )
+    assert shared_requests.get("other", 60) is None
+
+
+def test_shared_requests_failure():
+    shared_requests = SharedRequests()
+
+    with pytest.raises(urllib_error.URLError):
+        shared_requests.fetch(
+            "key", 60, Mock(side_effect=urllib_error.URLError("refused"))
+        )
+
+    # Failed requests are not shared
+    assert shared_requests.get("key", 60) is None
+    assert (
+        shared_requests.fetch("key", 60, Mock(return_value=BytesIO(b"body"))) == b"body"
+    )
+
+
+def test_shared_requests_release():
+    shared_requests = SharedRequests(max_size=10)
+
+    # The oldest responses are released when the responses take more than max_size bytes
+    shared_requests.put("a", b"aaaa", 60)
+    shared_requests.put("b", b"bbbb", 60)
+    shared_requests.put("c", b"cccc", 60)
+    assert shared_requests.get("a", 60) is None
+    assert shared_requests.get("b", 60) == b"bbbb"
+    assert shared_requests.get("c", 60) == b"cccc"
+
+    # Responses larger than max_size are not kept
+    shared_requests.put("d", b"d" * 11, 60)
+    assert shared_requests.get("d", 60) is None
+
+    # Expired responses are released without waiting for another request
+    shared_requests.put("e", b"e", 0.1)
+    time.sleep(0.3)
+    assert shared_requests.get("b", 60) == b"bbbb"
+    assert "e" not in shared_requests._completed
+    assert shared_requests._size == 8
+
+
+def test_shared_request_key(inventory_fixture):
+    inventory_fixture.cert = inventory_fixture.key = inventory_fixture.ca_path = None
+    inventory_fixture.validate_certs = True
+    inventory_fixture.headers = {"Authorization": "Token a"}
+    key = inventory_fixture._shared_request_key("url")
+
+    inventory_fixture.headers = {"Authorization": "Token b"}
+    assert inventory_fixture._shared_request_key("url") != key
+
+    inventory_fixture.headers = {"Authorization": "Token a"}
+    assert inventory_fixture._shared_request_key("url") == key
+    assert key[0] == "url"
+
+
+def test_offline_snapshot(inventory_fixture, tmp_path):
+    api_url = inventory_fixture.api_endpoint + "/api/dcim/devices/?limit=0"
+    path = str(tmp_path / "snapshot")
+    options = {"snapshot_export": path, "snapshot_import": path}
+
+    inventory_fixture.get_option = Mock(side_effect=options.get)
+    inventory_fixture._fetch_information = Mock(
+        return_value={"count": 2, "next": None, "results": [{"id": 1}, {"id": 2}]}
+    )
+    inventory_fixture.offline_snapshot = {"version": 1, "lists": {}, "counts": {}}
+    inventory_fixture.api_version = version.parse("4.2")
+    inventory_fixture.offline_snapshot.update(
+        api_version="4.2",
+        allowed_device_query_parameters=["name"],
+        allowed_vm_query_parameters=["tag"],
+    )
+
+    assert inventory_fixture.get_resource_list(api_url) == [{"id": 1}, {"id": 2}]
+    assert inventory_fixture.get_object_count(api_url) == 2
+    inventory_fixture._save_offline_snapshot()
+
+    # Relative to api_endpoint
+    assert list(inventory_fixture.offline_snapshot["lists"]) == [
+        "/api/dcim/devices/?limit=0"
+    ]
+
+    imported = InventoryModule()
+    imported.api_endpoint = inventory_fixture.api_endpoint
+    imported.get_option = inventory_fixture.get_option
+    imported.offline_snapshot = imported._load_offline_snapshot(path)
+    imported.offline_snapshot_import = True
+    imported.fetch_stats = None
+
+    imported.fetch_api_docs()
+    assert imported.api_version == version.parse("4.2")
+    assert imported.allowed_device_query_parameters == ["name"]
+    assert imported.allowed_vm_query_parameters == ["tag"]
+    assert imported.get_resource_list(api_url) == [{"id": 1}, {"id": 2}]
+    assert imported.get_object_count(api_url) == 2
+
+    # Nothing is requested from NetBox
+    with pytest.raises(AnsibleError, match="is not in the snapshot"):
+        imported.get_resource_list(api_url + "&tag=other")
+    with pytest.raises(AnsibleError, match="is not in the snapshot"):
+        imported._open_url(api_url)
+
+
+def test_apply_object_changes(inventory_fixture):
+    api_url = "https://netbox:1234/api/dcim/devices/?limit=0&tag=prod"
+    site_url = "https://netbox:1234/api/dcim/sites/%s/"
+    devices = [
+        {"id": 1, "name": "a", "site": {"id": 1, "url": site_url % 1}},
+        {"id": 2, "name": "b", "site": {"id": 2, "url": site_url % 2}},
+        {"id": 3, "name": "c", "site": {"id": 2, "url": site_url % 2}},
+        {"id": 4, "name": "d", "site": {"id": 2, "url": site_url % 2}},
+    ]
+    refetched = {
+        1: {"id": 1, "name": "a", "site": {"id": 1, "name": "renamed"}},
+        2: {"id": 2, "name": "b2", "site": {"id": 2, "url": site_url % 2}},
+        5: {"id": 5, "name": "e", "site": {"id": 2, "url": site_url % 2}},
+    }
+
+    changes = ObjectChanges()
+    for action, object_type, object_id in [
+        ("update", "dcim.site", 1),
+        ("update", "dcim.device", 2),
+        ("delete", "dcim.device", 3),
+        ("update", "dcim.device", 4),
+        ("create", "dcim.device", 5),
+    ]:
+        changes.add(
+            {
+                "action": {"value": action},
+                "changed_object_type": object_type,
+                "changed_object_id": object_id,
+            }
+        )
+
+    def fetch_information(url, use_cache=True):
+        ids = [
+            int(value) for key, value in parse_qsl(urlparse(url).query) if key == "id"
+        ]
+        return {"results": [refetched[i] for i in ids if i in refetched], "next": None}
+
+    mock_fetch_information = Mock(side_effect=fetch_information)
+    inventory_fixture._fetch_information = mock_fetch_information
+    inventory_fixture.display = Mock()
+    inventory_fixture.max_uri_length = 4000
+
+    resources = inventory_fixture._apply_object_changes(
+        api_url, "dcim.device", devices, changes
+    )
+
+    # Device 1 embeds the renamed site, device 4 no longer matches the query filters
+    assert resources == [refetched[1], refetched[2], refetched[5]]
+    mock_fetch_information.assert_called_once_with(
+        api_url + "&id=1&id=2&id=4&id=5", use_cache=False
+    )
+
+
+def test_changelog_refresh(inventory_fixture, tmp_path):
+    api_url = "https://netbox:1234/api/dcim/devices/?limit=0"
+    changelog_url = inventory_fixture.api_endpoint + "/api/extras/object-changes/"
+    responses = {
+        changelog_url
+        + "?limit=1&ordering=-id": {
+            "count": 10,
+            "next": None,
+            "results": [{"id": 10}],
+        },
+        api_url: {"count": 1, "next": None, "results": [{"id": 1, "name": "a"}]},
+    }
+
+    options = {
+        "changelog_snapshot_path": str(tmp_path / "snapshot.json"),
+        "changelog_snapshot_max_age": 3600,
+    }
+    inventory_fixture.get_option = Mock(side_effect=options.get)
+    inventory_fixture.display = Mock()
+    inventory_fixture._fetch_information = Mock(
+        side_effect=lambda url, use_cache=True: responses[url]
+    )
+    inventory_fixture.max_uri_length = 4000
+    inventory_fixture.changelog_refresh = True
+    inventory_fixture._changelog_lock = threading.Lock()
+    inventory_fixture._object_changes = None
+    inventory_fixture._changelog_previous_lists = {}
+    inventory_fixture._changelog_lists = {}
+    inventory_fixture._changelog_previous_chunks = {}
+    inventory_fixture._changelog_chunks = {}
+
+    # First run: no snapshot, everything is fetched, bypassing the cache of responses older than the last change
+    assert inventory_fixture.get_resource_list(api_url) == [{"id": 1, "name": "a"}]
+    inventory_fixture._fetch_information.assert_called_with(api_url, use_cache=False)
+    inventory_fixture._save_changelog_snapshot()
+
+    # Second run: device 1 was updated, device 2 created
+    responses[changelog_url + "?limit=1&ordering=-id"]["results"] = [{"id": 12}]
+    responses[changelog_url + "?limit=0&id__gt=10&id__lte=12"] = {
+        "count": 2,
+        "next": None,
+        "results": [
+            {
+                "id": 11,
+                "action": {"value": "update"},
+                "changed_object_type": "dcim.device",
+                "changed_object_id": 1,
+            },
+            {
+                "id": 12,
+                "action": {"value": "create"},
+                "changed_object_type": "dcim.device",
+                "changed_object_id": 2,
+            },
+        ],
+    }
+    responses[api_url + "&id=1&id=2"] = {
+        "count": 2,
+        "next": None,
+        "results": [{"id": 1, "name": "a2"}, {"id": 2, "name": "b"}],
+    }
+    del responses[api_url]
+    inventory_fixture._object_changes = None
+    inventory_fixture._changelog_lists = {}
+
+    assert inventory_fixture.get_resource_list(api_url) == [
+        {"id": 1, "name": "a2"},
+        {"id": 2, "name": "b"},
+    ]
+
+
+@pytest.mark.parametrize(
+    "api_path, object_type, config_context, local_config_context, fetched_again",
+    [
+        ("dcim/devices", "extras.configcontext", True, False, True),
+        ("dcim/devices", "dcim.region", True, False, True),
+        ("dcim/devices", "extras.configcontext", False, False, False),
+        ("dcim/devices", "extras.configcontext", True, True, False),
+        ("virtualization/virtual-machines", "tenancy.tenantgroup", True, False, True),
+        ("dcim/sites", "ipam.prefix", False, False, True),
+        ("dcim/sites", "extras.configcontext", True, False, False),
+    ],
+)
+def test_changelog_derived_fields(
+    inventory_fixture,
+    api_path,
+    object_type,
+    config_context,
+    local_config_context,
+    fetched_again,
+):
+    api_url = "https://netbox:1234/api/%s/?limit=0" % api_path
+    previous = [{"id": 1, "name": "a", "config_context": {}, "prefix_count": 0}]
+    current = [{"id": 1, "name": "a", "config_context": {"a": 1}, "prefix_count": 1}]
+
+    # No listed object changed, only an object their config context or prefix count is computed from
+    changes = ObjectChanges()
+    changes.add(
+        {
+            "action": {"value": "update"},
+            "changed_object_type": object_type,
+            "changed_object_id": 1,
+        }
+    )
+
+    inventory_fixture.config_context = config_context
+    inventory_fixture.local_config_context = local_config_context
+    inventory_fixture.changelog_refresh = True
+    inventory_fixture._changelog_lock = threading.Lock()
+    inventory_fixture._object_changes = changes
+    inventory_fixture._changelog_previous_lists = {
+        api_url: {
+            "object_type": inventory_fixture._changelog_object_type(api_url),
+            "results": previous,
+        }
+    }
+    inventory_fixture._changelog_lists = {}
+    inventory_fixture._fetch_information = Mock(
+        return_value={"count": 1, "next": None, "results": current}
+    )
+
+    resources = inventory_fixture._get_resource_list_from_snapshot(api_url)
+
+    if fetched_again:
+        assert resources == current
+        inventory_fixture._fetch_information.assert_called_once_with(
+            api_url, use_cache=False
+        )
+    else:
+        assert resources == previous
+        inventory_fixture._fetch_information.assert_not_called()
+
+
+def test_changelog_chunked_urls(inventory_fixture):
+    api_url = "https://netbox:1234/api/dcim/interfaces/?limit=0"
+
+    inventory_fixture.changelog_refresh = True
+    inventory_fixture.max_uri_length = len(api_url) + len("&device_id=1") * 2
+    inventory_fixture._changelog_lock = threading.Lock()
+    inventory_fixture._object_changes = object()
+    inventory_fixture._changelog_previous_chunks = {
+        api_url + " device_id": [[1, 2], [3, 4], [5, 6]]
+    }
+    inventory_fixture._changelog_chunks = {}
+
+    # Device 3 was removed, device 7 added: only the chunk of device 3 changes
+    urls = inventory_fixture._chunked_urls_from_snapshot(
+        api_url, "device_id", [1, 2, 4, 5, 6, 7]
+    )
+
+    assert urls == [
+        api_url + "&device_id=1&device_id=2",
+        api_url + "&device_id=5&device_id=6",
+        api_url + "&device_id=4&device_id=7",
+    ]
+    assert inventory_fixture._changelog_chunks == {
+        api_url + " device_id": [[1, 2], [5, 6], [4, 7]]
+    }
+
+
+@pytest.mark.parametrize(
+    "fetch_all, count, host_ids, expected",
+    [
+        (True, None, range(1, 3), True),
+        (False, None, range(1, 3), False),
+        # 1 chunk, not worth requesting the first page of all objects
+        ("auto", 1500, range(1, 3), False),
+        # 3 chunks, all objects in the first page
+        ("auto", 500, range(1000, 1600), True),
+        # 3 chunks, 1 more page to fetch all
+        ("auto", 1500, range(1000, 1600), True),
+        # 3 chunks, 4 more pages to fetch all
+        ("auto", 5000, range(1000, 1600), False),
+        # No host to query
+        ("auto", 500, [], False),
+    ],
+)
+def test_use_fetch_all(inventory_fixture, fetch_all, count, host_ids, expected):
+    api_url = "https://netbox:1234/api/dcim/interfaces/?limit=0"
+    first_page = {
+        "count": count,
+        "next": api_url + "&offset=1000" if count and count > 1000 else None,
+        "results": [{"id": i} for i in range(min(count or 0, 1000))],
+    }
+
+    inventory_fixture.fetch_all = fetch_all
+    inventory_fixture.max_uri_length = 4000
+    inventory_fixture.display = Mock()
+    inventory_fixture._fetch_information = Mock(return_value=first_page)
+
+    assert (
+        inventory_fixture.use_fetch_all(api_url, [("device_id", host_ids)]) == expected
+    )
+
+    if fetch_all == "auto" and len(host_ids) > 2:
+        inventory_fixture._fetch_information.assert_called_once_with(
+            api_url, use_cache=True
+        )
+    else:
+        inventory_fixture._fetch_information.assert_not_called()
+
+    # The first page is not requested again to fetch all objects
+    if fetch_all == "auto" and expected:
+        assert inventory_fixture._pop_first_page(api_url) is first_page
+    assert inventory_fixture._first_pages == {}
+
+
+@pytest.mark.parametrize(
+    "count, ids, parents",
+    [
+        # Referenced objects fit in a chunk
+        (50, range(1, 4), False),
+        (5000, range(1, 4), False),
+        # Parents of the referenced objects are requested as well
+        (50, range(10, 13), True),
+        # Several chunks, all objects fit in a page
+        (800, range(1, 800), False),
+        # Several chunks, all objects fit in fewer pages
+        (2500, range(1, 2500), False),
+    ],
+)
+def test_fetch_all_auto_requests(inventory_fixture, count, ids, parents):
+    # fetch_all auto does not send more requests than the best of fetch_all true and false
+    api_url = "https://netbox:1234/api/dcim/regions/?limit=0"
+    objects = [
+        {"id": i, "parent": {"id": i - 1} if parents and i > 1 else None}
+        for i in range(1, count + 1)
+    ]
+
+    def fetch_information(url, use_cache=True):
+        query = parse_qsl(urlparse(url).query)
+        filter_ids = set(int(value) for key, value in query if key == "id")
+        results = [o for o in objects if not filter_ids or o["id"] in filter_ids]
+        offset = int(dict(query).get("offset", 0))
+        page = results[offset : offset + 1000]
+        next_url = None
+        if offset + 1000 < len(results):
+            next_url = "%s&limit=1000&offset=%d" % (
+                url.split("&offset")[0],
+                offset + 1000,
+            )
+        return {"count": len(results), "next": next_url, "results": page}
+
+    inventory_fixture.max_uri_length = 4000
+    inventory_fixture.display = Mock()
+
+    requests = {}
+    for fetch_all in (True, False, "auto"):
+        inventory_fixture.fetch_all = fetch_all
+        inventory_fixture._first_pages = {}
+        inventory_fixture._fetch_information = Mock(side_effect=fetch_information)
+
+        resources = inventory_fixture.get_referenced_resource_list(
+            api_url, ids, parent_key="parent" if parents else None
+        )
+
+        assert set(ids).issubset(resource["id"] for resource in resources)
+        requests[fetch_all] = inventory_fixture._fetch_information.call_count
+
+    assert requests["auto"] <= min(requests[True], requests[False])
+
+
+def test_fetch_all_does_not_wait_for_hosts(inventory_fixture):
+    # Services and virtual disks are fetched before the hosts when fetch_all is true
+    inventory_fixture.fetch_all = True
+    inventory_fixture.get_resource_list = Mock(return_value=[])
+
+    inventory_fixture.refresh_services()
+    inventory_fixture.refresh_virtual_disks()
+
+    assert inventory_fixture.get_resource_list.call_count == 2
+    assert not hasattr(inventory_fixture, "devices_lookup")
+
+
+def test_hosts_with_related():
+    hosts_lookup = {
+        1: {"id": 1, "interface_count": 2},
+        2: {"id": 2, "interface_count": 0},
+        # Counter not returned by NetBox
+        3: {"id": 3},
+    }
+
+    assert InventoryModule._hosts_with_related(hosts_lookup, "interface_count") == [
+        1,
+        3,
+    ]
+
+
+def test_refresh_ipaddresses_without_interfaces(inventory_fixture):
+    inventory_fixture.interfaces = False
+    inventory_fixture.fetch_all = False
+    inventory_fixture.devices_lookup = {
+        1: {"id": 1, "interface_count": 1},
+        2: {"id": 2, "interface_count": 0},
+    }
+    inventory_fixture.vms_lookup = {3: {"id": 3, "interface_count": 0}}
+    inventory_fixture.get_resource_list_chunked = Mock(return_value=[])
+
+    inventory_fixture.refresh_ipaddresses()
+
+    inventory_fixture.get_resource_list_chunked.assert_has_calls(
+        [
+            call(api_url=ANY, query_key="device_id", query_values=[1]),
+            call(api_url=ANY, query_key="virtual_machine_id", query_values=[]),
+        ]
+    )
+
+
+def test_inventory_model_cache(inventory_fixture):
+    def main():
+        inventory_fixture.inventory.add_group("group")
+        inventory_fixture.inventory.add_host(host="host", group="group")
+        inventory_fixture.inventory.set_variable("host", "key", "value")
+
+    inventory_fixture.main = Mock(side_effect=main)
+    inventory_fixture.display = Mock()
+    inventory_fixture.get_option = Mock(return_value="none")
+    inventory_fixture._cache = {}
+    inventory_fixture._inventory_model_cache_key = Mock(return_value="model")
+    inventory_fixture.use_cache = True
+    inventory = inventory_fixture.inventory = Mock()
+
+    # Cache miss: the inventory is built, and its changes recorded
+    inventory_fixture._main_cached("path")
+
+    assert inventory_fixture.inventory is inventory
+    assert inventory_fixture._cache["model"] == [
+        ["add_group", ["group"], {}],
+        ["add_host", [], {"host": "host", "group": "group"}],
+        ["set_variable", ["host", "key", "value"], {}],
+    ]
+
+    # Cache hit: the recorded changes are replayed without building the inventory
+    replayed = inventory_fixture.inventory = Mock()
+    inventory_fixture._main_cached("path")
+
+    inventory_fixture.main.assert_called_once()
+    assert replayed.mock_calls == inventory.mock_calls
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        {
+            "results": [
+                {"id": i, "site": {"id": 1, "url": "/api/dcim/sites/1/", "tags": []}}
+                for i in range(3)
+            ],
+            "next": None,
+        },
+        {"results": [{"id": 1, "custom_fields": {"$ref": 0}}], "next": None},
+        [["add_host", [], {"host": "host"}]],
+    ],
+)
+def test_cache_codec(value):
+    encoded = CacheCodec.encode(value)
+
+    assert set(encoded) == {CacheCodec.MARKER, "data"}
+    assert CacheCodec.decode(encoded) == value
+    # Values stored without codec are read as they are
+    assert CacheCodec.decode(value) == value
+
+
+def test_cache_codec_deduplicates():
+    site = {"id": 1, "url": "/api/dcim/sites/1/", "name": "site"}
+    value = {"results": [{"id": i, "site": dict(site)} for i in range(3)]}
+
+    objects = []
+    compacted = CacheCodec._deduplicate(value, objects, {}, nested=False)
+
+    assert objects == [site]
+    assert compacted == {"results": [{"id": i, "site": {"$ref": 0}} for i in range(3)]}
+
+
+def test_fetch_stats():
+    stats = FetchStats("https://netbox:1234/netbox")
+
+    for latency in range(1, 11):
+        stats.record_request(
+            "https://netbox:1234/netbox/api/dcim/devices/?limit=0&offset=%s" % latency,
+            100,
+            latency / 10.0,
+        )
+    stats.record_request("https://netbox:1234/netbox/api/ipam/prefixes", 0)
+    stats.record_cache("https://netbox:1234/netbox/api/ipam/prefixes", hit=True)
+    stats.record_shared("https://netbox:1234/netbox/api/ipam/prefixes")
+    stats.record_snapshot("https://netbox:1234/netbox/api/dcim/sites/?limit=0")
+    stats.run_phase("fetch_hosts", lambda: None)
+
+    result = stats.to_dict()
+
+    assert list(result["phases"]) == ["fetch_hosts"]
+    assert result["endpoints"]["/api/dcim/devices/"] == {
+        "requests": 10,
+        "bytes": 1000,
+        "shared": 0,
+        "snapshot": 0,
+        "cache_hits": 0,
+        "cache_misses": 0,
+        "latency": {"p50": 0.5, "p90": 0.9, "p99": 1.0, "max": 1.0},
+    }
+    assert result["endpoints"]["/api/ipam/prefixes/"]["cache_hits"] == 1
+    assert result["total"]["requests"] == 11
+    assert result["total"]["shared"] == 1
+    assert result["total"]["snapshot"] == 1
+    assert len(stats.report()) == 8
+
+
+def test_fetch_stats_responses(inventory_fixture):
+    url = "https://netbox:1234/api/dcim/devices/?limit=0"
+    body = json.dumps({"count": 0, "next": None, "results": []}).encode()
+    inventory_fixture.fetch_stats = FetchStats(inventory_fixture.api_endpoint)
+    inventory_fixture.get_option = Mock(return_value=False)
+    inventory_fixture.loader = Mock(load=lambda data, json_only: json.loads(data))
+
+    # Compressed response, response without its size received, and response to another request
+    for response in [
+        decoded_response(body, 10),
+        BytesIO(body),
+        decoded_response(body, shared=True),
+    ]:
+        inventory_fixture._load_response(url, response)
+
+    stats = inventory_fixture.fetch_stats.to_dict()["endpoints"]["/api/dcim/devices/"]
+    assert stats["requests"] == 2
+    assert stats["bytes"] == 10 + len(body)
+    assert stats["shared"] == 1
+
+
+@pytest.mark.parametrize(
+    "netbox_ver, brief, expected",
+    [
+        ("4.0", False, "&fields=id,slug,parent"),
+        ("3.7", True, "&brief=1"),
+        ("3.7", False, ""),
+    ],
+)
+def test_field_projection(inventory_fixture, netbox_ver, brief, expected):
+    inventory_fixture.api_version = version.Version(netbox_ver)
+
+    assert inventory_fixture._field_projection(["id", "slug", "parent"], brief) == ""
+
+    inventory_fixture.field_projection = True
+
+    assert (
+        inventory_fixture._field_projection(["id", "slug", "parent"], brief) == expected
+    )
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+try:
+    from ansible_collections.netbox.netbox.plugins.lookup.nb_lookup import (
+        LookupModule,
+        display_transfer,
+    )
+
+    MOCKER_PATCH_PATH = "ansible_collections.netbox.netbox.plugins.lookup.nb_lookup"
+except ImportError:
+    import sys
+
+    # Not installed as a collection
+    # Try importing relative to root directory of this ansible_modules project
+
+    sys.path.append("plugins/lookup")
+    from nb_lookup import LookupModule, display_transfer
+
+    MOCKER_PATCH_PATH = "nb_lookup"
+
+
+PAYLOAD = {
+    "count": 1,
+    "next": None,
+    "previous": None,
+    "results": [{"id": 1, "name": "device1"}],
+}
+
+
+class MockNetboxHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.accept_encodings.append(self.headers.get("Accept-Encoding"))
+
+        body = json.dumps(PAYLOAD).encode()
+        headers = {"Content-Type": "application/json", "API-Version": "4.2"}
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        headers["Content-Length"] = str(len(body))
+        self.server.bytes_sent.append(len(body))
+
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def netbox_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockNetboxHandler)
+    server.accept_encodings = []
+    server.bytes_sent = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("compression", [True, False])
+def test_compression(netbox_server, compression):
+    with patch(MOCKER_PATCH_PATH + ".Display") as mock_display:
+        results = LookupModule().run(
+            ["devices"],
+            api_endpoint="http://127.0.0.1:%s" % netbox_server.server_port,
+            token="0123456789",
+            raw_data=True,
+            compression=compression,
+        )
+
+    assert results == PAYLOAD["results"]
+    transfers = [
+        call.args[0]
+        for call in mock_display.return_value.v.call_args_list
+        if call.args[0].startswith("NetBox lookup received")
+    ]
+
+    if compression:
+        # Compressed responses are only requested with option compression
+        assert all("gzip" in value for value in netbox_server.accept_encodings)
+        assert len(transfers) == len(netbox_server.accept_encodings)
+    else:
+        assert not any(
+            "gzip" in (value or "") for value in netbox_server.accept_encodings
+        )
+        assert transfers == []
+
+
+@pytest.mark.parametrize("accept_encoding", ["gzip", "identity"])
+def test_display_transfer(netbox_server, accept_encoding):
+    url = "http://127.0.0.1:%s/api/dcim/devices/" % netbox_server.server_port
+    response = requests.get(
+        url, headers={"Accept-Encoding": accept_encoding}, stream=True
+    )
+
+    with patch(MOCKER_PATCH_PATH + ".Display") as mock_display:
+        display_transfer(response)
+
+    # Bytes received from the server, before decompression
+    mock_display.return_value.v.assert_called_once_with(
+        "NetBox lookup received %d bytes from %s, Content-Encoding %s"
+        % (netbox_server.bytes_sent[0], url, accept_encoding)
+    )
+
+    # The body is not read by the hook
+    assert response.raw.tell() == 0
+    assert response.json() == PAYLOAD
+
+
+def test_display_transfer_unknown_size():
+    url = "http://netbox/api/dcim/devices/"
+    response = Mock(spec=["headers", "url"], headers={}, url=url)
+
+    with patch(MOCKER_PATCH_PATH + ".Display") as mock_display:
+        display_transfer(response)
+
+    mock_display.return_value.v.assert_called_once_with(
+        "NetBox lookup received a response of unknown size from %s" % url
+    )